@@ -0,0 +1,190 @@
+"""Tiện ích dùng chung cho các lệnh benchmark (manage.py bench_*).
+
+Các benchmark chạy trên một database test tạm thời giống ``manage.py test`` nên không
+đụng tới dữ liệu thật, và tự seed catalog/đơn hàng giả lập theo kích thước cần đo.
+"""
+import datetime
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+SEED_BATCH_SIZE = 5000
+SEED_SIZES = ('S', 'M', 'L', 'XL')
+SEED_IMAGE = 'product_images/16.webp'
+SEED_KINDS = ('Áo Sơ Mi', 'Áo Polo', 'Áo Thun', 'Áo Khoác', 'Quần Jean', 'Quần Kaki', 'Váy Đầm')
+SEED_COLORS = ('Trắng', 'Đen', 'Xanh Navy', 'Đỏ Đô', 'Be', 'Xám')
+SEED_STYLES = ('Basic', 'Slimfit', 'Oversize', 'Công Sở', 'Thể Thao')
+
+
+@contextmanager
+def benchmark_database():
+    """Tạo database test tạm thời để seed dữ liệu benchmark, xoá khi xong"""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_catalog(n_products, n_categories=10, sizes=SEED_SIZES, stock=100):
+    """Bổ sung sản phẩm giả lập cho tới khi catalog có ``n_products`` sản phẩm.
+
+    Mỗi sản phẩm có đủ các size trong ``sizes`` với tồn kho ``stock``. Gọi lại với
+    ``n_products`` lớn hơn sẽ chỉ thêm phần còn thiếu.
+    """
+    from products import reference
+    from products.catalog import bump_catalog_version
+    from products.models import Category, Product, ProductSize, Size
+
+    categories = list(Category.objects.order_by('id')[:n_categories])
+    if len(categories) < n_categories:
+        Category.objects.bulk_create(
+            Category(name=f"Danh mục {i}") for i in range(len(categories), n_categories)
+        )
+        reference.bump_version()  # bulk_create không phát signal
+        categories = list(Category.objects.order_by('id')[:n_categories])
+    size_objs = [Size.objects.get_or_create(name=name)[0] for name in sizes]
+
+    start = Product.objects.count()
+    for batch_start in range(start, n_products, SEED_BATCH_SIZE):
+        batch_end = min(batch_start + SEED_BATCH_SIZE, n_products)
+        products = Product.objects.bulk_create([
+            Product(
+                category=categories[i % len(categories)],
+                name=seed_product_name(i),
+                price=100000 + (i % 50) * 10000,
+                image=SEED_IMAGE,
+                image_renditions={'source': SEED_IMAGE},  # Không tạo ảnh thu nhỏ cho dữ liệu giả lập
+            )
+            for i in range(batch_start, batch_end)
+        ])
+        if products[0].pk is None:
+            # Backend không trả về pk sau bulk_create: đọc lại theo thứ tự id
+            products = list(Product.objects.order_by('-id')[:len(products)])[::-1]
+        ProductSize.objects.bulk_create([
+            ProductSize(product=product, size=size, quantity=stock)
+            for product in products
+            for size in size_objs
+        ])
+    bump_catalog_version()  # bulk_create không phát signal
+
+
+def seed_orders(n_orders, lines=4, days=365, cancelled_ratio=0.05, status='completed', seed=0):
+    """Thêm ``n_orders`` đơn giả lập, mỗi đơn ``lines`` SKU ngẫu nhiên của catalog hiện có,
+    ngày tạo rải đều trong ``days`` ngày gần nhất, trạng thái ``status`` (một phần
+    ``cancelled_ratio`` bị huỷ). Trả về số dòng ``order_items`` đã tạo.
+
+    ``created_at``/``updated_at`` được gán trực tiếp (tắt ``auto_now`` trong lúc seed) để
+    có lịch sử nhiều ngày.
+    """
+    from django.contrib.auth.models import User
+    from orders.models import Order, OrderItem
+    from products.models import ProductSize
+
+    rng = random.Random(seed)
+    user, _ = User.objects.get_or_create(username='bench-buyer')
+    skus = list(ProductSize.objects.values_list('id', 'product__price'))
+    now = timezone.now()
+    created_field = Order._meta.get_field('created_at')
+    updated_field = Order._meta.get_field('updated_at')
+    n_items = 0
+    with mock.patch.object(created_field, 'auto_now_add', False), mock.patch.object(updated_field, 'auto_now', False):
+        for batch_start in range(0, n_orders, SEED_BATCH_SIZE):
+            orders, baskets = [], []
+            for _ in range(min(SEED_BATCH_SIZE, n_orders - batch_start)):
+                basket = [(sku, price, rng.randint(1, 3)) for sku, price in rng.sample(skus, lines)]
+                created_at = now - datetime.timedelta(seconds=rng.randrange(days * 24 * 60 * 60))
+                orders.append(Order(
+                    user=user, receiver='Bench', phone='0900000000', address='HCM',
+                    total_amount=sum(price * quantity for _, price, quantity in basket),
+                    status='cancelled' if rng.random() < cancelled_ratio else status,
+                    created_at=created_at, updated_at=created_at,
+                ))
+                baskets.append(basket)
+            orders = Order.objects.bulk_create(orders)
+            if orders[0].pk is None:
+                orders = list(Order.objects.order_by('-id')[:len(orders)])[::-1]
+            items = [
+                OrderItem(order=order, product_size_id=sku, quantity=quantity, price=price)
+                for order, basket in zip(orders, baskets)
+                for sku, price, quantity in basket
+            ]
+            OrderItem.objects.bulk_create(items)
+            n_items += len(items)
+    return n_items
+
+
+def seed_product_name(i):
+    """Tên sản phẩm giả lập thứ ``i``, đủ đa dạng để benchmark tìm kiếm có ý nghĩa"""
+    kind = SEED_KINDS[i % len(SEED_KINDS)]
+    color = SEED_COLORS[(i // len(SEED_KINDS)) % len(SEED_COLORS)]
+    style = SEED_STYLES[(i // 42) % len(SEED_STYLES)]
+    return f"{kind} {color} {style} {i}"
+
+
+def measure(func, repeat=20, warmup=2):
+    """Chạy ``func`` nhiều lần, trả về (danh sách thời gian ms, số query của lần chạy cuối)"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings, len(ctx.captured_queries)
+
+
+def percentile(samples, pct):
+    """Phân vị ``pct`` (0-100) của danh sách số đo"""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[max(0, min(98, pct - 1))]
+
+
+def run_concurrently(func, workers, calls):
+    """Gọi ``func(i)`` với i = 0..calls-1 trên ``workers`` thread, mỗi thread một kết nối DB.
+
+    Trả về (thời gian chạy giây, danh sách kết quả theo thứ tự i). Ngoại lệ trong ``func``
+    được trả về như một kết quả để benchmark tự đếm lỗi.
+    """
+    results = [None] * calls
+    pending = iter(range(calls))
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    def worker():
+        connection.ensure_connection()
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    i = next(pending, None)
+                if i is None:
+                    return
+                try:
+                    results[i] = func(i)
+                except Exception as exc:
+                    results[i] = exc
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, name=f'bench-{n}') for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, results
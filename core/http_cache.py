@@ -0,0 +1,94 @@
+"""Header cache HTTP cho các trang storefront (trang chủ, danh mục, tìm kiếm, liên hệ).
+
+Trang cho khách chưa đăng nhập chỉ phụ thuộc URL, phiên bản catalog (đổi khi sửa sản phẩm,
+size, danh mục; xem ``products.catalog``) và nội dung template. ``storefront_cache`` dựng
+ETag từ hai giá trị đó *trước* khi chạy view, nên ``If-None-Match`` khớp được trả 304 chỉ
+với một lần đọc cache: không query, không render template.
+
+- Khách: ``Cache-Control: public, max-age=0, s-maxage=STOREFRONT_S_MAXAGE``. Trình duyệt
+  luôn hỏi lại (304 nếu không đổi), CDN giữ bản sao tối đa ``s-maxage`` giây. Header
+  ``Surrogate-Key`` (``storefront``, ``catalog``, ``category-<id>``...) cho phép CDN xoá
+  theo nhóm: nối signal ``products.catalog.catalog_changed`` vào API purge của CDN để xoá
+  key ``catalog`` ngay khi catalog đổi thay vì đợi hết ``s-maxage``.
+- Đã đăng nhập hoặc còn message chưa hiển thị: ``private, no-cache``, không ETag (trang có
+  tên user và form đăng xuất kèm CSRF token).
+- Trang có form kèm CSRF token (``csrf=True``): token thuộc về từng khách nên chỉ
+  ``private``, và ETag gồm cả cookie CSRF để bản đã lưu luôn khớp cookie hiện tại.
+
+Mọi response đều ``Vary: Cookie``: cùng URL nhưng khác trạng thái đăng nhập là khác trang.
+"""
+import functools
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.template import engines
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from products.catalog import catalog_version
+
+
+@functools.cache
+def _template_digest():
+    """Băm nội dung template của dự án: deploy giao diện mới là ETag mới dù catalog không đổi"""
+    digest = hashlib.md5()
+    base_dir = Path(settings.BASE_DIR)
+    for engine in engines.all():
+        for directory in map(Path, engine.template_dirs):
+            if not directory.is_relative_to(base_dir) or not directory.is_dir():
+                continue
+            for path in sorted(directory.rglob('*.html')):
+                digest.update(str(path.relative_to(base_dir)).encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def storefront_etag(request, csrf=False):
+    """ETag (chưa đặt trong ngoặc kép) của trang storefront cho khách chưa đăng nhập"""
+    parts = [catalog_version(), _template_digest()]
+    if csrf:
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def _cacheable(request):
+    """Trang giống nhau cho mọi khách: chưa đăng nhập và không có message đang chờ"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def storefront_cache(*surrogate_keys, csrf=False):
+    """Decorator cho view storefront: ETag/304 và ``Cache-Control`` theo trạng thái đăng nhập.
+
+    ``surrogate_keys`` được format với tham số URL của view, ví dụ ``'category-{category_id}'``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _cacheable(request):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Cookie'])
+                return response
+
+            etag = f'"{storefront_etag(request, csrf)}"'
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers.setdefault('ETag', etag)
+            if csrf:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=0, s_maxage=settings.STOREFRONT_S_MAXAGE)
+                keys = ['storefront', *(key.format(**kwargs) for key in surrogate_keys)]
+                response['Surrogate-Key'] = ' '.join(keys)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapped
+    return decorator
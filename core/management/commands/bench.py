@@ -0,0 +1,210 @@
+"""Benchmark tổng hợp storefront, giỏ hàng, checkout, lịch sử đơn và trang quản lý.
+
+Seed catalog và lịch sử đơn giả lập vào database test tạm thời, rồi gọi các URL thật bằng
+``django.test.Client`` trên nhiều thread (mỗi thread một client và một kết nối DB). Mỗi kịch
+bản báo throughput, độ trễ p50/p95/p99 và số query mỗi request. ``--output`` lưu kết quả
+dạng JSON; ``--baseline`` so với một file kết quả trước đó và kết thúc với mã lỗi nếu có kịch
+bản kém hơn quá ``--max-regression`` phần trăm::
+
+    DB_ENGINE=sqlite python manage.py bench --output bench.json
+    DB_ENGINE=sqlite python manage.py bench --baseline bench.json --max-regression 25
+"""
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.functions import Mod
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.bench import benchmark_database, percentile, run_concurrently, seed_catalog, seed_orders
+from orders.models import Order
+from products.models import Category, ProductSize
+from products.search import rebuild_index
+
+SCENARIOS = ('home', 'search', 'category', 'cart', 'checkout', 'my-orders', 'management')
+SEARCH_TERMS = ('ao thun', 'quan jean', 'polo den', 'vay', 'so mi trang', 'khoac')
+
+
+@dataclass
+class Scenario:
+    name: str
+    login: str  # 'anonymous', 'customer' hoặc 'staff'
+    call: Callable  # (client, i) -> response
+
+
+def _regressions(results, baseline, max_regression):
+    """Các kịch bản kém hơn ``baseline`` quá ``max_regression`` phần trăm"""
+    limit = max_regression / 100
+    found = []
+    for name, result in results.items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        checks = (
+            ('p95 ms', result['p95_ms'], old['p95_ms'], result['p95_ms'] > old['p95_ms'] * (1 + limit)),
+            ('req/s', result['rps'], old['rps'], result['rps'] < old['rps'] * (1 - limit)),
+            ('query/request', result['queries_mean'], old['queries_mean'],
+             result['queries_mean'] > old['queries_mean'] * (1 + limit)),
+        )
+        found += [f"{name}: {label} {new:.2f} (trước {before:.2f})" for label, new, before, worse in checks if worse]
+        if result['errors'] > old['errors']:
+            found.append(f"{name}: {result['errors']} lỗi (trước {old['errors']})")
+    return found
+
+
+class Command(BaseCommand):
+    help = "Đo throughput, độ trễ và số query của các trang chính với nhiều client song song"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--orders', type=int, default=20_000, help="Số đơn trong lịch sử giả lập")
+        parser.add_argument('--requests', type=int, default=300, help="Số request mỗi kịch bản")
+        parser.add_argument('--workers', type=int, default=8, help="Số thread gửi request song song")
+        parser.add_argument('--warmup', type=int, default=10, help="Số request chạy trước khi đo")
+        parser.add_argument('--only', nargs='*', choices=SCENARIOS, help="Chỉ chạy các kịch bản này")
+        parser.add_argument('--output', help="Lưu kết quả vào file JSON")
+        parser.add_argument('--baseline', help="File JSON kết quả trước đó để so sánh")
+        parser.add_argument('--max-regression', type=float, default=20, help="Ngưỡng kém hơn baseline (%%)")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        with benchmark_database(), override_settings(PERF_SAMPLE_RATE=0):
+            self.seed(options)
+            scenarios = [
+                scenario for scenario in self.scenarios() if not options['only'] or scenario.name in options['only']
+            ]
+
+            self.stdout.write(
+                f"{'kịch bản':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'query/req':>10} {'lỗi':>5}"
+            )
+            results = {}
+            for scenario in scenarios:
+                result = results[scenario.name] = self.run_scenario(scenario, options)
+                self.stdout.write(
+                    f"{scenario.name:<12} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                    f"{result['p99_ms']:>8.2f} {result['queries_mean']:>10.1f} {result['errors']:>5}"
+                )
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'options': {
+                name: options[name] for name in ('products', 'orders', 'requests', 'workers', 'warmup')
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"\nĐã lưu kết quả vào {options['output']}")
+        if baseline is not None:
+            found = _regressions(results, baseline, options['max_regression'])
+            if found:
+                raise CommandError(
+                    f"Kém hơn baseline quá {options['max_regression']:g}%:\n  " + '\n  '.join(found)
+                )
+            self.stdout.write(self.style.SUCCESS(f"Không kịch bản nào kém hơn baseline quá {options['max_regression']:g}%"))
+
+    def seed(self, options):
+        started = time.perf_counter()
+        seed_catalog(options['products'], stock=1_000_000)
+        rebuild_index()
+        seed_orders(options['orders'], lines=3)
+        # Mỗi thread một khách hàng (giỏ hàng riêng), chia đều lịch sử đơn cho các khách
+        self.customers = [
+            User.objects.create_user(f'bench-customer-{n}', password='bench') for n in range(options['workers'])
+        ]
+        for n, customer in enumerate(self.customers):
+            Order.objects.annotate(bucket=Mod('id', len(self.customers))).filter(bucket=n).update(user=customer)
+        self.staff = User.objects.create_user('bench-staff', password='bench', is_staff=True)
+        self.stdout.write(
+            f"Seed {options['products']} sản phẩm, {options['orders']} đơn trong {time.perf_counter() - started:.1f}s\n"
+        )
+
+    def scenarios(self):
+        category_ids = list(Category.objects.order_by('id').values_list('id', flat=True))
+        skus = list(ProductSize.objects.order_by('id').values_list('product_id', 'size__name')[:50])
+
+        def add_to_cart(client, i):
+            product_id, size = skus[i % 20]
+            return client.post(
+                '/orders/cart/api/', json.dumps({'product_id': product_id, 'size_id': size, 'quantity': 1}),
+                content_type='application/json',
+            )
+
+        def checkout(client, i):
+            items = [
+                {'product_id': product_id, 'size_id': size, 'quantity': 1}
+                for product_id, size in (skus[(i + k * 7) % len(skus)] for k in range(3))
+            ]
+            payload = {'receiver': 'Bench', 'phone': '0900000000', 'address': 'HCM', 'items': items}
+            return client.post('/orders/process-checkout/', json.dumps(payload), content_type='application/json')
+
+        return [
+            Scenario('home', 'anonymous', lambda client, i: client.get('/')),
+            Scenario('search', 'anonymous', lambda client, i: client.get(
+                '/products/', {'search': SEARCH_TERMS[i % len(SEARCH_TERMS)]}
+            )),
+            Scenario('category', 'anonymous', lambda client, i: client.get(
+                f'/products/category/{category_ids[i % len(category_ids)]}/', {'page': i % 5 + 1}
+            )),
+            Scenario('cart', 'customer', add_to_cart),
+            Scenario('checkout', 'customer', checkout),
+            Scenario('my-orders', 'customer', lambda client, i: client.get('/orders/my-orders/')),
+            Scenario('management', 'staff', lambda client, i: client.get('/management/')),
+        ]
+
+    def run_scenario(self, scenario, options):
+        local = threading.local()
+        customers = itertools.cycle(self.customers)
+        lock = threading.Lock()
+
+        def client():
+            if not hasattr(local, 'client'):
+                local.client = Client()
+                if scenario.login == 'customer':
+                    with lock:
+                        local.client.force_login(next(customers))
+                elif scenario.login == 'staff':
+                    local.client.force_login(self.staff)
+            return local.client
+
+        def call(i):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = scenario.call(client(), i)
+                latency = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                raise RuntimeError(f"{scenario.name}: HTTP {response.status_code}")
+            return latency, len(ctx.captured_queries)
+
+        for i in range(options['warmup']):
+            call(i)
+        elapsed, results = run_concurrently(call, options['workers'], options['requests'])
+        ok = [result for result in results if isinstance(result, tuple)]
+        latencies = sorted(latency for latency, _ in ok)
+        queries = [count for _, count in ok]
+        return {
+            'requests': len(results),
+            'errors': len(results) - len(ok),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(ok) / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_mean': round(sum(queries) / len(queries), 2) if queries else 0,
+            'queries_max': max(queries, default=0),
+        }
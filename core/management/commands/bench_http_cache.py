@@ -0,0 +1,108 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.bench import benchmark_database, percentile, seed_catalog
+from products.models import Category, Product
+from products.search import rebuild_index
+
+SEARCHES = ('ao thun', 'quan jean', 'xanh navy', 'slimfit')
+
+
+class Command(BaseCommand):
+    help = (
+        "Phát lại một luồng truy cập storefront của khách chưa đăng nhập, có và không có "
+        "If-None-Match: số byte gửi đi, CPU và số query"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--visitors', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=3000)
+        parser.add_argument('--write-every', type=int, default=500, help="Sửa một sản phẩm sau mỗi N request")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def replay_log(self, options):
+        """Danh sách (khách, URL) hoặc (None, None) cho một lần sửa catalog; cùng seed là cùng luồng"""
+        rng = random.Random(options['seed'])
+        categories = list(Category.objects.values_list('id', flat=True))
+        pages = (
+            [('/', 30), ('/contact/', 5)]
+            + [(f'/products/?page={page}', 4) for page in range(2, 6)]
+            + [(f'/products/category/{category_id}/', 3) for category_id in categories]
+            + [(f'/products/?search={query.replace(" ", "+")}', 2) for query in SEARCHES]
+        )
+        urls, weights = zip(*pages)
+        log = []
+        for number in range(1, options['requests'] + 1):
+            # Khách quay lại nhiều hơn khách mới (phân bố lệch về các khách đầu)
+            visitor = min(int(rng.paretovariate(1.2)) - 1, options['visitors'] - 1)
+            log.append((visitor, rng.choices(urls, weights)[0]))
+            if number % options['write_every'] == 0:
+                log.append((None, None))
+        return log
+
+    def replay(self, log, visitors, revalidate):
+        cache.clear()
+        clients = [Client() for _ in range(visitors)]
+        etags = [{} for _ in range(visitors)]
+        statuses, sizes, timings = {}, 0, []
+        product = Product.objects.order_by('id').first()
+        cpu = time.process_time()
+        with CaptureQueriesContext(connection) as queries:
+            for visitor, url in log:
+                if visitor is None:
+                    product.price += 1
+                    product.save()
+                    continue
+                headers = {}
+                if revalidate and url in etags[visitor]:
+                    headers['HTTP_IF_NONE_MATCH'] = etags[visitor][url]
+                started = time.perf_counter()
+                response = clients[visitor].get(url, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code == 200 and response.has_header('ETag'):
+                    etags[visitor][url] = response['ETag']
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                sizes += len(response.content)
+        cpu = (time.process_time() - cpu) * 1000
+        timings.sort()
+        return {
+            'statuses': statuses,
+            'bytes': sizes,
+            'cpu_ms': cpu,
+            'queries': len(queries),
+            'p50': percentile(timings, 50),
+            'p99': percentile(timings, 99),
+        }
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            rebuild_index()
+            log = self.replay_log(options)
+            requests = sum(visitor is not None for visitor, _ in log)
+            self.stdout.write(
+                f"{requests} request từ {options['visitors']} khách, "
+                f"sửa catalog {len(log) - requests} lần\n"
+            )
+            self.stdout.write(
+                f"{'chế độ':<16} {'304':>6} {'KB gửi':>9} {'CPU ms':>9} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}"
+            )
+            results = {}
+            for label, revalidate in (('không ETag', False), ('If-None-Match', True)):
+                result = results[label] = self.replay(log, options['visitors'], revalidate)
+                self.stdout.write(
+                    f"{label:<16} {result['statuses'].get(304, 0):>6} {result['bytes'] / 1024:>9.0f} "
+                    f"{result['cpu_ms']:>9.0f} {result['queries']:>8} {result['p50']:>8.2f} {result['p99']:>8.2f}"
+                )
+            before, after = results['không ETag'], results['If-None-Match']
+            self.stdout.write(
+                f"\nGiảm {(1 - after['bytes'] / before['bytes']) * 100:.0f}% byte, "
+                f"{(1 - after['cpu_ms'] / before['cpu_ms']) * 100:.0f}% CPU"
+            )
@@ -0,0 +1,142 @@
+"""So sánh kế hoạch truy vấn (EXPLAIN) và thời gian của các truy vấn nóng trước/sau các index
+của ``products.0008`` và ``orders.0011``.
+
+Lệnh seed catalog/đơn hàng giả lập, xoá các index mới, chạy ``ANALYZE`` rồi in EXPLAIN và
+thời gian p50 của từng truy vấn; sau đó tạo lại index và đo lại. EXPLAIN là của database
+đang cấu hình (SQLite: ``EXPLAIN QUERY PLAN``, MySQL: ``EXPLAIN``) nên cùng lệnh này chạy
+trên MySQL in ra kế hoạch của MySQL. Kết quả trên SQLite và dạng tương ứng trên MySQL:
+
+============================ ========================================= ==================================
+truy vấn                     SQLite trước -> sau                       MySQL sau (EXPLAIN)
+============================ ========================================= ==================================
+đếm sản phẩm hiển thị        SCAN products -> SCAN products USING      key=product_visible_idx,
+(Paginator ``?page=``)       COVERING INDEX product_visible_idx        type=ref, Extra "Using index"
+đếm sản phẩm của danh mục    SEARCH ... INDEX products_category_id_... key=product_visible_idx, type=ref,
+                             -> SEARCH ... COVERING INDEX              Extra "Using index"
+                             product_visible_idx (... category_id=?)
+admin: lọc trạng thái,       SCAN orders USING INDEX order_created_idx key=order_status_created_idx,
+sắp theo -created_at         -> SEARCH ... order_status_created_idx    type=ref, "Backward index scan"
+                             (status=?)
+trạng thái + khoảng ngày     SEARCH ... order_created_idx (created_at  key=order_status_created_idx,
+                             >?) -> ... (status=? AND created_at>?)    type=range
+quản lý: sắp theo tên        SCAN products + USE TEMP B-TREE FOR       key=product_name_idx, type=index,
+                             ORDER BY -> SCAN ... product_name_idx     không "Using filesort"
+============================ ========================================= ==================================
+
+Trang sản phẩm có LIMIT (trang chủ, ``?after=``, trang danh mục) giữ nguyên kế hoạch: quét
+theo khoá chính hoặc index FK ``category_id`` (đã kèm id) dừng ngay sau 12 dòng, nhanh hơn
+đi qua index bắt đầu bằng cột boolean ``hide``.
+
+Không dùng partial index (``Index(condition=...)``): MySQL không hỗ trợ, Django bỏ qua
+index đó trên MySQL. Đặt cột lọc lên đầu index ghép cho cùng hiệu quả trên cả ba database.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog, seed_orders
+from orders.models import Order
+from products.catalog import visible_products
+from products.models import Category, Product
+
+NEW_INDEXES = [
+    (Product, 'product_visible_idx'),
+    (Product, 'product_name_idx'),
+    (Order, 'order_status_created_idx'),
+]
+ANALYZE = {
+    'sqlite': ['ANALYZE'],
+    'mysql': ['ANALYZE TABLE products', 'ANALYZE TABLE orders'],
+    'postgresql': ['ANALYZE products', 'ANALYZE orders'],
+}
+
+
+def _index(model, name):
+    return next(index for index in model._meta.indexes if index.name == name)
+
+
+def _explain(queryset, count=False):
+    """Kế hoạch của ``queryset`` (hoặc của ``SELECT COUNT(*)`` trên nó), mỗi bước một dòng"""
+    if not count:
+        return queryset.explain().splitlines()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} SELECT COUNT(*) FROM ({sql}) subquery", params)
+        return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = "In EXPLAIN và thời gian của các truy vấn storefront/admin trước và sau khi thêm index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50_000)
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--hidden-ratio', type=float, default=0.2, help="Tỉ lệ sản phẩm bị ẩn")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            seed_orders(options['orders'], lines=2)
+            # Như thực tế: chỉ các đơn vài ngày gần đây còn chờ xác nhận
+            Order.objects.filter(created_at__gte=timezone.now() - datetime.timedelta(days=3)).update(status='pending')
+            Product.objects.annotate(bucket=Mod('id', 100)).filter(
+                bucket__lt=round(options['hidden_ratio'] * 100),
+            ).update(hide=True)
+
+            queries = self.queries()
+            with connection.schema_editor() as editor:
+                for model, name in NEW_INDEXES:
+                    editor.remove_index(model, _index(model, name))
+            before = self.run(queries, "TRƯỚC (chỉ PK/FK và index cũ)", options['repeat'])
+
+            with connection.schema_editor() as editor:
+                for model, name in NEW_INDEXES:
+                    editor.add_index(model, _index(model, name))
+            after = self.run(queries, "SAU (có index mới)", options['repeat'])
+
+            self.stdout.write(f"\n{'truy vấn':<34} {'trước ms':>9} {'sau ms':>9} {'x':>7}")
+            for label, *_ in queries:
+                speedup = before[label] / after[label] if after[label] else 0
+                self.stdout.write(f"{label:<34} {before[label]:>9.2f} {after[label]:>9.2f} {speedup:>7.1f}")
+
+    @staticmethod
+    def queries():
+        """(tên, queryset, True nếu đo ``count()`` thay vì đọc các dòng)"""
+        category_id = Category.objects.order_by('id').values_list('id', flat=True)[3]
+        middle = Product.objects.order_by('id').values_list('id', flat=True)[Product.objects.count() // 2]
+        since = timezone.now() - datetime.timedelta(days=30)
+        return [
+            ('trang chủ', visible_products()[:12], False),
+            ('xem thêm (after=<id>)', visible_products().filter(id__gt=middle)[:12], False),
+            ('trang danh mục', visible_products(category_id)[:12], False),
+            ('đếm: sản phẩm hiển thị', visible_products(), True),
+            ('đếm: sản phẩm của danh mục', visible_products(category_id), True),
+            ('admin: đơn chờ xác nhận', Order.objects.filter(status='pending')[:100], False),
+            ('admin: huỷ trong 30 ngày', Order.objects.filter(status='cancelled', created_at__gte=since)[:100], False),
+            ('quản lý: sắp theo tên', Product.objects.order_by('name', 'id')[:20], False),
+        ]
+
+    def run(self, queries, title, repeat):
+        with connection.cursor() as cursor:
+            for sql in ANALYZE.get(connection.vendor, []):
+                cursor.execute(sql)
+        reset_queries()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {title} =="))
+        results = {}
+        for label, queryset, count in queries:
+            self.stdout.write(f"\n{label}:")
+            for line in _explain(queryset, count):
+                self.stdout.write(f"    {line}")
+            # all() bỏ cache kết quả của queryset để mỗi lần đo đều chạy lại truy vấn
+            if count:
+                timings, _ = measure(lambda: queryset.all().count(), repeat=repeat)
+            else:
+                timings, _ = measure(lambda: list(queryset.all()), repeat=repeat)
+            results[label] = percentile(timings, 50)
+        return results
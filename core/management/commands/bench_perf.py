@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core import perf
+from core.bench import benchmark_database, percentile, seed_catalog, seed_orders
+from products.search import rebuild_index
+
+RATES = (0, 0.1, 1)
+
+
+class Command(BaseCommand):
+    help = "Chi phí thêm của PerfMiddleware theo tỉ lệ lấy mẫu PERF_SAMPLE_RATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=300, help="Số request đo mỗi trang và tỉ lệ")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            seed_orders(2000, lines=3)
+            rebuild_index()
+            client = Client()
+            pages = [
+                ('home (lưới đã cache)', '/'),
+                ('tìm kiếm', '/products/?search=ao+thun'),
+                ('trang 5', '/products/?page=5'),
+            ]
+
+            self.stdout.write(f"{'trang':<22} {'tỉ lệ':>6} {'p50 ms':>8} {'p99 ms':>8} {'thêm p50':>9}")
+            for label, url in pages:
+                for _ in range(20):
+                    client.get(url)
+                timings = {rate: [] for rate in RATES}
+                # Xen kẽ các tỉ lệ trong từng lượt để nhiễu của máy chia đều cho các tỉ lệ
+                for _ in range(options['repeat']):
+                    for rate in RATES:
+                        with override_settings(PERF_SAMPLE_RATE=rate):
+                            started = time.perf_counter()
+                            client.get(url)
+                            timings[rate].append((time.perf_counter() - started) * 1000)
+                baseline = percentile(timings[0], 50)
+                for rate in RATES:
+                    p50 = percentile(timings[rate], 50)
+                    self.stdout.write(
+                        f"{label:<22} {rate:>6} {p50:>8.3f} {percentile(timings[rate], 99):>8.3f} "
+                        f"{(p50 / baseline - 1) * 100:>8.1f}%"
+                    )
+
+            stats = perf.registry.as_json()['views']
+            self.stdout.write(
+                f"\nĐã ghi {sum(row['requests'] for row in stats)} request: "
+                + ', '.join(f"{row['route']} ({row['requests']})" for row in stats)
+            )
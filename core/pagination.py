@@ -0,0 +1,51 @@
+"""Phân trang bảng lớn bằng số dòng ước lượng thay cho ``COUNT(*)``.
+
+``COUNT(*)`` trên bảng hàng triệu dòng phải duyệt cả bảng (InnoDB không lưu sẵn số dòng),
+trong khi trang danh sách chỉ cần số trang gần đúng. Khi queryset không có điều kiện lọc,
+``EstimatedCountPaginator`` đọc số dòng ước lượng mà database đã thống kê sẵn; bảng nhỏ
+(dưới ``threshold``) hoặc queryset đã lọc vẫn đếm chính xác.
+"""
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+ESTIMATE_QUERIES = {
+    'mysql': (
+        "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    ),
+    'postgresql': "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+    # Chỉ có sau khi chạy ANALYZE; số đầu tiên của cột stat là số dòng của bảng
+    'sqlite': "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+}
+
+
+def estimated_count(model, using='default'):
+    """Số dòng ước lượng của bảng ``model``, hoặc None nếu database không có thống kê"""
+    connection = connections[using]
+    sql = ESTIMATE_QUERIES.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    value = int(str(row[0]).split()[0])
+    return value if value >= 0 else None  # PostgreSQL trả -1 khi bảng chưa được ANALYZE
+
+
+class EstimatedCountPaginator(Paginator):
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
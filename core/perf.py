@@ -0,0 +1,239 @@
+"""Đo chi phí của từng request, gom theo view (route URL) thành histogram trong bộ nhớ của process.
+
+``PerfMiddleware`` (đặt đầu ``MIDDLEWARE``) đo thời gian xử lý, số query và thời gian DB
+(qua ``connection.execute_wrapper``), thời gian render template (backend ``DjangoTemplates``
+của module này) và kích thước response. Câu SQL giống hệt nhau chạy từ
+``PERF_DUPLICATE_THRESHOLD`` lần trở lên trong một request được ghi lại như dấu hiệu N+1.
+
+Chỉ request được chọn mẫu (tỉ lệ ``PERF_SAMPLE_RATE``, 0 là tắt) mới bị đo; request còn lại
+chỉ tốn một lần gọi ``random()``. Histogram dùng các mốc cố định nên bộ nhớ không tăng theo
+số request. Số liệu là của riêng từng process và mất khi process khởi động lại; xem ở
+``/management/perf/`` hoặc xuất JSON ở ``/management/perf.json``.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.utils import timezone
+
+TIME_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BOUNDS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+MAX_DUPLICATES_PER_VIEW = 20
+UNRESOLVED_VIEW = '<unresolved>'
+
+_current = contextvars.ContextVar('perf_sample', default=None)
+
+
+class Histogram:
+    """Đếm số đo theo các mốc ``bounds`` (mốc là cận trên, thêm một ô cho giá trị vượt mốc cuối)"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """Cận trên của ô chứa phân vị ``pct``; ô cuối trả về giá trị lớn nhất đã gặp"""
+        if not self.count:
+            return 0
+        rank = self.count * pct / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 2)
+        return round(self.max, 2)
+
+    def as_json(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else 0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': round(self.max, 2),
+            # [cận trên, số lần]; cận trên null là ô vượt mốc cuối
+            'buckets': [[bound, count] for bound, count in zip(self.bounds + (None,), self.counts) if count],
+        }
+
+
+class Sample:
+    """Số đo của một request đang chạy"""
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+
+class ViewStats:
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.wall = Histogram(TIME_BOUNDS_MS)
+        self.db = Histogram(TIME_BOUNDS_MS)
+        self.templates = Histogram(TIME_BOUNDS_MS)
+        self.queries = Histogram(QUERY_BOUNDS)
+        self.size = Histogram(SIZE_BOUNDS)
+        self.duplicates = {}  # sql -> [số request bị lặp, số lần lặp nhiều nhất trong một request]
+
+    def add(self, sample, wall, status, size, threshold):
+        self.requests += 1
+        self.errors += status >= 500
+        self.wall.add(wall * 1000)
+        self.db.add(sample.db_time * 1000)
+        self.queries.add(sample.queries)
+        if sample.template_time:
+            self.templates.add(sample.template_time * 1000)
+        if size is not None:
+            self.size.add(size)
+        for sql, repeat in sample.statements.items():
+            if repeat < threshold:
+                continue
+            seen = self.duplicates.get(sql)
+            if seen is None:
+                if len(self.duplicates) >= MAX_DUPLICATES_PER_VIEW:
+                    continue
+                seen = self.duplicates[sql] = [0, 0]
+            seen[0] += 1
+            seen[1] = max(seen[1], repeat)
+
+    def as_json(self, route):
+        return {
+            'view': self.name,
+            'route': route,
+            'requests': self.requests,
+            'errors': self.errors,
+            'wall_ms': self.wall.as_json(),
+            'db_ms': self.db.as_json(),
+            'template_ms': self.templates.as_json(),
+            'queries': self.queries.as_json(),
+            'response_bytes': self.size.as_json(),
+            'duplicates': [
+                {'sql': sql, 'requests': requests, 'max_repeat': repeat}
+                for sql, (requests, repeat) in sorted(self.duplicates.items(), key=lambda item: -item[1][0])
+            ],
+        }
+
+
+class PerfRegistry:
+    """Số liệu theo view của process hiện tại; mỗi request đã đo chỉ giữ lock một lần"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.since = timezone.now()
+
+    def record(self, route, name, sample, wall, status, size):
+        threshold = settings.PERF_DUPLICATE_THRESHOLD
+        with self.lock:
+            stats = self.views.get(route)
+            if stats is None:
+                stats = self.views[route] = ViewStats(name)
+            stats.add(sample, wall, status, size, threshold)
+
+    def as_json(self):
+        with self.lock:
+            views = [stats.as_json(route) for route, stats in self.views.items()]
+            since = self.since
+        views.sort(key=lambda row: -row['wall_ms']['mean'] * row['requests'])
+        return {
+            'since': since.isoformat(),
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'duplicate_threshold': settings.PERF_DUPLICATE_THRESHOLD,
+            'views': views,
+        }
+
+
+registry = PerfRegistry()
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        sample = Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample.execute))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        wall = time.perf_counter() - started
+
+        # Gom theo route thay vì tên URL: nhiều route trùng tên (vd. 'home'); request 404
+        # chung một nhóm để URL rác không làm phình số nhóm
+        match = getattr(request, 'resolver_match', None)
+        if match:
+            route, name = '/' + match.route, match.view_name
+        else:
+            route = name = UNRESOLVED_VIEW
+        size = None if response.streaming else len(response.content)
+        registry.record(route, name, sample, wall, response.status_code, size)
+        return response
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None or sample.template_depth:
+            return super().render(context, request)
+        # Chỉ đo template ngoài cùng: render_to_string lồng bên trong đã nằm trong thời gian này
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_depth -= 1
+            sample.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Backend template mặc định của Django, đo thời gian render cho ``PerfMiddleware``"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
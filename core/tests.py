@@ -1,3 +1,165 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from core import perf
+from core.bench import seed_catalog
+from core.http_cache import storefront_cache
+from products.models import Category, Product, Size
+
+
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        perf.registry.reset()
+
+    def stats(self, route):
+        return next(row for row in perf.registry.as_json()['views'] if row['route'] == route)
+
+    def test_records_queries_templates_and_size_per_view(self):
+        seed_catalog(5)
+        response = self.client.get('/')
+        home = self.stats('/')
+        self.assertEqual(home['requests'], 1)
+        self.assertGreater(home['queries']['max'], 0)
+        self.assertEqual(home['template_ms']['count'], 1)
+        self.assertEqual(home['response_bytes']['max'], len(response.content))
+        self.assertEqual(home['duplicates'], [])
+
+        # products.urls cũng đặt tên 'home' cho /products/: vẫn là hai nhóm riêng
+        self.client.get('/products/')
+        routes = {row['route']: row['view'] for row in perf.registry.as_json()['views']}
+        self.assertEqual(routes, {'/': 'home', '/products/': 'home'})
+
+    def test_repeated_statement_is_reported_as_duplicate(self):
+        def n_plus_one(request):
+            for user_id in range(4):
+                User.objects.filter(pk=user_id).exists()
+            return HttpResponse('ok')
+
+        perf.PerfMiddleware(n_plus_one)(RequestFactory().get('/x'))
+        [duplicate] = self.stats(perf.UNRESOLVED_VIEW)['duplicates']
+        self.assertEqual((duplicate['requests'], duplicate['max_repeat']), (1, 4))
+        self.assertIn('auth_user', duplicate['sql'])
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling_off_records_nothing(self):
+        self.client.get('/contact/')
+        self.assertEqual(perf.registry.as_json()['views'], [])
+
+    def test_histogram_percentiles_use_bucket_bounds(self):
+        histogram = perf.Histogram((10, 100))
+        for value in (1, 2, 3, 50, 5000):
+            histogram.add(value)
+        self.assertEqual((histogram.percentile(50), histogram.percentile(80), histogram.percentile(99)), (10, 100, 5000))
+
+    def test_endpoint_is_staff_only_and_resettable(self):
+        self.client.get('/contact/')
+        self.client.force_login(User.objects.create_user('khach', password='x'))
+        self.assertEqual(self.client.get('/management/perf.json').status_code, 302)
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        data = self.client.get('/management/perf.json').json()
+        self.assertIn('/contact/', [row['route'] for row in data['views']])
+        self.assertContains(self.client.get('/management/perf/'), 'contact')
+        self.client.post('/management/perf/')
+        # Chỉ còn chính request xoá số liệu (được ghi sau khi xoá)
+        self.assertEqual([row['view'] for row in perf.registry.as_json()['views']], ['management_perf'])
+
+
+class BenchRegressionTests(TestCase):
+    def test_reports_only_metrics_worse_than_threshold(self):
+        from core.management.commands.bench import _regressions
+
+        old = {'p95_ms': 10, 'rps': 100, 'queries_mean': 4, 'errors': 0}
+        baseline = {'scenarios': {'home': old, 'cart': old}}
+        results = {
+            'home': {**old, 'p95_ms': 11.5, 'rps': 90},  # trong ngưỡng 20%
+            'cart': {**old, 'p95_ms': 13, 'queries_mean': 6, 'errors': 1},
+            'search': {**old, 'p95_ms': 1000},  # không có trong baseline
+        }
+        found = _regressions(results, baseline, 20)
+        self.assertEqual([line.split(' (')[0] for line in found], [
+            'cart: p95 ms 13.00', 'cart: query/request 6.00', 'cart: 1 lỗi',
+        ])
+
+
+class StorefrontHttpCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_catalog(5)
+
+    def test_anonymous_page_is_revalidated_with_304_before_the_view_runs(self):
+        response = self.client.get('/')
+        etag = response['ETag']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Vary'], 'Cookie')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=60', response['Cache-Control'])
+        self.assertEqual(response['Surrogate-Key'], 'storefront catalog')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('s-maxage=60', response['Cache-Control'])
+
+        # Trang khác nhau nhưng cùng phiên bản catalog: cùng ETag, CDN/trình duyệt phân biệt theo URL
+        self.assertEqual(self.client.get('/products/?page=2')['ETag'], etag)
+
+    def test_catalog_change_invalidates_etag(self):
+        etag = self.client.get('/products/')['ETag']
+        product = Product.objects.first()
+        product.price += 1
+        product.save()
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Size.objects.create(name='XXXL')
+        self.assertEqual(self.client.get('/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_page_has_category_surrogate_key(self):
+        category_id = Category.objects.first().id
+        response = self.client.get(f'/products/category/{category_id}/')
+        self.assertEqual(response['Surrogate-Key'], f'storefront catalog category-{category_id}')
+
+    def test_logged_in_user_gets_private_page_without_validators(self):
+        user = User.objects.create_user('khach', password='x')
+        self.client.force_login(user)
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Surrogate-Key', response)
+        self.assertEqual(response['Vary'], 'Cookie')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('s-maxage', response['Cache-Control'])
+        self.assertContains(response, 'khach')
+
+    def test_pending_messages_disable_validators(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request._messages = CookieStorage(request)
+        messages.info(request, 'Đã gửi!')
+        response = storefront_cache('catalog')(lambda request: HttpResponse('ok'))(request)
+        self.assertNotIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_csrf_page_is_private_and_etag_follows_csrf_cookie(self):
+        response = self.client.get('/contact/')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('s-maxage', response['Cache-Control'])
+        self.assertNotIn('Surrogate-Key', response)
+
+        # Lần đầu chưa có cookie CSRF; từ lần sau ETag gắn với cookie vừa nhận
+        etag = self.client.get('/contact/')['ETag']
+        self.assertEqual(self.client.get('/contact/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.cookies.pop(settings.CSRF_COOKIE_NAME)
+        self.assertEqual(self.client.get('/contact/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,20 +1,19 @@
 # core/views.py
 from django.shortcuts import render
-from products.models import Product, Category, Size
-from django.core.paginator import Paginator
+from core.http_cache import storefront_cache
+from products.reference import active_categories, all_sizes
+from products.catalog import product_grid
+from products.snapshot import listing_products
+@storefront_cache('catalog')
 def home(request):
-    categories = Category.objects.filter(hide=False)
-    products = Product.objects.filter(hide=False)
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    sizes = Size.objects.all()
+    categories = active_categories()
+    sizes = all_sizes()
     return render(request, "home.html", {
         "categories": categories,
-        "products": products,
-        "page_obj": page_obj,
         "sizes": sizes,
+        "product_grid": product_grid(request, listing_products),
     })
 
+@storefront_cache(csrf=True)
 def contact(request):
     return render(request, "contact.html")
\ No newline at end of file
@@ -7,8 +7,9 @@ from products.models import Product
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ['category', 'name', 'price', 'image', 'hide']
+        fields = ['category', 'code', 'name', 'price', 'image', 'hide']
         widgets = {
+            'code': forms.TextInput(attrs={'class': 'form__control'}),
             'name': forms.TextInput(attrs={'class': 'form__control', 'required': True}),
             'price': forms.NumberInput(attrs={'class': 'form__control', 'required': True}),
             'category': forms.Select(attrs={'class': 'form__control', 'required': True}),
@@ -0,0 +1,105 @@
+"""Bảng người dùng và sản phẩm của trang quản lý: lọc, sắp xếp và phân trang trên server.
+
+Mỗi bảng có tham số GET riêng (tiền tố ``user_``/``product_``) nên hai bảng phân trang
+độc lập. Số query của một trang không phụ thuộc số dòng: sản phẩm join sẵn ``category``
+và prefetch ``sizes__size``.
+"""
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+
+from products.models import Product, ProductSize
+
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+USER_SORTS = {
+    'username': 'username',
+    'joined': 'date_joined',
+    'role': 'is_staff',
+}
+PRODUCT_SORTS = {
+    'id': 'id',
+    'name': 'name',
+    'price': 'price',
+    'category': 'category__name',
+}
+
+
+def _ordering(value, sorts, default):
+    """``?sort=price`` hoặc ``?sort=-price``; giá trị không hợp lệ dùng ``default``"""
+    field = sorts.get((value or '').lstrip('-'))
+    if field is None:
+        return default
+    return ('-' + field if value.startswith('-') else field), 'id'
+
+
+def filter_users(params):
+    users = User.objects.all()
+    search = params.get('search_user', '').strip()
+    if search:
+        users = users.filter(username__icontains=search)
+    role = params.get('user_role')
+    if role == 'admin':
+        users = users.filter(is_staff=True)
+    elif role == 'customer':
+        users = users.filter(is_staff=False)
+    return users.order_by(*_ordering(params.get('user_sort'), USER_SORTS, ('id',)))
+
+
+def filter_products(params):
+    products = Product.objects.select_related('category').prefetch_related(
+        Prefetch('sizes', queryset=ProductSize.objects.filter(active=True).select_related('size').order_by('size_id'))
+    )
+    search = params.get('search_product', '').strip()
+    if search:
+        products = products.filter(name__icontains=search)
+    category = params.get('product_category')
+    if category and category.isdigit():
+        products = products.filter(category_id=int(category))
+    hidden = params.get('product_hidden')
+    if hidden in ('0', '1'):
+        products = products.filter(hide=hidden == '1')
+    return products.order_by(*_ordering(params.get('product_sort'), PRODUCT_SORTS, ('-id',)))
+
+
+def paginate(queryset, params, prefix):
+    """Trang hiện tại theo ``?<prefix>_page=`` và ``?<prefix>_per_page=``"""
+    try:
+        per_page = min(max(int(params.get(f'{prefix}_per_page', PER_PAGE)), 1), MAX_PER_PAGE)
+    except ValueError:
+        per_page = PER_PAGE
+    return Paginator(queryset, per_page).get_page(params.get(f'{prefix}_page'))
+
+
+def user_json(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'is_staff': user.is_staff,
+        'date_joined': user.date_joined.isoformat(),
+    }
+
+
+def product_json(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': float(product.price),
+        'hide': product.hide,
+        'category': {'id': product.category_id, 'name': product.category.name},
+        'image': product.image.url if product.image else '',
+        'sizes': [
+            {'id': ps.size_id, 'name': ps.size.name, 'quantity': ps.quantity}
+            for ps in product.sizes.all()
+        ],
+    }
+
+
+def page_json(page, serialize):
+    return {
+        'results': [serialize(obj) for obj in page.object_list],
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'count': page.paginator.count,
+    }
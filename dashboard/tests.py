@@ -1,3 +1,126 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.bench import seed_catalog
+from dashboard.tables import PER_PAGE
+from orders.cart import add_item, cache_key as cart_key, cart_snapshot
+from orders.checkout import CheckoutError, resolve_lines
+from orders.models import CartItem, Order, OrderItem
+from products.models import Product, ProductSize, Size
+from products.sizes import sync_product_sizes
+
+
+class ManagementDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(3000, n_categories=5)
+        User.objects.bulk_create(User(username=f'khach{i}') for i in range(60))
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_query_count_does_not_depend_on_catalog_size(self):
+        # session, user, 2 x (count + trang), size + tồn kho của trang sản phẩm
+        with self.assertNumQueries(7):
+            response = self.client.get('/management/')
+        self.assertEqual(len(response.context['products']), PER_PAGE)
+        self.assertEqual(response.context['product_page'].paginator.count, 3000)
+        with self.assertNumQueries(7):
+            self.client.get('/management/?product_page=100&user_page=3')
+
+    def test_tables_page_independently(self):
+        response = self.client.get('/management/?user_page=2&product_page=3')
+        self.assertEqual(response.context['user_page'].number, 2)
+        self.assertEqual(response.context['product_page'].number, 3)
+
+    def test_products_json_sort_and_filter(self):
+        data = self.client.get(
+            '/management/products.json', {'search_product': 'Jean', 'product_sort': '-price', 'product_per_page': 5}
+        ).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(data['count'], Product.objects.filter(name__icontains='Jean').count())
+        prices = [row['price'] for row in data['results']]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+        self.assertEqual([size['name'] for size in data['results'][0]['sizes']], ['S', 'M', 'L', 'XL'])
+
+    def test_users_json_filters_role(self):
+        data = self.client.get('/management/users.json', {'user_role': 'admin'}).json()
+        self.assertEqual([row['username'] for row in data['results']], ['admin'])
+
+    def test_customers_are_redirected(self):
+        self.client.force_login(User.objects.get(username='khach0'))
+        self.assertEqual(self.client.get('/management/products.json').status_code, 302)
+
+
+class EditProductSizesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(1)
+        cls.product = Product.objects.get()
+        cls.sizes = list(Size.objects.order_by('id'))
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.buyer = User.objects.create_user('buyer', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.rows = {ps.size_id: ps for ps in self.product.sizes.all()}
+
+    def post(self, quantities):
+        return self.client.post(f'/management/edit_product/{self.product.id}/', {
+            'category': self.product.category_id, 'code': '', 'name': self.product.name,
+            'price': self.product.price,
+            'sizes[]': list(quantities), 'quantities[]': list(quantities.values()),
+        })
+
+    def test_diff_keeps_rows_and_retires_sold_sizes(self):
+        kept, changed, sold, in_cart = self.sizes[:4]
+        order = Order.objects.create(
+            user=self.buyer, receiver='A', phone='1', address='X', total_amount=self.product.price,
+        )
+        OrderItem.objects.create(order=order, product_size=self.rows[sold.id], quantity=1, price=self.product.price)
+        add_item(self.buyer, self.rows[in_cart.id])
+        cart_snapshot(self.buyer)
+
+        response = self.post({kept.id: 100, changed.id: 7})
+        self.assertRedirects(response, reverse('management'), fetch_redirect_response=False)
+
+        rows = {ps.size_id: ps for ps in ProductSize.objects.filter(product=self.product)}
+        self.assertEqual(set(rows), {kept.id, changed.id, sold.id})
+        self.assertEqual(rows[kept.id].pk, self.rows[kept.id].pk)
+        self.assertEqual((rows[changed.id].pk, rows[changed.id].quantity), (self.rows[changed.id].pk, 7))
+        self.assertEqual((rows[sold.id].active, rows[sold.id].quantity), (False, 0))
+        self.assertFalse(CartItem.objects.exists())
+        self.assertIsNone(cache.get(cart_key(self.buyer.id)))
+
+        # Size đã ngừng bán không đặt được, chọn lại thì mở bán lại đúng dòng cũ
+        with self.assertRaises(CheckoutError):
+            resolve_lines([(self.product.id, sold.id, 1)])
+        self.post({kept.id: 100, changed.id: 7, sold.id: 5})
+        row = ProductSize.objects.get(product=self.product, size=sold)
+        self.assertEqual((row.pk, row.active, row.quantity), (self.rows[sold.id].pk, True, 5))
+
+    def test_invalid_size_or_quantity_rerenders_form(self):
+        before = list(ProductSize.objects.filter(product=self.product).values_list('size_id', 'quantity', 'active'))
+        for quantities in ({self.sizes[0].id: 'abc'}, {self.sizes[0].id: ' 1x'}, {'x': 1}, {10 ** 6: 1},
+                           {self.sizes[0].id: 2 ** 40}):
+            response = self.post(quantities)
+            self.assertEqual(response.status_code, 200, quantities)
+            self.assertContains(response, 'Size hoặc số lượng không hợp lệ')
+        after = list(ProductSize.objects.filter(product=self.product).values_list('size_id', 'quantity', 'active'))
+        self.assertEqual(after, before)
+
+    def test_query_count_does_not_depend_on_size_count(self):
+        extra = Size.objects.bulk_create(Size(name=f'X{i}') for i in range(10))
+        few = {size.id: 1 for size in self.sizes[:1] + extra[:1]}
+        many = {size.id: 2 for size in self.sizes + extra[1:]}
+        # savepoint x2, đọc size, lịch sử đơn hàng, bulk_update, bulk_create,
+        # xoá (đọc size + OrderItem + CartItem, DELETE), xoá cache giỏ hàng
+        with self.assertNumQueries(11):
+            sync_product_sizes(self.product, few)
+        with self.assertNumQueries(11):
+            sync_product_sizes(self.product, many)
+        self.assertFalse(sync_product_sizes(self.product, many))
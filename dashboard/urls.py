@@ -4,12 +4,19 @@ from . import views
 
 urlpatterns = [
     path('', management, name='management'),
+    path('users.json', users_json, name='management_users_json'),
+    path('products.json', products_json, name='management_products_json'),
+    path('analytics/<slug:report>.json', analytics_json, name='management_analytics_json'),
+    path('perf/', perf_view, name='management_perf'),
+    path('perf.json', perf_json, name='management_perf_json'),
 
     path("create-user/", create_user, name="create_user"),
     path('edit-user/<int:user_id>/', edit_user, name='edit_user'),
     path('delete_user/<int:user_id>/', delete_user, name='delete_user'),
 
     path("add_product/", add_product, name='add_product'),
+    path("import_products/", import_products_view, name='import_products'),
+    path("export_products/", export_products_view, name='export_products'),
     path('edit_product/<int:product_id>/', edit_product, name='edit_product'),
     path('login/', views.login_view, name='login'),
     path('signup/', views.signup_view, name='signup'),
@@ -5,41 +5,88 @@ from django.core import serializers
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
 
+from core import perf
 from dashboard.admin import ProductForm
 from dashboard.check_admin import admin_required
+from dashboard.tables import (
+    filter_products, filter_users, page_json, paginate, product_json, user_json,
+)
+from orders import analytics
+from products.bulk import detect_format, export_lines, import_products, read_rows
 from products.models import Product, Category, Size, ProductSize
+from products.sizes import sync_product_sizes
 
 
 @admin_required
 def management(request):
-    search_user = request.GET.get('search_user', '').strip()
-
-    if search_user:
-        users = User.objects.filter(username__icontains=search_user)
-    else:
-        users = User.objects.all()
-
-    # --- Search cho Product ---
-    search_product = request.GET.get('search_product', '').strip()
-
-    if search_product:
-        products = Product.objects.filter(name__icontains=search_product)
-    else:
-        products = Product.objects.all()
+    # Hai bảng lọc/sắp xếp/phân trang độc lập theo tham số GET riêng (xem dashboard.tables)
+    user_page = paginate(filter_users(request.GET), request.GET, 'user')
+    product_page = paginate(filter_products(request.GET), request.GET, 'product')
 
     context = {
         # User data
-        'users': users,
-        'search_user': search_user,
+        'users': user_page.object_list,
+        'user_page': user_page,
+        'search_user': request.GET.get('search_user', '').strip(),
 
         # Product data
-        'products': products,
-        'search_product': search_product,
+        'products': product_page.object_list,
+        'product_page': product_page,
+        'search_product': request.GET.get('search_product', '').strip(),
     }
     return render(request, 'management.html', context)
 
 
+@admin_required
+def users_json(request):
+    """Bảng người dùng dạng JSON (cùng tham số lọc/sắp xếp/phân trang với trang quản lý)"""
+    page = paginate(filter_users(request.GET), request.GET, 'user')
+    return JsonResponse(page_json(page, user_json))
+
+
+@admin_required
+def products_json(request):
+    """Bảng sản phẩm dạng JSON (cùng tham số lọc/sắp xếp/phân trang với trang quản lý)"""
+    page = paginate(filter_products(request.GET), request.GET, 'product')
+    return JsonResponse(page_json(page, product_json))
+
+
+@admin_required
+def analytics_json(request, report):
+    """Báo cáo doanh số đọc từ bảng tổng hợp (xem orders.analytics), lọc theo ``?start=&end=``"""
+    if report not in analytics.REPORTS:
+        raise Http404
+    try:
+        kwargs = analytics.report_kwargs(report, request.GET)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Tham số không hợp lệ!'}, status=400)
+    refreshed_at = analytics.last_refreshed()
+    return JsonResponse({
+        'report': report,
+        'refreshed_at': refreshed_at.isoformat() if refreshed_at else None,
+        'results': analytics.REPORTS[report](**kwargs),
+    })
+
+
+@admin_required
+def perf_view(request):
+    """Số liệu hiệu năng theo view của process đang phục vụ (xem core.perf); POST để xoá"""
+    if request.method == 'POST':
+        perf.registry.reset()
+        return redirect('management_perf')
+    return render(request, 'perf.html', {'perf': perf.registry.as_json()})
+
+
+@admin_required
+def perf_json(request):
+    """Xuất toàn bộ histogram của ``perf_view`` dạng JSON"""
+    return JsonResponse(perf.registry.as_json())
+
+
 @admin_required
 def create_user(request):
     if request.method == "POST":
@@ -112,6 +159,37 @@ def delete_user(request, user_id):
     return redirect('management')
 
 
+@admin_required
+@require_http_methods(["POST"])
+def import_products_view(request):
+    """Nhập sản phẩm từ file CSV/JSONL upload (xem products.bulk)"""
+    upload = request.FILES.get('file')
+    if not upload:
+        messages.error(request, "Vui lòng chọn file CSV hoặc JSONL!")
+        return redirect('management')
+
+    report = import_products(read_rows(upload.file, detect_format(upload.name)))
+    if report.error_count:
+        details = "; ".join(f"dòng {line}: {message}" for line, message in report.errors[:5])
+        messages.error(request, f"{report.error_count} dòng lỗi bị bỏ qua ({details}).")
+    messages.success(
+        request, f"Đã nhập {report.products} sản phẩm, {report.skus} SKU từ {report.rows} dòng."
+    )
+    return redirect('management')
+
+
+@admin_required
+def export_products_view(request):
+    """Tải toàn bộ SKU dạng CSV/JSONL, ghi dần ra response"""
+    fmt = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+    response = StreamingHttpResponse(
+        export_lines(fmt),
+        content_type='application/x-ndjson; charset=utf-8' if fmt == 'jsonl' else 'text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+    return response
+
+
 @admin_required
 def add_product(request):
     if request.method == "POST":
@@ -146,6 +224,28 @@ def add_product(request):
     return render(request, 'add_product.html', context)
 
 
+MAX_QUANTITY = 2 ** 31 - 1  # Giới hạn cột ProductSize.quantity
+
+
+def _size_quantities(data, size_ids):
+    """``{size_id: số lượng}`` từ ``sizes[]``/``quantities[]`` của form, hoặc None nếu có size
+    không tồn tại hay số lượng không phải số nguyên hợp lệ"""
+    quantities = data.getlist('quantities[]')
+    wanted = {}
+    for i, size_id in enumerate(data.getlist('sizes[]')):
+        if not size_id.strip():
+            continue
+        quantity = quantities[i].strip() if i < len(quantities) else ''
+        try:
+            size_id, quantity = int(size_id), int(quantity or 0)
+        except ValueError:
+            return None
+        if size_id not in size_ids or quantity > MAX_QUANTITY:
+            return None
+        wanted[size_id] = max(quantity, 0)
+    return wanted
+
+
 @admin_required
 def edit_product(request, product_id):
     product = get_object_or_404(Product, id=product_id)
@@ -153,28 +253,16 @@ def edit_product(request, product_id):
 
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
-        if form.is_valid():
-            # Lưu các field chính của product
-            updated_product = form.save()
-
-            # Lấy danh sách size và quantity được chọn từ form
-            selected_size_ids = [int(s) for s in request.POST.getlist('sizes[]') if s]
-            quantities = request.POST.getlist('quantities[]')
-
-            # Xóa tất cả ProductSize cũ
-            ProductSize.objects.filter(product=product).delete()
-            
-            # Tạo ProductSize mới với quantity
-            if selected_size_ids:
-                objs = []
-                for i, size_id in enumerate(selected_size_ids):
-                    quantity = int(quantities[i]) if i < len(quantities) and quantities[i] else 0
-                    objs.append(ProductSize(
-                        product=product, 
-                        size_id=size_id,
-                        quantity=quantity
-                    ))
-                ProductSize.objects.bulk_create(objs)
+        # Lấy danh sách size và quantity được chọn từ form
+        wanted = _size_quantities(request.POST, {size.id for size in sizes})
+        if wanted is None:
+            messages.error(request, 'Size hoặc số lượng không hợp lệ. Vui lòng kiểm tra lại.')
+        elif form.is_valid():
+            with transaction.atomic():
+                # Lưu các field chính của product
+                form.save()
+                # Chỉ ghi các size thay đổi; size đã bán thì ngừng bán thay vì xoá
+                sync_product_sizes(product, wanted)
 
             messages.success(request, 'Cập nhật sản phẩm thành công!')
             return redirect('management')
@@ -184,7 +272,7 @@ def edit_product(request, product_id):
         form = ProductForm(instance=product)
 
     # Lấy ProductSize hiện có với quantity
-    product_sizes = ProductSize.objects.filter(product=product).select_related('size')
+    product_sizes = ProductSize.objects.filter(product=product, active=True).select_related('size')
 
     context = {
         'form': form,
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.perf.PerfMiddleware',  # Đứng đầu để đo trọn request (xem PERF_* bên dưới)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +58,7 @@ ROOT_URLCONF = 'fashionshop.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.perf.DjangoTemplates',  # DjangoTemplates có đo thời gian render
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,16 +76,62 @@ WSGI_APPLICATION = 'fashionshop.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': config("DB_NAME"),
-        'USER': config("DB_USER"),
-        'PASSWORD': config("DB_PASSWORD"),
-        'HOST': config("DB_HOST"),
-        'PORT': config("DB_PORT", cast=int),
+# DB_ENGINE=sqlite chạy dự án (và test/benchmark) trên file SQLite, không cần MySQL
+DB_ENGINE = config("DB_ENGINE", default="mysql")
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config("DB_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Checkout đồng thời: khoá ghi ngay từ BEGIN và chờ khoá thay vì lỗi "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+            # Database test nằm trên file (không phải memory) để test nhiều thread dùng chung được
+            'TEST': {
+                'NAME': config("DB_TEST_NAME", default=str(BASE_DIR / 'test_db.sqlite3')),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': config("DB_NAME"),
+            'USER': config("DB_USER"),
+            'PASSWORD': config("DB_PASSWORD"),
+            'HOST': config("DB_HOST"),
+            'PORT': config("DB_PORT", cast=int),
+        }
+    }
+
+# Cache dùng chung: locmem (mặc định, mỗi process một bản) hoặc file (chia sẻ giữa các process)
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+
+if CACHE_BACKEND == "file":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config("CACHE_LOCATION", default=str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Số giây sống của các khoá phiên bản cache (products.reference, products.api). locmem không
+# chia sẻ giữa các process nên sửa catalog ở một worker không tới worker khác: phiên bản phải
+# hết hạn để dữ liệu cũ chỉ tồn tại tối đa chừng này. Cache dùng chung: 0 (không hết hạn).
+# Chạy nhiều worker thì dùng CACHE_BACKEND=file (xem manage.py check --deploy).
+CACHE_VERSION_TIMEOUT = config(
+    "CACHE_VERSION_TIMEOUT", default=0 if CACHE_BACKEND == "file" else 60, cast=int
+)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,5 +176,25 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
+# 'sync': tạo đơn ngay trong request; 'queued': ghi vào hàng đợi, chạy
+# `python manage.py process_order_queue` để worker tạo đơn
+CHECKOUT_MODE = config("CHECKOUT_MODE", default="sync")
+
+# Thời gian giữ response của request có header Idempotency-Key (giây)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# core.perf: tỉ lệ request được đo (0 tắt, 1 đo mọi request) và số lần một câu SQL
+# lặp lại trong một request thì bị ghi nhận là N+1; xem /management/perf/
+PERF_SAMPLE_RATE = config("PERF_SAMPLE_RATE", default=1.0, cast=float)
+PERF_DUPLICATE_THRESHOLD = config("PERF_DUPLICATE_THRESHOLD", default=3, cast=int)
+
+# products.snapshot: mỗi process giữ bản chụp catalog trong bộ nhớ cho trang danh sách và
+# bộ lọc facet thay vì query database (vài MB cho vài chục nghìn sản phẩm)
+CATALOG_SNAPSHOT = config("CATALOG_SNAPSHOT", default=False, cast=bool)
+
+# core.http_cache: số giây CDN được giữ trang storefront của khách chưa đăng nhập
+# (s-maxage); trình duyệt luôn hỏi lại bằng If-None-Match
+STOREFRONT_S_MAXAGE = config("STOREFRONT_S_MAXAGE", default=60, cast=int)
+
 LOGIN_REDIRECT_URL = "/"  # sau khi login xong chuyển về trang chủ
 LOGOUT_REDIRECT_URL = "/"  # sau khi logout thì về trang chủ
@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.urls import reverse
 from django.utils.html import format_html
-from .models import Order, OrderItem
+
+from core.pagination import EstimatedCountPaginator
+from .models import Order, OrderItem, OrderStatusEvent
+from .states import transition_orders
 
 
 class OrderItemInline(admin.TabularInline):
@@ -10,6 +15,13 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('product_info', 'size_name', 'quantity', 'price', 'item_total')
     fields = ('product_info', 'size_name', 'quantity', 'price', 'item_total')
     can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product_size__product', 'product_size__size')
+
+    def has_add_permission(self, request, obj=None):
+        """Không thêm dòng vào đơn đã đặt"""
+        return False
     
     def product_info(self, obj):
         """Hiển thị thông tin sản phẩm"""
@@ -28,12 +40,27 @@ class OrderItemInline(admin.TabularInline):
     def item_total(self, obj):
         """Hiển thị tổng tiền của item"""
         return format_html(
-            '<strong style="color: #00a65a;">{:,.0f}đ</strong>',
-            obj.get_total()
+            '<strong style="color: #00a65a;">{}đ</strong>',
+            f"{obj.get_total():,.0f}"
         )
     item_total.short_description = "Thành tiền"
 
 
+class OrderStatusEventInline(admin.TabularInline):
+    """Lịch sử trạng thái của đơn (chỉ xem)"""
+    model = OrderStatusEvent
+    extra = 0
+    fields = ('from_status', 'to_status', 'actor', 'note', 'created_at')
+    readonly_fields = fields
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('actor')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """Admin cho Order model"""
@@ -43,13 +70,16 @@ class OrderAdmin(admin.ModelAdmin):
         'receiver',
         'phone',
         'total_display',
+        'order_items_count',
         'status_display',
         'created_at_display',
     )
     list_filter = ('status', 'created_at')
     search_fields = ('id', 'user__username', 'receiver', 'phone', 'address')
+    # Trạng thái chỉ đổi qua actions để luôn đi qua máy trạng thái (orders.states)
     readonly_fields = (
         'user',
+        'status',
         'created_at',
         'updated_at',
         'total_display',
@@ -75,9 +105,24 @@ class OrderAdmin(admin.ModelAdmin):
             )
         }),
     )
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
     list_per_page = 20
     date_hierarchy = 'created_at'
+    # Bảng đơn hàng lớn: không đếm chính xác toàn bảng ở mỗi trang (xem core.pagination)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Join user và đếm sẵn số dòng/tổng số lượng để mỗi trang có số query cố định.
+
+        Đếm bằng subquery theo ``order_id`` thay vì JOIN + GROUP BY: chỉ chạy cho các dòng
+        của trang, và câu COUNT của phân trang bỏ được annotation không dùng tới.
+        """
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return super().get_queryset(request).select_related('user').annotate(
+            item_count=Subquery(items.annotate(n=Count('id')).values('n')),
+            item_quantity=Subquery(items.annotate(n=Sum('quantity')).values('n')),
+        )
     
     def order_id(self, obj):
         """Hiển thị mã đơn hàng"""
@@ -98,8 +143,8 @@ class OrderAdmin(admin.ModelAdmin):
     def total_display(self, obj):
         """Hiển thị tổng tiền với format đẹp"""
         return format_html(
-            '<strong style="color: #00a65a; font-size: 14px;">{:,.0f}đ</strong>',
-            obj.total_amount
+            '<strong style="color: #00a65a; font-size: 14px;">{}đ</strong>',
+            f"{obj.total_amount:,.0f}"
         )
     total_display.short_description = "Tổng tiền"
     total_display.admin_order_field = 'total_amount'
@@ -130,15 +175,14 @@ class OrderAdmin(admin.ModelAdmin):
     created_at_display.admin_order_field = 'created_at'
     
     def order_items_count(self, obj):
-        """Đếm số lượng sản phẩm trong đơn"""
-        count = obj.items.count()
-        total_qty = sum(item.quantity for item in obj.items.all())
+        """Đếm số lượng sản phẩm trong đơn (annotate sẵn trong get_queryset)"""
         return format_html(
             '<span style="color: #3498db; font-weight: bold;">{} sản phẩm ({} items)</span>',
-            count,
-            total_qty
+            obj.item_count or 0,
+            obj.item_quantity or 0
         )
     order_items_count.short_description = "Số lượng sản phẩm"
+    order_items_count.admin_order_field = 'item_count'
     
     def has_add_permission(self, request):
         """Không cho phép tạo order từ admin"""
@@ -150,32 +194,36 @@ class OrderAdmin(admin.ModelAdmin):
             return True
         return False
     
-    # Custom actions
+    # Custom actions: chuyển trạng thái qua orders.states (kiểm tra bước chuyển, ghi lịch
+    # sử, trả kho khi huỷ)
     actions = ['mark_as_confirmed', 'mark_as_shipping', 'mark_as_completed', 'mark_as_cancelled']
+
+    def _transition(self, request, queryset, target, message):
+        result = transition_orders(queryset, target, actor=request.user)
+        self.message_user(request, message.format(result.changed))
+        if result.skipped:
+            self.message_user(
+                request, f"Bỏ qua {result.skipped} đơn không thể chuyển sang trạng thái này.", messages.WARNING
+            )
     
     def mark_as_confirmed(self, request, queryset):
         """Action: Xác nhận đơn hàng"""
-        updated = queryset.filter(status='pending').update(status='confirmed')
-        self.message_user(request, f"Đã xác nhận {updated} đơn hàng.")
+        self._transition(request, queryset, 'confirmed', "Đã xác nhận {} đơn hàng.")
     mark_as_confirmed.short_description = "✅ Xác nhận đơn hàng"
     
     def mark_as_shipping(self, request, queryset):
         """Action: Chuyển sang đang giao"""
-        updated = queryset.filter(status='confirmed').update(status='shipping')
-        self.message_user(request, f"Đã chuyển {updated} đơn sang trạng thái đang giao.")
+        self._transition(request, queryset, 'shipping', "Đã chuyển {} đơn sang trạng thái đang giao.")
     mark_as_shipping.short_description = "🚚 Đang giao hàng"
     
     def mark_as_completed(self, request, queryset):
         """Action: Hoàn thành đơn hàng"""
-        updated = queryset.filter(status='shipping').update(status='completed')
-        self.message_user(request, f"Đã hoàn thành {updated} đơn hàng.")
+        self._transition(request, queryset, 'completed', "Đã hoàn thành {} đơn hàng.")
     mark_as_completed.short_description = "✔️ Hoàn thành"
     
     def mark_as_cancelled(self, request, queryset):
-        """Action: Hủy đơn hàng"""
-        # Chỉ hủy những đơn chưa shipping
-        updated = queryset.exclude(status__in=['shipping', 'completed']).update(status='cancelled')
-        self.message_user(request, f"Đã hủy {updated} đơn hàng.")
+        """Action: Hủy đơn hàng (chỉ đơn chưa giao) và trả lại tồn kho"""
+        self._transition(request, queryset, 'cancelled', "Đã hủy {} đơn hàng.")
     mark_as_cancelled.short_description = "❌ Hủy đơn hàng"
 
 
@@ -196,13 +244,18 @@ class OrderItemAdmin(admin.ModelAdmin):
         'product_size__product__name',
     )
     readonly_fields = ('order', 'product_size', 'quantity', 'price', 'total_display')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'order__user', 'product_size__product', 'product_size__size'
+        )
     
     def order_id(self, obj):
         """Link đến order"""
-        from django.urls import reverse
-        from django.utils.html import format_html
-        url = reverse('admin:orders_order_change', args=[obj.order.id])
-        return format_html('<a href="{}">#{}</a>', url, obj.order.id)
+        url = reverse('admin:orders_order_change', args=[obj.order_id])
+        return format_html('<a href="{}">#{}</a>', url, obj.order_id)
     order_id.short_description = "Mã đơn"
     order_id.admin_order_field = 'order__id'
     
@@ -219,15 +272,15 @@ class OrderItemAdmin(admin.ModelAdmin):
     
     def price_display(self, obj):
         """Giá"""
-        return format_html('{:,.0f}đ', obj.price)
+        return format_html('{}đ', f"{obj.price:,.0f}")
     price_display.short_description = "Giá"
     price_display.admin_order_field = 'price'
     
     def total_display(self, obj):
         """Thành tiền"""
         return format_html(
-            '<strong style="color: #00a65a;">{:,.0f}đ</strong>',
-            obj.get_total()
+            '<strong style="color: #00a65a;">{}đ</strong>',
+            f"{obj.get_total():,.0f}"
         )
     total_display.short_description = "Thành tiền"
     
@@ -0,0 +1,227 @@
+"""Thống kê doanh số từ ``orders``/``order_items`` qua hai bảng tổng hợp.
+
+``SalesDay`` giữ số đơn, số sản phẩm và doanh thu của từng ngày; ``SalesDayItem`` giữ số
+lượng và doanh thu theo ngày + SKU (kèm danh mục). Các báo cáo (theo ngày, danh mục,
+sản phẩm, size, bán chạy, giá trị giỏ trung bình) chỉ gom nhóm trên hai bảng này nên
+không phụ thuộc số dòng ``order_items``.
+
+Làm mới là tăng dần: ``refresh()`` tìm các đơn có ``updated_at`` từ checkpoint lần trước
+(lùi ``OVERLAP`` để không sót transaction commit muộn), rồi tính lại bằng GROUP BY trong
+database đúng những ngày tạo của các đơn đó. Tính lại cả ngày thay vì cộng dồn nên chạy
+lại nhiều lần vẫn đúng, và đơn đổi trạng thái (bị huỷ) được trừ ra. Đơn bị xoá đánh dấu
+ngày của nó là ``stale`` (xem ``orders.signals``). Đơn bị huỷ không tính doanh số.
+
+Mọi thao tác đổi đơn phải cập nhật ``updated_at`` (``QuerySet.update()`` không tự làm).
+"""
+import datetime
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, DecimalField, F, Sum, Value
+from django.utils import timezone
+
+from .models import AnalyticsCheckpoint, Order, OrderItem, SalesDay, SalesDayItem
+
+CHECKPOINT = 'sales'
+EXCLUDED_STATUSES = ('cancelled',)
+OVERLAP = datetime.timedelta(minutes=5)
+TOP_LIMIT = 10
+MAX_TOP_LIMIT = 100
+
+
+@dataclass
+class RefreshResult:
+    full: bool
+    days: int
+    rows: int
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _insert_from(model, queryset, group, totals, having=None):
+    """``INSERT INTO <bảng> SELECT ...``: ghi kết quả gom nhóm mà không đưa dòng nào về Python.
+
+    ``group`` (cột GROUP BY) và ``totals`` (hàm gom nhóm) là ``{tên field của model: biểu thức}``;
+    ``having`` lọc theo tên field, vd. ``{'orders__gt': 0}``. Cột SELECT mang alias riêng
+    (``col_<field>``) nên không che field cùng tên trong biểu thức (vd. ``quantity``), và thứ
+    tự cột được kiểm tra trước khi ghi.
+    """
+    alias = 'col_{}'.format
+    queryset = queryset.values(**{alias(name): value for name, value in group.items()}).annotate(
+        **{alias(name): value for name, value in totals.items()}
+    )
+    if having:
+        queryset = queryset.filter(**{alias(lookup): value for lookup, value in having.items()})
+    fields = [*group, *totals]
+    if queryset.query.values_select or list(queryset.query.annotation_select) != [alias(name) for name in fields]:
+        raise ValueError(f"Cột SELECT không khớp {fields}")
+    sql, params = queryset.query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(model._meta.db_table)} ({columns}) {sql}", params)
+        return cursor.rowcount
+
+
+def rebuild_day(day):
+    """Tính lại các dòng tổng hợp của ngày ``day`` từ đơn hàng, trả về số dòng SKU đã ghi.
+
+    Lọc theo khoảng ``created_at`` (dùng index) và ghi ngày dạng hằng số thay vì cắt ngày
+    từng dòng, vì hàm cắt ngày không dùng được index (và chậm trên SQLite).
+    """
+    start = _start_of(day)
+    items = OrderItem.objects.filter(
+        order__created_at__gte=start, order__created_at__lt=start + datetime.timedelta(days=1),
+    ).exclude(order__status__in=EXCLUDED_STATUSES).order_by()
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=16, decimal_places=2))
+    day_value = Value(day, output_field=DateField())
+
+    SalesDayItem.objects.filter(day=day).delete()
+    SalesDay.objects.filter(day=day).delete()
+    # Nhóm theo hằng số gom cả ngày thành một dòng; không có đơn thì không ghi dòng nào
+    _insert_from(SalesDay, items, {'day': day_value}, {
+        'revenue': revenue, 'orders': Count('order_id', distinct=True), 'items': Sum('quantity'), 'stale': Value(False),
+    }, having={'orders__gt': 0})
+    return _insert_from(SalesDayItem, items, {
+        'product': F('product_size__product_id'),
+        'size': F('product_size__size_id'),
+        'category': F('product_size__product__category_id'),
+    }, {'day': day_value, 'quantity': Sum('quantity'), 'revenue': revenue})
+
+
+def refresh(full=False):
+    """Gộp các đơn mới/đổi từ checkpoint vào bảng tổng hợp (``full``: tính lại toàn bộ).
+
+    Chạy trong một transaction và khoá checkpoint, nên hai lần làm mới đồng thời chạy lần lượt.
+    """
+    with transaction.atomic():
+        checkpoint, _ = AnalyticsCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+        started = timezone.now()
+        full = full or checkpoint.position is None
+        if full:
+            SalesDayItem.objects.all().delete()
+            SalesDay.objects.all().delete()
+            days = list(Order.objects.dates('created_at', 'day'))
+        else:
+            changed = Order.objects.filter(updated_at__gte=checkpoint.position - OVERLAP)
+            days = set(changed.dates('created_at', 'day'))
+            days.update(SalesDay.objects.filter(stale=True).values_list('day', flat=True))
+            days = sorted(days)
+
+        rows = sum(rebuild_day(day) for day in days)
+
+        checkpoint.position = started
+        checkpoint.refreshed_at = timezone.now()
+        checkpoint.save()
+    return RefreshResult(full=full, days=len(days), rows=rows)
+
+
+def mark_stale(day):
+    """Đơn của ngày ``day`` bị xoá: lần làm mới sau tính lại ngày này"""
+    SalesDay.objects.filter(day=day).update(stale=True)
+
+
+# Báo cáo: đọc từ bảng tổng hợp trong khoảng ngày [start, end]
+
+def _between(queryset, start=None, end=None):
+    if start:
+        queryset = queryset.filter(day__gte=start)
+    if end:
+        queryset = queryset.filter(day__lte=end)
+    return queryset
+
+
+def summary(start=None, end=None):
+    """Tổng doanh thu, số đơn và giá trị giỏ trung bình"""
+    totals = _between(SalesDay.objects.all(), start, end).aggregate(
+        orders=Sum('orders'), items=Sum('items'), revenue=Sum('revenue'),
+    )
+    orders = totals['orders'] or 0
+    revenue = totals['revenue'] or 0
+    items = totals['items'] or 0
+    return {
+        'orders': orders,
+        'items': items,
+        'revenue': float(revenue),
+        'average_basket_value': float(revenue) / orders if orders else 0,
+        'average_basket_items': items / orders if orders else 0,
+    }
+
+
+def revenue_by_day(start=None, end=None):
+    return [
+        {'day': row['day'].isoformat(), 'orders': row['orders'], 'items': row['items'], 'revenue': float(row['revenue'])}
+        for row in _between(SalesDay.objects.all(), start, end).values('day', 'orders', 'items', 'revenue')
+    ]
+
+
+def _grouped(start, end, fields, order_by, limit=None):
+    rows = (
+        _between(SalesDayItem.objects.all(), start, end)
+        .values(*fields)
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by(order_by, fields[0])
+    )
+    if limit:
+        rows = rows[:limit]
+    return list(rows)
+
+
+def revenue_by_category(start=None, end=None):
+    return [
+        {'id': row['category_id'], 'name': row['category__name'], 'quantity': row['quantity'], 'revenue': float(row['revenue'])}
+        for row in _grouped(start, end, ('category_id', 'category__name'), '-revenue')
+    ]
+
+
+def revenue_by_size(start=None, end=None):
+    return [
+        {'id': row['size_id'], 'name': row['size__name'], 'quantity': row['quantity'], 'revenue': float(row['revenue'])}
+        for row in _grouped(start, end, ('size_id', 'size__name'), '-revenue')
+    ]
+
+
+def top_products(start=None, end=None, by='revenue', limit=TOP_LIMIT):
+    """Sản phẩm có doanh thu (``by='revenue'``) hoặc số lượng bán (``by='quantity'``) cao nhất"""
+    order_by = '-quantity' if by == 'quantity' else '-revenue'
+    return [
+        {'id': row['product_id'], 'name': row['product__name'], 'quantity': row['quantity'], 'revenue': float(row['revenue'])}
+        for row in _grouped(start, end, ('product_id', 'product__name'), order_by, limit)
+    ]
+
+
+def top_sellers(start=None, end=None, limit=TOP_LIMIT):
+    return top_products(start, end, by='quantity', limit=limit)
+
+
+REPORTS = {
+    'summary': summary,
+    'daily': revenue_by_day,
+    'categories': revenue_by_category,
+    'sizes': revenue_by_size,
+    'products': top_products,
+    'top-sellers': top_sellers,
+}
+
+
+def report_kwargs(report, params):
+    """Tham số GET (``start``, ``end`` dạng YYYY-MM-DD, ``limit``, ``by``) của báo cáo
+    ``report``; ném ``ValueError`` nếu không hợp lệ"""
+    kwargs = {}
+    for name in ('start', 'end'):
+        if params.get(name):
+            kwargs[name] = datetime.date.fromisoformat(params[name])
+    if report in ('products', 'top-sellers') and params.get('limit'):
+        kwargs['limit'] = min(max(int(params['limit']), 1), MAX_TOP_LIMIT)
+    if report == 'products' and params.get('by'):
+        if params['by'] not in ('revenue', 'quantity'):
+            raise ValueError(params['by'])
+        kwargs['by'] = params['by']
+    return kwargs
+
+
+def last_refreshed():
+    checkpoint = AnalyticsCheckpoint.objects.filter(name=CHECKPOINT).first()
+    return checkpoint.refreshed_at if checkpoint else None
@@ -0,0 +1,148 @@
+"""Giỏ hàng trên server (``CartItem``) cho user đã đăng nhập.
+
+Giỏ hàng trả về client là một snapshot: các dòng kèm giá hiện tại, tồn kho, cờ còn
+hàng và tổng tiền, đọc bằng một query join ``ProductSize``/``Product``/``Size`` rồi cache
+theo user. Cache bị xoá khi giỏ thay đổi và khi giá sản phẩm hoặc tồn kho của một size
+trong giỏ thay đổi (xem ``orders.signals`` và ``place_order``).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import CartItem
+
+CACHE_TIMEOUT = 15 * 60
+MAX_QUANTITY = 999
+
+
+def cache_key(user_id):
+    return f'cart:{user_id}'
+
+
+def build_snapshot(user_id):
+    """Đọc giỏ hàng của user từ database trong một query"""
+    items = []
+    total = 0
+    for cart_item in CartItem.objects.filter(user_id=user_id).select_related(
+        'product_size__product', 'product_size__size'
+    ).order_by('id'):
+        product_size = cart_item.product_size
+        product = product_size.product
+        orderable = not product.hide and product_size.active and cart_item.quantity <= product_size.quantity
+        items.append({
+            'product_size_id': product_size.id,
+            'product_id': product.id,
+            'size_id': product_size.size_id,
+            'product_name': product.name,
+            'size_name': product_size.size.name,
+            'image': product.image.url if product.image else '',
+            'price': float(product.price),
+            'quantity': cart_item.quantity,
+            'available': product_size.quantity,
+            'in_stock': orderable,
+            'line_total': float(product.price * cart_item.quantity),
+        })
+        total += product.price * cart_item.quantity
+    return {
+        'items': items,
+        'count': sum(item['quantity'] for item in items),
+        'total': float(total),  # Cộng bằng Decimal, chỉ đổi sang số JSON ở cuối
+        'has_unavailable': any(not item['in_stock'] for item in items),
+    }
+
+
+def cart_snapshot(user):
+    """Snapshot giỏ hàng của user, đọc qua cache"""
+    key = cache_key(user.id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(user.id)
+        cache.set(key, snapshot, CACHE_TIMEOUT)
+    return snapshot
+
+
+def _delete_cached(keys):
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Xoá lần nữa sau commit: request khác có thể đã cache lại dữ liệu cũ trong lúc
+    # transaction hiện tại chưa commit
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_cart(user_id):
+    _delete_cached([cache_key(user_id)])
+
+
+def invalidate_carts_with(product_size_ids=None, product_ids=None):
+    """Xoá cache giỏ hàng của mọi user có ProductSize (hoặc sản phẩm) này trong giỏ"""
+    cart_items = CartItem.objects.all()
+    if product_size_ids is not None:
+        cart_items = cart_items.filter(product_size_id__in=product_size_ids)
+    if product_ids is not None:
+        cart_items = cart_items.filter(product_size__product_id__in=product_ids)
+    user_ids = cart_items.values_list('user_id', flat=True).distinct()
+    _delete_cached([cache_key(user_id) for user_id in user_ids])
+
+
+def _clamp(quantity):
+    quantity = int(quantity)
+    if quantity <= 0:
+        raise ValueError('Số lượng phải lớn hơn 0')
+    return min(quantity, MAX_QUANTITY)
+
+
+def add_item(user, product_size, quantity=1):
+    """Thêm ``quantity`` sản phẩm vào giỏ (cộng dồn nếu đã có dòng cùng size)"""
+    quantity = _clamp(quantity)
+    updated = CartItem.objects.filter(user=user, product_size=product_size).update(
+        quantity=F('quantity') + quantity
+    )
+    if not updated:
+        CartItem.objects.get_or_create(user=user, product_size=product_size, defaults={'quantity': quantity})
+    invalidate_cart(user.id)
+
+
+def set_quantity(user, product_size_id, quantity):
+    """Đặt số lượng một dòng; ``quantity <= 0`` thì xoá dòng. Trả về False nếu không có dòng"""
+    if int(quantity) <= 0:
+        return remove_item(user, product_size_id)
+    updated = CartItem.objects.filter(user=user, product_size_id=product_size_id).update(
+        quantity=_clamp(quantity)
+    )
+    invalidate_cart(user.id)
+    return bool(updated)
+
+
+def remove_item(user, product_size_id):
+    deleted, _ = CartItem.objects.filter(user=user, product_size_id=product_size_id).delete()
+    invalidate_cart(user.id)
+    return bool(deleted)
+
+
+def merge_lines(user, lines):
+    """Gộp giỏ hàng khách (localStorage) vào giỏ trên server sau khi đăng nhập.
+
+    ``lines`` là list ``(product_size, quantity)`` (xem ``resolve_lines``); số lượng được
+    cộng vào dòng đã có. Số query không phụ thuộc số dòng.
+    """
+    wanted = {}
+    for product_size, quantity in lines:
+        wanted[product_size.id] = wanted.get(product_size.id, 0) + _clamp(quantity)
+    if not wanted:
+        return
+
+    with transaction.atomic():
+        existing = {
+            cart_item.product_size_id: cart_item
+            for cart_item in CartItem.objects.select_for_update().filter(user=user, product_size_id__in=wanted)
+        }
+        for product_size_id, cart_item in existing.items():
+            cart_item.quantity = min(cart_item.quantity + wanted[product_size_id], MAX_QUANTITY)
+        CartItem.objects.bulk_update(existing.values(), ['quantity'])
+        CartItem.objects.bulk_create([
+            CartItem(user=user, product_size_id=product_size_id, quantity=min(quantity, MAX_QUANTITY))
+            for product_size_id, quantity in wanted.items()
+            if product_size_id not in existing
+        ])
+    invalidate_cart(user.id)
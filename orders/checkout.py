@@ -0,0 +1,174 @@
+"""Đặt hàng từ giỏ hàng: đọc payload, tìm ProductSize, trừ kho và tạo Order/OrderItem.
+
+Số query không phụ thuộc số dòng trong giỏ: mọi dòng được tìm trong một query
+(``select_related`` product và size), kho được trừ bằng một câu UPDATE và các
+``OrderItem`` được tạo bằng một ``bulk_create``. Tổng tiền tính trên server từ giá
+hiện tại của sản phẩm, không dùng ``total_amount`` client gửi lên.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from products.api import bump_product_versions
+from products.inventory import InsufficientStock, reserve_stock
+from products.models import ProductSize
+
+from .cart import invalidate_carts_with
+from .models import CartItem, Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """Lỗi dữ liệu giỏ hàng/tồn kho, trả về client dạng JSON với status 400"""
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.message = message
+        self.extra = extra
+
+    def as_json(self):
+        return {'status': 'error', 'message': self.message, **self.extra}
+
+
+MAX_ID = 2 ** 63 - 1
+MAX_QUANTITY = 2 ** 31 - 1
+
+
+def _text(data, name):
+    value = data.get(name) or ''
+    if not isinstance(value, str):
+        raise CheckoutError('Dữ liệu không hợp lệ!')
+    return value.strip()
+
+
+def _positive_int(value, limit, message):
+    """Số nguyên trong ``1..limit`` (số hoặc chuỗi số), ném ``CheckoutError(message)`` nếu không phải"""
+    if isinstance(value, bool):
+        raise CheckoutError(message)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise CheckoutError(message) from None
+    if not 0 < value <= limit:
+        raise CheckoutError(message)
+    return value
+
+
+def parse_checkout(data):
+    """Tách thông tin giao hàng và các dòng giỏ hàng từ payload JSON.
+
+    Trả về ``(shipping, items)`` với ``items`` là list ``(product_id, size, quantity)``;
+    ``size`` là id (int) hoặc tên size (str) như frontend gửi lên. Payload sai dạng ném
+    ``CheckoutError`` (400).
+    """
+    if not isinstance(data, dict):
+        raise CheckoutError('Dữ liệu không hợp lệ!')
+    shipping = {name: _text(data, name) for name in ('receiver', 'phone', 'address', 'note')}
+    if not shipping['receiver'] or not shipping['phone'] or not shipping['address']:
+        raise CheckoutError('Vui lòng điền đầy đủ thông tin!')
+
+    raw_items = data.get('items') or []
+    if not raw_items:
+        raise CheckoutError('Giỏ hàng trống!')
+    if not isinstance(raw_items, list) or not all(isinstance(item, dict) for item in raw_items):
+        raise CheckoutError('Dữ liệu giỏ hàng không hợp lệ!')
+
+    items = []
+    for item_data in raw_items:
+        quantity = _positive_int(item_data.get('quantity', 1), MAX_QUANTITY, 'Số lượng phải lớn hơn 0')
+        product_id = _positive_int(item_data.get('product_id'), MAX_ID, 'Sản phẩm không hợp lệ!')
+        size = item_data.get('size_id')
+        if isinstance(size, bool) or not isinstance(size, (int, str)):
+            raise CheckoutError('Size không hợp lệ!')
+        items.append((product_id, size, quantity))
+    return shipping, items
+
+
+def resolve_lines(items, skip_missing=False):
+    """Tìm ProductSize cho mọi dòng trong một query.
+
+    Trả về list ``(product_size, quantity)`` theo thứ tự của ``items``. Dòng không tìm
+    thấy ném ``CheckoutError``, hoặc bị bỏ qua nếu ``skip_missing``.
+    """
+    product_ids = {product_id for product_id, _, _ in items}
+    size_ids = {size for _, size, _ in items if isinstance(size, int)}
+    size_names = {str(size) for _, size, _ in items if not isinstance(size, int)}
+
+    by_size = Q(size_id__in=size_ids) | Q(size__name__in=size_names)
+    by_id, by_name = {}, {}
+    for product_size in ProductSize.objects.select_related('product', 'size').filter(
+        by_size, product_id__in=product_ids, active=True
+    ):
+        by_id[product_size.product_id, product_size.size_id] = product_size
+        by_name[product_size.product_id, product_size.size.name] = product_size
+
+    lines = []
+    for product_id, size, quantity in items:
+        if isinstance(size, int):
+            product_size = by_id.get((product_id, size))
+        else:
+            product_size = by_name.get((product_id, str(size)))
+        if product_size is None:
+            if skip_missing:
+                continue
+            raise CheckoutError('Sản phẩm không tồn tại hoặc không có size này!')
+        lines.append((product_size, quantity))
+    return lines
+
+
+def stock_error(error, lines):
+    """CheckoutError liệt kê đúng các dòng không đủ tồn kho"""
+    by_id = {product_size.id: product_size for product_size, _ in lines}
+    failed_items = []
+    messages = []
+    for failure in error.failures:
+        product_size = by_id[failure.product_size_id]
+        failed_items.append({
+            'product_id': product_size.product_id,
+            'size_id': product_size.size_id,
+            'size_name': product_size.size.name,
+            'requested': failure.requested,
+            'available': failure.available,
+        })
+        messages.append(
+            f'Sản phẩm {product_size.product.name} (Size {product_size.size.name}) không đủ số lượng! '
+            f'Còn {failure.available} sản phẩm.'
+        )
+    return CheckoutError(' '.join(messages) or 'Sản phẩm không đủ số lượng!', failed_items=failed_items)
+
+
+def place_order(user, shipping, items):
+    """Tạo đơn hàng trong một transaction, trả về ``Order`` đã lưu.
+
+    Ném ``CheckoutError`` nếu có dòng không tìm thấy hoặc không đủ tồn kho; khi đó
+    không có gì được ghi vào database.
+    """
+    with transaction.atomic():
+        lines = resolve_lines(items)
+
+        # Trừ tồn kho mọi dòng trong một câu UPDATE có điều kiện (không oversell)
+        try:
+            reserve_stock((product_size.id, quantity) for product_size, quantity in lines)
+        except InsufficientStock as e:
+            raise stock_error(e, lines) from None
+
+        order = Order.objects.create(
+            user=user,
+            total_amount=sum(ps.product.price * quantity for ps, quantity in lines),
+            status='pending',
+            **shipping,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_size=product_size,
+                quantity=quantity,
+                price=product_size.product.price,  # Lấy giá từ product
+            )
+            for product_size, quantity in lines
+        ])
+        # Giỏ hàng có các size này cần tính lại tồn kho (câu UPDATE trừ kho không phát
+        # signal), rồi bỏ các dòng đã đặt khỏi giỏ của user
+        product_size_ids = [product_size.id for product_size, _ in lines]
+        invalidate_carts_with(product_size_ids)
+        bump_product_versions({product_size.product_id for product_size, _ in lines})
+        CartItem.objects.filter(user=user, product_size_id__in=product_size_ids).delete()
+    return order
@@ -0,0 +1,74 @@
+"""Lịch sử đơn hàng của khách: phân trang keyset theo ``(created_at, id)``.
+
+Trang đầu và mọi trang sau đều là ``WHERE user_id = ? AND (created_at, id) < con trỏ
+ORDER BY created_at DESC, id DESC LIMIT n`` trên index ``(user_id, created_at, id)``, không
+OFFSET và không đếm tổng; ``order_items`` chỉ được đếm cho các đơn trong trang. Thời gian
+trả trang không phụ thuộc khách đã đặt bao nhiêu đơn. Chi tiết sản phẩm của từng đơn được
+tải sau qua JSON (``order_items_json``).
+"""
+import datetime
+
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from products.templatetags.product_images import product_image
+
+from .models import Order, OrderItem
+
+PAGE_SIZE = 10
+
+
+def encode_cursor(order):
+    """Con trỏ "sau đơn này": ``<created_at tính bằng micro giây>.<id>``"""
+    created = order.created_at
+    micros = (created - datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)) // datetime.timedelta(microseconds=1)
+    return f"{micros}.{order.id}"
+
+
+def decode_cursor(value):
+    """``(created_at, id)`` từ con trỏ, hoặc None nếu không hợp lệ"""
+    try:
+        micros, order_id = (int(part) for part in value.split('.'))
+        created = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(microseconds=micros)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    if not 0 < order_id < 2 ** 63:
+        return None
+    return created, order_id
+
+
+def orders_page(user, cursor=None, per_page=PAGE_SIZE):
+    """Các đơn của ``user`` mới nhất trước, sau ``cursor``. Trả về (list đơn, con trỏ trang sau)"""
+    item_count = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        .annotate(n=Count('id')).values('n')
+    )
+    orders = Order.objects.filter(user=user).annotate(item_count=Subquery(item_count)).order_by('-created_at', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created, order_id = position
+        orders = orders.filter(Q(created_at__lt=created) | Q(created_at=created, id__lt=order_id))
+    rows = list(orders[:per_page + 1])
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def item_json(item):
+    product_size = item.product_size
+    product = product_size.product
+    return {
+        'product_id': product.id,
+        'product_name': product.name,
+        'size_name': product_size.size.name,
+        'quantity': item.quantity,
+        'price': float(item.price),
+        'total': float(item.get_total()),
+        'image_html': product_image(product, 80),
+    }
+
+
+def order_items(order):
+    return [
+        item_json(item)
+        for item in order.items.select_related('product_size__product', 'product_size__size').order_by('id')
+    ]
+
@@ -0,0 +1,86 @@
+"""Header ``Idempotency-Key`` cho các endpoint ghi (checkout) để client/load balancer retry an toàn.
+
+Response đầu tiên (status < 500) của mỗi cặp (user, key) được lưu trong
+``IdempotencyKey`` và trả lại nguyên văn cho các lần gửi lại trong thời hạn
+``IDEMPOTENCY_KEY_TTL`` giây, không chạy lại view. Hai request trùng key chạy đồng thời
+được xếp hàng bằng khoá dòng trên bản ghi key: request sau chờ request trước commit rồi
+replay response của nó.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL))
+
+
+def _replay(record):
+    response = HttpResponse(record.response_body, status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _mismatch():
+    return JsonResponse({
+        'status': 'error',
+        'message': 'Idempotency-Key đã được dùng cho một request khác!'
+    }, status=422)
+
+
+def idempotent(view_func):
+    """Decorator cho view POST: lưu và replay response theo header ``Idempotency-Key``"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return JsonResponse({'status': 'error', 'message': 'Idempotency-Key quá dài!'}, status=400)
+
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        fresh_after = timezone.now() - key_ttl()
+
+        # Đường nhanh: đã có response, trả lại mà không mở transaction ghi
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record and record.status_code is not None and record.created_at >= fresh_after:
+            return _replay(record) if record.request_hash == request_hash else _mismatch()
+
+        if record is None:
+            try:
+                IdempotencyKey.objects.create(user=request.user, key=key, request_hash=request_hash)
+            except IntegrityError:
+                pass  # Request trùng key vừa tạo trước: sẽ chờ nó ở bước khoá bên dưới
+
+        with transaction.atomic():
+            # Request trùng key đang chạy giữ khoá dòng này tới khi commit
+            record = IdempotencyKey.objects.select_for_update().get(user=request.user, key=key)
+            if record.status_code is not None and record.created_at >= fresh_after:
+                return _replay(record) if record.request_hash == request_hash else _mismatch()
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code < 500:
+                record.request_hash = request_hash
+                record.status_code = response.status_code
+                record.response_body = response.content.decode(response.charset)
+                record.content_type = response.get('Content-Type', '')
+                record.created_at = timezone.now()
+                record.save()
+            return response
+    return wrapper
+
+
+def purge_expired_keys():
+    """Xoá các key đã hết hạn, trả về số bản ghi đã xoá"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - key_ttl()).delete()
+    return deleted
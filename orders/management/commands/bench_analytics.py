@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import reset_queries
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog, seed_orders
+from orders import analytics
+from orders.models import Order, OrderItem, SalesDayItem
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian làm mới bảng tổng hợp doanh số (toàn bộ và tăng dần) và đọc báo cáo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=250_000)
+        parser.add_argument('--lines', type=int, default=4, help="Số dòng mỗi đơn")
+        parser.add_argument('--days', type=int, default=365, help="Số ngày lịch sử")
+        parser.add_argument('--changes', type=int, default=1000, help="Số đơn mới và số đơn bị huỷ trước lần làm mới tăng dần")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(200)
+            started = time.perf_counter()
+            n_items = seed_orders(options['orders'], lines=options['lines'], days=options['days'])
+            self.stdout.write(
+                f"Seed {options['orders']} đơn / {n_items} dòng order_items trong {time.perf_counter() - started:.1f}s"
+            )
+
+            self.timed_refresh("Làm mới toàn bộ", full=True)
+
+            # Trường hợp thường gặp: chỉ có đơn mới trong ngày
+            seed_orders(options['changes'], lines=options['lines'], days=1, cancelled_ratio=0, seed=1)
+            self.timed_refresh(f"Làm mới tăng dần sau {options['changes']} đơn mới")
+
+            # Trường hợp xấu: huỷ các đơn cũ rải rác cả năm, phải tính lại nhiều ngày
+            ids = list(Order.objects.exclude(status='cancelled').values_list('id', flat=True))
+            cancelled = random.Random(2).sample(ids, min(options['changes'], len(ids)))
+            Order.objects.filter(id__in=cancelled).update(status='cancelled', updated_at=timezone.now())
+            self.timed_refresh(f"Làm mới tăng dần sau {len(cancelled)} đơn cũ bị huỷ")
+
+            def raw_by_category():
+                return list(
+                    OrderItem.objects.exclude(order__status__in=analytics.EXCLUDED_STATUSES)
+                    .values('product_size__product__category_id')
+                    .annotate(revenue=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=16, decimal_places=2)))
+                    .order_by('-revenue')
+                )
+
+            reset_queries()  # Log query đã đầy sau khi seed: CaptureQueriesContext sẽ đếm sai
+            self.stdout.write(f"\n{'báo cáo':<34} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+            reports = [
+                ('order_items trực tiếp: theo danh mục', raw_by_category),
+                ('tổng hợp: theo danh mục', analytics.revenue_by_category),
+                ('tổng hợp: theo ngày', analytics.revenue_by_day),
+                ('tổng hợp: top sản phẩm', analytics.top_products),
+                ('tổng hợp: giá trị giỏ trung bình', analytics.summary),
+            ]
+            for name, func in reports:
+                timings, queries = measure(func, repeat=options['repeat'], warmup=1)
+                self.stdout.write(
+                    f"{name:<34} {percentile(timings, 50):>9.1f} {percentile(timings, 99):>9.1f} {queries:>8}"
+                )
+
+            raw = {row['product_size__product__category_id']: row['revenue'] for row in raw_by_category()}
+            summarized = {row['id']: row['revenue'] for row in analytics.revenue_by_category()}
+            matches = raw.keys() == summarized.keys() and all(
+                float(raw[key]) == summarized[key] for key in raw
+            )
+            self.stdout.write(
+                f"\nDòng tổng hợp: {SalesDayItem.objects.count()} (so với {OrderItem.objects.count()} dòng order_items); "
+                + (self.style.SUCCESS("khớp với order_items") if matches else self.style.ERROR("KHÔNG khớp với order_items"))
+            )
+
+    def timed_refresh(self, label, full=False):
+        started = time.perf_counter()
+        result = analytics.refresh(full=full)
+        self.stdout.write(
+            f"{label}: tính lại {result.days} ngày, {result.rows} dòng tổng hợp, "
+            f"{time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from core.bench import benchmark_database, percentile, run_concurrently, seed_catalog
+from orders.models import Order, OrderTicket
+from products.models import ProductSize
+
+
+class Command(BaseCommand):
+    help = "So sánh độ trễ (p50/p99) và throughput của checkout đồng bộ với chế độ hàng đợi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--orders', type=int, default=1000, help="Số đơn mỗi chế độ")
+        parser.add_argument('--lines', type=int, default=5, help="Số dòng mỗi đơn")
+        parser.add_argument('--batch-size', type=int, default=50, help="Kích thước lô của worker")
+        parser.add_argument(
+            '--worker', choices=('concurrent', 'after'), default='concurrent',
+            help="Chế độ hàng đợi: worker chạy song song với request, hoặc chỉ chạy sau khi nhận hết request",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(200, stock=1_000_000)
+            user = User.objects.create_user('bench', password='bench')
+            size_keys = list(ProductSize.objects.values_list('product_id', 'size__name'))
+            payloads = []
+            for i in range(options['orders']):
+                rng = random.Random(i)
+                payloads.append(json.dumps({
+                    'receiver': 'Bench', 'phone': '0900000000', 'address': 'HCM',
+                    'items': [
+                        {'product_id': product_id, 'size_id': size, 'quantity': rng.randint(1, 3)}
+                        for product_id, size in rng.sample(size_keys, options['lines'])
+                    ],
+                }))
+
+            local = threading.local()
+
+            def post(i):
+                if not hasattr(local, 'client'):
+                    local.client = Client()
+                    local.client.force_login(user)
+                started = time.perf_counter()
+                response = local.client.post(
+                    '/orders/process-checkout/', payloads[i], content_type='application/json'
+                )
+                latency = (time.perf_counter() - started) * 1000
+                if response.status_code not in (200, 202):
+                    raise RuntimeError(response.content)
+                return latency
+
+            self.stdout.write(
+                f"{'mode':<8} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'orders/s':>9} {'errors':>7}"
+            )
+            for mode in ('sync', 'queued'):
+                Order.objects.all().delete()
+                OrderTicket.objects.all().delete()
+                worker = None
+                if mode == 'queued' and options['worker'] == 'concurrent':
+                    worker = self.start_worker(options['batch_size'])
+                with override_settings(CHECKOUT_MODE=mode):
+                    started = time.perf_counter()
+                    elapsed, results = run_concurrently(post, options['threads'], len(payloads))
+                    if mode == 'queued' and worker is None:
+                        worker = self.start_worker(options['batch_size'])
+                    if worker:
+                        while OrderTicket.objects.exclude(status__in=('done', 'failed')).exists():
+                            time.sleep(0.01)
+                    sustained = time.perf_counter() - started
+                if worker:
+                    worker.send_signal(signal.SIGINT)
+                    worker.wait()
+
+                latencies = [r for r in results if isinstance(r, float)]
+                placed = Order.objects.count()
+                self.stdout.write(
+                    f"{mode:<8} {statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f} "
+                    f"{len(results) / elapsed:>8.1f} {placed / sustained:>9.1f} {len(results) - len(latencies):>7}"
+                )
+
+    def start_worker(self, batch_size):
+        """Chạy ``process_order_queue`` ở process riêng (như production) trên database benchmark"""
+        env = {**os.environ, 'DB_NAME': connection.settings_dict['NAME']}
+        return subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'process_order_queue',
+             '--batch-size', str(batch_size), '--sleep', '0.01'],
+            env=env, stdout=subprocess.DEVNULL,
+        )
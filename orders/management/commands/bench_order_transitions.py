@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.db.models import F, Sum
+from django.test.utils import CaptureQueriesContext
+
+from core.bench import benchmark_database, seed_catalog, seed_orders
+from orders.models import Order, OrderItem, OrderStatusEvent
+from orders.states import transition_orders
+from products.models import ProductSize
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian chuyển trạng thái hàng loạt (xác nhận, huỷ kèm trả kho) so với xử lý từng đơn"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50_000)
+        parser.add_argument('--lines', type=int, default=4, help="Số dòng mỗi đơn")
+        parser.add_argument('--baseline', type=int, default=1000, help="Số đơn xử lý từng cái để so sánh")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(200, stock=1_000_000)
+            seed_orders(options['orders'], lines=options['lines'], days=30, cancelled_ratio=0, status='pending')
+            reset_queries()
+
+            self.stdout.write(f"{'thao tác':<32} {'đơn':>7} {'giây':>7} {'đơn/s':>9} {'queries':>8}")
+            self.run("xác nhận (hàng loạt)", lambda: transition_orders(Order.objects.all(), 'confirmed'))
+
+            stock_before = self.total_stock()
+            cutoff = Order.objects.order_by('id').values_list('id', flat=True)[options['orders'] // 2]
+            to_cancel = Order.objects.filter(id__lt=cutoff)
+            expected = OrderItem.objects.filter(order__in=to_cancel).aggregate(total=Sum('quantity'))['total']
+            self.run("huỷ + trả kho (hàng loạt)", lambda: transition_orders(to_cancel, 'cancelled'))
+            restored = self.total_stock() - stock_before
+
+            sample = list(
+                Order.objects.filter(status='confirmed').prefetch_related('items')[:options['baseline']]
+            )
+            self.run("huỷ + trả kho (từng đơn)", lambda: self.cancel_one_by_one(sample))
+
+            self.stdout.write(
+                f"\nTồn kho trả lại khi huỷ hàng loạt: {restored} (cần {expected}) "
+                + (self.style.SUCCESS("đúng") if restored == expected else self.style.ERROR("SAI"))
+                + f"; {OrderStatusEvent.objects.count()} sự kiện trạng thái"
+            )
+
+    def run(self, label, func):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+        changed = result.changed if hasattr(result, 'changed') else result
+        self.stdout.write(
+            f"{label:<32} {changed:>7} {elapsed:>7.2f} {changed / elapsed:>9.0f} {len(ctx.captured_queries):>8}"
+        )
+        reset_queries()
+
+    @staticmethod
+    def cancel_one_by_one(orders):
+        """Cách làm cũ: mỗi đơn một lần lưu, một sự kiện và một UPDATE tồn kho cho mỗi dòng"""
+        for order in orders:
+            with transaction.atomic():
+                for item in order.items.all():
+                    ProductSize.objects.filter(pk=item.product_size_id).update(quantity=F('quantity') + item.quantity)
+                order.status = 'cancelled'
+                order.save(update_fields=['status', 'updated_at'])
+                OrderStatusEvent.objects.create(order=order, from_status='confirmed', to_status='cancelled')
+        return len(orders)
+
+    @staticmethod
+    def total_stock():
+        return ProductSize.objects.aggregate(total=Sum('quantity'))['total']
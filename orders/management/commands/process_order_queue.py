@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.queue import DEFAULT_BATCH_SIZE, process_batch
+
+
+class Command(BaseCommand):
+    help = "Worker tạo đơn hàng từ hàng đợi (CHECKOUT_MODE='queued')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0.5, help="Số giây chờ khi hàng đợi trống")
+        parser.add_argument('--once', action='store_true', help="Xử lý hết hàng đợi rồi thoát")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = process_batch(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f"Đã xử lý {processed} yêu cầu (tổng {total}).")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Worker dừng, đã xử lý {total} yêu cầu."))
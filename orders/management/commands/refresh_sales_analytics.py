@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.analytics import refresh
+
+
+class Command(BaseCommand):
+    help = "Gộp các đơn hàng mới/đổi từ lần chạy trước vào bảng tổng hợp doanh số"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Tính lại toàn bộ thay vì chỉ phần thay đổi")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = refresh(full=options['full'])
+        elapsed = time.perf_counter() - started
+        kind = "toàn bộ" if result.full else "tăng dần"
+        self.stdout.write(self.style.SUCCESS(
+            f"Làm mới {kind}: tính lại {result.days} ngày, {result.rows} dòng SKU trong {elapsed:.2f}s."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(verbose_name='Dữ liệu đặt hàng')),
+                ('status', models.CharField(choices=[('queued', 'Đang chờ'), ('processing', 'Đang xử lý'), ('done', 'Hoàn tất'), ('failed', 'Thất bại')], default='queued', max_length=20, verbose_name='Trạng thái')),
+                ('worker', models.CharField(blank=True, default='', max_length=64)),
+                ('error', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Ngày xử lý')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orders.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Phiếu đặt hàng',
+                'verbose_name_plural': 'Phiếu đặt hàng',
+                'db_table': 'order_queue',
+                'indexes': [models.Index(fields=['status', 'id'], name='order_queue_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_queue'),
+        ('products', '0004_search_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Số lượng')),
+                ('added_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày thêm')),
+                ('product_size', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='products.productsize')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sản phẩm trong giỏ',
+                'verbose_name_plural': 'Giỏ hàng',
+                'db_table': 'cart_items',
+                'unique_together': {('user', 'product_size')},
+            },
+        ),
+    ]
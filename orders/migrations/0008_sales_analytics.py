@@ -0,0 +1,85 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_cart_item'),
+        ('products', '0007_productsize_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'analytics_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesDay',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='Ngày')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Số đơn')),
+                ('items', models.PositiveIntegerField(default=0, verbose_name='Số sản phẩm')),
+                ('revenue', models.FloatField(default=0, verbose_name='Doanh thu')),
+                ('stale', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Doanh số theo ngày',
+                'verbose_name_plural': 'Doanh số theo ngày',
+                'db_table': 'sales_days',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesDayItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Ngày')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Số lượng')),
+                ('revenue', models.FloatField(default=0, verbose_name='Doanh thu')),
+            ],
+            options={
+                'verbose_name': 'Doanh số theo SKU',
+                'verbose_name_plural': 'Doanh số theo SKU',
+                'db_table': 'sales_day_items',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='salesdayitem',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.category'),
+        ),
+        migrations.AddField(
+            model_name='salesdayitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='salesdayitem',
+            name='size',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.size'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='salesdayitem',
+            unique_together={('day', 'product', 'size')},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_sales_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('pending', 'Chờ xác nhận'), ('confirmed', 'Đã xác nhận'), ('shipping', 'Đang giao hàng'), ('completed', 'Hoàn thành'), ('cancelled', 'Đã hủy')], max_length=20, verbose_name='Từ trạng thái')),
+                ('to_status', models.CharField(choices=[('pending', 'Chờ xác nhận'), ('confirmed', 'Đã xác nhận'), ('shipping', 'Đang giao hàng'), ('completed', 'Hoàn thành'), ('cancelled', 'Đã hủy')], max_length=20, verbose_name='Sang trạng thái')),
+                ('note', models.CharField(blank=True, default='', max_length=255, verbose_name='Ghi chú')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời điểm')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người thực hiện')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Lịch sử trạng thái',
+                'verbose_name_plural': 'Lịch sử trạng thái',
+                'db_table': 'order_status_events',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+    ]
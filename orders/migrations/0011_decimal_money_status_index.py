@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_user_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Tổng tiền'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Giá'),
+        ),
+        migrations.AlterField(
+            model_name='salesday',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Doanh thu'),
+        ),
+        migrations.AlterField(
+            model_name='salesdayitem',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Doanh thu'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_decimal_money_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderticket',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
-from products.models import ProductSize
+from django.utils import timezone
+from products.models import Category, Product, ProductSize, Size
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -16,7 +17,7 @@ class Order(models.Model):
     phone = models.CharField(max_length=20, verbose_name='Số điện thoại')
     address = models.TextField(verbose_name='Địa chỉ')
     note = models.TextField(blank=True, null=True, verbose_name='Ghi chú')
-    total_amount = models.FloatField(verbose_name='Tổng tiền')  # FloatField để match với Product.price
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, verbose_name='Tổng tiền')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Trạng thái')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')
@@ -24,6 +25,15 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        indexes = [
+            # orders.analytics: tìm đơn mới/đổi từ checkpoint và gom theo ngày tạo
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # Bộ lọc trạng thái của admin (sắp theo -created_at) và orders.states
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # orders.history: lịch sử đơn của một khách, phân trang keyset theo (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+        ]
         verbose_name = 'Đơn hàng'
         verbose_name_plural = 'Đơn hàng'
     
@@ -50,7 +60,7 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product_size = models.ForeignKey(ProductSize, on_delete=models.PROTECT)  # PROTECT để giữ lịch sử
     quantity = models.IntegerField(verbose_name='Số lượng')
-    price = models.FloatField(verbose_name='Giá')  # FloatField để match với Product.price
+    price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Giá')  # Giá tại thời điểm đặt
     
     class Meta:
         db_table = 'order_items'
@@ -66,4 +76,150 @@ class OrderItem(models.Model):
     
     def formatted_total(self):
         """Format thành tiền"""
-        return f"{self.get_total():,.0f}đ".replace(",", ".")
\ No newline at end of file
+        return f"{self.get_total():,.0f}đ".replace(",", ".")
+
+class OrderStatusEvent(models.Model):
+    """Lịch sử chuyển trạng thái đơn hàng, chỉ thêm không sửa (ghi bởi ``orders.states``)"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name='Từ trạng thái')
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name='Sang trạng thái')
+    actor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Người thực hiện'
+    )
+    note = models.CharField(max_length=255, blank=True, default='', verbose_name='Ghi chú')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Thời điểm')
+
+    class Meta:
+        db_table = 'order_status_events'
+        ordering = ['created_at', 'id']
+        verbose_name = 'Lịch sử trạng thái'
+        verbose_name_plural = 'Lịch sử trạng thái'
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status} -> {self.to_status}"
+
+
+class IdempotencyKey(models.Model):
+    """Response đầu tiên của một request có header Idempotency-Key, để replay khi client gửi lại"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # None: đang xử lý
+    response_body = models.TextField(blank=True, default='')
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'order_idempotency_keys'
+        unique_together = ('user', 'key')
+        verbose_name = 'Idempotency key'
+        verbose_name_plural = 'Idempotency keys'
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+
+class OrderTicket(models.Model):
+    """Yêu cầu đặt hàng đã nhận ở chế độ CHECKOUT_MODE='queued', chờ worker tạo Order"""
+    STATUS_CHOICES = [
+        ('queued', 'Đang chờ'),
+        ('processing', 'Đang xử lý'),
+        ('done', 'Hoàn tất'),
+        ('failed', 'Thất bại'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='order_tickets')
+    payload = models.JSONField(verbose_name='Dữ liệu đặt hàng')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='Trạng thái')
+    worker = models.CharField(max_length=64, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Worker nhận ticket lúc nào (xem orders.queue.CLAIM_LEASE)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Ngày xử lý')
+
+    class Meta:
+        db_table = 'order_queue'
+        indexes = [models.Index(fields=['status', 'id'], name='order_queue_status_idx')]
+        verbose_name = 'Phiếu đặt hàng'
+        verbose_name_plural = 'Phiếu đặt hàng'
+
+    def __str__(self):
+        return f"Ticket #{self.id} ({self.status})"
+
+    def as_json(self):
+        data = {'ticket_id': self.id, 'status': self.status}
+        if self.order_id:
+            data['order_id'] = self.order_id
+        if self.error:
+            data.update(self.error)
+        return data
+
+
+class CartItem(models.Model):
+    """Một dòng trong giỏ hàng trên server của user (giá và tồn kho đọc từ ProductSize khi hiển thị)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
+    product_size = models.ForeignKey(ProductSize, on_delete=models.CASCADE, related_name='cart_items')
+    quantity = models.PositiveIntegerField(default=1, verbose_name='Số lượng')
+    added_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày thêm')
+
+    class Meta:
+        db_table = 'cart_items'
+        unique_together = ('user', 'product_size')
+        verbose_name = 'Sản phẩm trong giỏ'
+        verbose_name_plural = 'Giỏ hàng'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.product_size_id} x {self.quantity}"
+
+
+class SalesDay(models.Model):
+    """Bảng tổng hợp doanh số theo ngày tạo đơn (xem ``orders.analytics``)"""
+    day = models.DateField(primary_key=True, verbose_name='Ngày')
+    orders = models.PositiveIntegerField(default=0, verbose_name='Số đơn')
+    items = models.PositiveIntegerField(default=0, verbose_name='Số sản phẩm')
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Doanh thu')
+    # Có đơn của ngày này bị xoá: lần làm mới sau phải tính lại cả ngày
+    stale = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'sales_days'
+        ordering = ['day']
+        verbose_name = 'Doanh số theo ngày'
+        verbose_name_plural = 'Doanh số theo ngày'
+
+    def __str__(self):
+        return f"{self.day}: {self.revenue:,.0f}đ"
+
+
+class SalesDayItem(models.Model):
+    """Bảng tổng hợp doanh số theo ngày và SKU (sản phẩm + size), kèm danh mục để gom nhóm
+    mà không phải join"""
+    day = models.DateField(verbose_name='Ngày')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    size = models.ForeignKey(Size, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=0, verbose_name='Số lượng')
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Doanh thu')
+
+    class Meta:
+        db_table = 'sales_day_items'
+        unique_together = ('day', 'product', 'size')
+        verbose_name = 'Doanh số theo SKU'
+        verbose_name_plural = 'Doanh số theo SKU'
+
+    def __str__(self):
+        return f"{self.day}: {self.product_id}/{self.size_id} x {self.quantity}"
+
+
+class AnalyticsCheckpoint(models.Model):
+    """Mốc ``Order.updated_at`` của lần tổng hợp gần nhất"""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_checkpoints'
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
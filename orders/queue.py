@@ -0,0 +1,73 @@
+"""Hàng đợi đặt hàng bất đồng bộ (CHECKOUT_MODE='queued').
+
+Endpoint checkout chỉ kiểm tra payload rồi ghi một ``OrderTicket`` (một câu INSERT) và
+trả ticket id ngay. ``manage.py process_order_queue`` lấy ticket theo lô và gọi
+``place_order`` cho từng ticket, mỗi ticket một transaction riêng nên một đơn lỗi
+không kéo theo các đơn khác.
+
+Ticket đã nhận giữ ``claimed_at``: worker chết giữa chừng thì sau ``CLAIM_LEASE`` ticket
+được worker khác nhận lại. Đơn và trạng thái ticket ghi trong cùng một transaction, chỉ
+commit khi ticket vẫn thuộc worker hiện tại, nên ticket nhận lại không tạo đơn hai lần.
+"""
+import datetime
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .checkout import CheckoutError, place_order
+from .models import OrderTicket
+
+DEFAULT_BATCH_SIZE = 50
+CLAIM_LEASE = datetime.timedelta(minutes=5)
+
+
+def enqueue_order(user, shipping, items):
+    """Ghi yêu cầu đặt hàng đã kiểm tra vào hàng đợi, trả về ``OrderTicket``"""
+    return OrderTicket.objects.create(
+        user=user,
+        payload={'shipping': shipping, 'items': [list(item) for item in items]},
+    )
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """Nhận tối đa ``batch_size`` ticket đang chờ (hoặc bị bỏ dở quá ``CLAIM_LEASE``) cho worker này.
+
+    UPDATE lặp lại điều kiện của SELECT bảo đảm hai worker không nhận trùng ticket.
+    """
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    # claimed_at NULL: ticket 'processing' từ trước khi có lease, coi như đã quá hạn
+    expired = Q(claimed_at__lt=now - CLAIM_LEASE) | Q(claimed_at__isnull=True)
+    claimable = Q(status='queued') | (Q(status='processing') & expired)
+    ids = list(OrderTicket.objects.filter(claimable).order_by('id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    OrderTicket.objects.filter(claimable, id__in=ids).update(status='processing', worker=token, claimed_at=now)
+    return list(OrderTicket.objects.filter(worker=token, status='processing').order_by('id'))
+
+
+def process_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """Xử lý một lô ticket, trả về số ticket đã xử lý"""
+    tickets = claim_batch(batch_size)
+    if not tickets:
+        return 0
+    users = User.objects.in_bulk({ticket.user_id for ticket in tickets})
+
+    for ticket in tickets:
+        items = [tuple(item) for item in ticket.payload['items']]
+        result = {'status': 'done', 'processed_at': timezone.now()}
+        # Mỗi ticket một transaction ngắn: không giữ khoá ghi suốt cả lô (SQLite chỉ có một writer)
+        with transaction.atomic():
+            try:
+                result['order'] = place_order(users[ticket.user_id], ticket.payload['shipping'], items)
+            except CheckoutError as e:
+                result.update(status='failed', error={'message': e.message, **e.extra})
+            except Exception as e:
+                result.update(status='failed', error={'message': f'Có lỗi xảy ra: {str(e)}'})
+            if not OrderTicket.objects.filter(pk=ticket.pk, worker=ticket.worker).update(**result):
+                # Quá hạn và đã bị worker khác nhận lại: bỏ đơn vừa tạo, để worker đó xử lý
+                transaction.set_rollback(True)
+    return len(tickets)
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from products.models import Product, ProductSize
+from products.signals import products_bulk_changed
+
+from .analytics import mark_stale
+from .cart import invalidate_cart, invalidate_carts_with
+from .models import CartItem, Order
+
+
+@receiver(post_save, sender=ProductSize)
+def invalidate_carts_for_size(sender, instance, raw=False, **kwargs):
+    """Tồn kho của size thay đổi: giỏ hàng chứa size đó phải tính lại"""
+    if raw:
+        return
+    invalidate_carts_with(product_size_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_for_deleted_item(sender, instance, **kwargs):
+    """Dòng giỏ hàng bị xoá, kể cả khi xoá theo size/sản phẩm (CASCADE).
+
+    Đọc ``user_id`` từ chính dòng bị xoá nên xoá nhiều size một lúc không tốn thêm query.
+    """
+    invalidate_cart(instance.user_id)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_carts_for_product(sender, instance, created=False, raw=False, **kwargs):
+    """Giá/tên/trạng thái ẩn của sản phẩm thay đổi: giỏ hàng chứa sản phẩm phải tính lại"""
+    if raw or created:
+        return
+    invalidate_carts_with(product_ids=[instance.pk])
+
+
+@receiver(products_bulk_changed)
+def invalidate_carts_for_bulk_change(sender, product_ids, **kwargs):
+    """Nhập sản phẩm hàng loạt có thể đổi giá/tồn kho của sản phẩm đang nằm trong giỏ"""
+    invalidate_carts_with(product_ids=product_ids)
+
+
+@receiver(post_delete, sender=Order)
+def mark_sales_day_stale(sender, instance, **kwargs):
+    """Đơn bị xoá: bảng tổng hợp doanh số phải tính lại ngày tạo của đơn"""
+    mark_stale(timezone.localdate(instance.created_at))
@@ -0,0 +1,117 @@
+"""Máy trạng thái của đơn hàng: các bước chuyển hợp lệ và API chuyển hàng loạt.
+
+::
+
+    pending ──> confirmed ──> shipping ──> completed
+       │            │
+       └────────────┴──> cancelled
+
+``transition_orders`` chuyển cả một queryset theo lô ``batch_size`` đơn. Mỗi lô chạy trong
+một transaction với số câu lệnh cố định: khoá và đọc trạng thái hiện tại, một UPDATE cho
+mỗi trạng thái nguồn, một ``bulk_create`` vào ``OrderStatusEvent``, và khi huỷ thì một query
+gom số lượng theo ProductSize rồi trả kho bằng ``release_stock``. Đơn không thể chuyển sang
+trạng thái đích (ví dụ đã giao) được bỏ qua và đếm trong kết quả.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from products.api import bump_product_versions
+from products.inventory import release_stock
+
+from .cart import invalidate_carts_with
+from .models import Order, OrderItem, OrderStatusEvent
+
+TRANSITIONS = {
+    'pending': ('confirmed', 'cancelled'),
+    'confirmed': ('shipping', 'cancelled'),
+    'shipping': ('completed',),
+    'completed': (),
+    'cancelled': (),
+}
+# Trạng thái đích làm đơn trả lại tồn kho đã giữ
+RELEASES_STOCK = ('cancelled',)
+BATCH_SIZE = 2000
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+@dataclass
+class TransitionResult:
+    target: str
+    changed: int = 0
+    skipped: int = 0
+    by_source: Counter = field(default_factory=Counter)
+    released_sizes: int = 0
+
+
+def can_transition(source, target):
+    return target in TRANSITIONS.get(source, ())
+
+
+def sources_for(target):
+    """Các trạng thái được phép chuyển sang ``target``"""
+    if target not in TRANSITIONS:
+        raise InvalidTransition(f"Trạng thái không hợp lệ: {target}")
+    return [source for source, targets in TRANSITIONS.items() if target in targets]
+
+
+def _transition_batch(ids, target, sources, actor, note, result):
+    with transaction.atomic():
+        current = Order.objects.select_for_update().filter(id__in=ids).values_list('id', 'status')
+        by_source = {}
+        for order_id, status in current:
+            if status in sources:
+                by_source.setdefault(status, []).append(order_id)
+
+        now = timezone.now()
+        events = []
+        moved = []
+        for source, source_ids in by_source.items():
+            # update() không tự đổi updated_at (orders.analytics dựa vào nó)
+            Order.objects.filter(id__in=source_ids).update(status=target, updated_at=now)
+            events.extend(
+                OrderStatusEvent(
+                    order_id=order_id, from_status=source, to_status=target,
+                    actor=actor, note=note, created_at=now,
+                )
+                for order_id in source_ids
+            )
+            result.by_source[source] += len(source_ids)
+            moved.extend(source_ids)
+        OrderStatusEvent.objects.bulk_create(events)
+
+        if target in RELEASES_STOCK and moved:
+            quantities = (
+                OrderItem.objects.filter(order_id__in=moved)
+                .values('product_size_id').annotate(total=Sum('quantity'))
+                .values_list('product_size_id', 'total').order_by()
+            )
+            released = release_stock(quantities)
+            # release_stock không phát signal: giỏ hàng và JSON sản phẩm có các size này phải tính lại tồn kho
+            invalidate_carts_with(product_size_ids=released)
+            bump_product_versions(product_size_ids=released)
+            result.released_sizes += len(released)
+
+    result.changed += len(moved)
+    result.skipped += len(ids) - len(moved)
+
+
+def transition_orders(orders, target, actor=None, note='', batch_size=BATCH_SIZE):
+    """Chuyển các đơn trong queryset ``orders`` sang ``target``, trả về ``TransitionResult``.
+
+    Đơn đang ở trạng thái không được chuyển sang ``target`` được bỏ qua (``skipped``).
+    Mỗi đơn đã chuyển có một ``OrderStatusEvent`` ghi ``actor`` và ``note``.
+    """
+    sources = sources_for(target)
+    result = TransitionResult(target)
+    ids = list(orders.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        _transition_batch(ids[start:start + batch_size], target, sources, actor, note, result)
+    return result
+
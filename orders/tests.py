@@ -1,3 +1,574 @@
-from django.test import TestCase
+import datetime
+import json
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.bench import run_concurrently, seed_catalog, seed_orders
+from core.pagination import EstimatedCountPaginator, estimated_count
+from orders import analytics
+from orders.cart import add_item, cache_key as cart_cache_key, cart_snapshot
+from orders.models import CartItem, Order, OrderItem, OrderStatusEvent, OrderTicket
+from orders.states import InvalidTransition, can_transition, transition_orders
+from orders.checkout import place_order
+from orders.queue import CLAIM_LEASE, claim_batch, process_batch
+from products.models import Product, ProductSize
+
+
+class ProcessCheckoutTests(TestCase):
+    url = '/orders/process-checkout/'
+
+    def setUp(self):
+        seed_catalog(20, sizes=('M', 'L'), stock=10)
+        self.user = User.objects.create_user('khach', password='x')
+        self.client.force_login(self.user)
+
+    def checkout(self, items, **extra):
+        payload = {'receiver': 'An', 'phone': '0900', 'address': 'HCM', 'items': items, **extra}
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def cart(self, n_lines):
+        return [
+            {'product_id': ps.product_id, 'size_id': 'M' if i % 2 else ps.size_id, 'quantity': 1}
+            for i, ps in enumerate(ProductSize.objects.filter(size__name='M').order_by('id')[:n_lines])
+        ]
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        counts = []
+        for n_lines in (1, 20):
+            items = self.cart(n_lines)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.checkout(items)
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(OrderItem.objects.count(), 21)
+
+    def test_malformed_items_are_rejected_with_400(self):
+        good = self.cart(1)[0]
+        for items in (
+            ['x'], [1], 'abc', {'product_id': 1},
+            [{**good, 'product_id': None}], [{'size_id': 'M', 'quantity': 1}], [{**good, 'product_id': 'abc'}],
+            [{**good, 'product_id': 2 ** 64}], [{**good, 'quantity': 'hai'}], [{**good, 'quantity': 0}],
+            [{**good, 'quantity': None}], [{**good, 'size_id': ['M']}],
+        ):
+            response = self.checkout(items)
+            self.assertEqual(response.status_code, 400, items)
+            self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(self.checkout([good], receiver=['An']).status_code, 400)
+        response = self.client.post(self.url, '[1]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_total_is_computed_on_server(self):
+        items = self.cart(3)
+        items[0]['quantity'] = 2
+        response = self.checkout(items, total_amount=1)
+        order = Order.objects.get(pk=response.json()['order_id'])
+        expected = sum(item.price * item.quantity for item in order.items.all())
+        self.assertEqual(order.total_amount, expected)
+        self.assertEqual(response.json()['total_amount'], expected)
+
+    def test_money_is_exact_decimal(self):
+        Product.objects.update(price=Decimal('0.10'))
+        response = self.checkout([dict(item, quantity=3) for item in self.cart(1)])
+        order = Order.objects.get(pk=response.json()['order_id'])
+        self.assertEqual(order.total_amount, Decimal('0.30'))
+        self.assertEqual(order.items.get().price, Decimal('0.10'))
+        self.assertEqual(response.json()['total_amount'], 0.3)
+
+    def test_short_stock_rejects_whole_order(self):
+        items = self.cart(2)
+        items[1]['quantity'] = 11
+        response = self.checkout(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(f['product_id'], f['requested'], f['available']) for f in response.json()['failed_items']],
+            [(items[1]['product_id'], 11, 10)],
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(set(ProductSize.objects.values_list('quantity', flat=True)), {10})
+
+    def test_unknown_size_is_rejected(self):
+        response = self.checkout([{'product_id': 1, 'size_id': 'XXL', 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class IdempotentCheckoutTests(TestCase):
+    url = '/orders/process-checkout/'
+
+    def setUp(self):
+        seed_catalog(2, sizes=('M',), stock=10)
+        self.user = User.objects.create_user('khach', password='x')
+        self.client.force_login(self.user)
+        self.payload = json.dumps({
+            'receiver': 'An', 'phone': '0900', 'address': 'HCM',
+            'items': [{'product_id': 1, 'size_id': 'M', 'quantity': 2}],
+        })
+
+    def checkout(self, key, payload=None):
+        return self.client.post(
+            self.url, payload or self.payload, content_type='application/json', headers={'Idempotency-Key': key}
+        )
+
+    def test_retry_replays_first_response_without_writing(self):
+        first = self.checkout('k-1')
+        with self.assertNumQueries(3):  # session, user, idempotency key
+            retry = self.checkout('k-1')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(ProductSize.objects.get(product_id=1).quantity, 8)
+
+    def test_new_key_places_new_order(self):
+        self.checkout('k-1')
+        self.checkout('k-2')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.checkout('k-1')
+        other = self.payload.replace('"quantity": 2', '"quantity": 1')
+        self.assertEqual(self.checkout('k-1', other).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class CartApiTests(TestCase):
+    url = '/orders/cart/api/'
+
+    def setUp(self):
+        cache.clear()
+        seed_catalog(6, sizes=('M', 'L'), stock=5)
+        self.user = User.objects.create_user('khach', password='x')
+        self.client.force_login(self.user)
+
+    def add(self, product_id, size='M', quantity=1):
+        payload = {'product_id': product_id, 'size_id': size, 'quantity': quantity}
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_snapshot_is_one_query_and_cached(self):
+        for n_lines in (1, 5):
+            CartItem.objects.all().delete()
+            for product_id in range(1, n_lines + 1):
+                self.add(product_id)
+            cache.clear()
+            with self.assertNumQueries(3):  # session, user, giỏ hàng (join)
+                data = self.client.get(self.url).json()
+            self.assertEqual(len(data['items']), n_lines)
+            with self.assertNumQueries(2):
+                self.client.get(self.url)
+
+    def test_add_accumulates_and_prices_come_from_server(self):
+        self.add(1, quantity=2)
+        data = self.add(1, quantity=1).json()
+        [line] = data['items']
+        self.assertEqual(line['quantity'], 3)
+        self.assertEqual(data['total'], 3 * line['price'])
+
+    def test_price_change_invalidates_cache(self):
+        self.add(1)
+        self.client.get(self.url)
+        product = Product.objects.get(pk=1)
+        product.price = 1000
+        product.save()
+        self.assertEqual(self.client.get(self.url).json()['total'], 1000)
+
+    def test_checkout_by_other_user_updates_stock_flag(self):
+        self.add(1, quantity=4)
+        self.assertTrue(self.client.get(self.url).json()['items'][0]['in_stock'])
+
+        other = User.objects.create_user('khac', password='x')
+        place_order(other, {'receiver': 'B', 'phone': '1', 'address': 'HN', 'note': ''}, [(1, 'M', 3)])
+        [line] = self.client.get(self.url).json()['items']
+        self.assertEqual(line['available'], 2)
+        self.assertFalse(line['in_stock'])
+
+    def test_update_and_remove_line(self):
+        product_size_id = self.add(1).json()['items'][0]['product_size_id']
+        item_url = f'{self.url}items/{product_size_id}/'
+        data = self.client.patch(item_url, json.dumps({'quantity': 4}), content_type='application/json').json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(self.client.delete(item_url).json()['items'], [])
+        self.assertEqual(self.client.delete(item_url).status_code, 404)
+
+    def test_merge_guest_cart(self):
+        self.add(1, quantity=1)
+        guest = [
+            {'product_id': 1, 'size_id': 'M', 'quantity': 2},
+            {'product_id': 2, 'size_id': 'L', 'quantity': 1},
+            {'product_id': 999, 'size_id': 'M', 'quantity': 1},  # sản phẩm đã bị xoá
+        ]
+        data = self.client.post(
+            f'{self.url}merge/', json.dumps({'items': guest}), content_type='application/json'
+        ).json()
+        self.assertEqual([(line['product_id'], line['quantity']) for line in data['items']], [(1, 3), (2, 1)])
+
+    def test_checkout_removes_ordered_lines(self):
+        self.add(1)
+        self.add(2)
+        place_order(self.user, {'receiver': 'A', 'phone': '1', 'address': 'HN', 'note': ''}, [(1, 'M', 1)])
+        self.assertEqual([line['product_id'] for line in self.client.get(self.url).json()['items']], [2])
+
+@override_settings(CHECKOUT_MODE='queued')
+class QueuedCheckoutTests(TestCase):
+    url = '/orders/process-checkout/'
+
+    def setUp(self):
+        seed_catalog(2, sizes=('M',), stock=3)
+        self.user = User.objects.create_user('khach', password='x')
+        self.client.force_login(self.user)
+
+    def checkout(self, quantity):
+        payload = {
+            'receiver': 'An', 'phone': '0900', 'address': 'HCM',
+            'items': [{'product_id': 1, 'size_id': 'M', 'quantity': quantity}],
+        }
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_checkout_returns_ticket_and_worker_places_order(self):
+        response = self.checkout(2)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Order.objects.count(), 0)
+
+        self.assertEqual(process_batch(), 1)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(Order.objects.get().pk, status['order_id'])
+        self.assertEqual(ProductSize.objects.get(product_id=1).quantity, 1)
+
+    def test_failed_ticket_does_not_block_batch(self):
+        too_many = self.checkout(5).json()['ticket_id']
+        ok = self.checkout(1).json()['ticket_id']
+        self.assertEqual(process_batch(), 2)
+        self.assertEqual(OrderTicket.objects.get(pk=too_many).status, 'failed')
+        self.assertEqual(OrderTicket.objects.get(pk=ok).status, 'done')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_abandoned_claim_is_reclaimed_after_lease(self):
+        ticket_id = self.checkout(2).json()['ticket_id']
+        # Worker nhận ticket rồi chết trước khi xử lý
+        self.assertEqual([ticket.pk for ticket in claim_batch()], [ticket_id])
+        self.assertEqual(process_batch(), 0)
+
+        OrderTicket.objects.filter(pk=ticket_id).update(claimed_at=timezone.now() - CLAIM_LEASE - datetime.timedelta(seconds=1))
+        self.assertEqual(process_batch(), 1)
+        ticket = OrderTicket.objects.get(pk=ticket_id)
+        self.assertEqual(ticket.status, 'done')
+        self.assertEqual(Order.objects.get().pk, ticket.order_id)
+        self.assertEqual(ProductSize.objects.get(product_id=1).quantity, 1)
+
+    def test_ticket_of_other_user_is_hidden(self):
+        ticket_id = self.checkout(1).json()['ticket_id']
+        self.client.force_login(User.objects.create_user('khac', password='x'))
+        self.assertEqual(self.client.get(f'/orders/tickets/{ticket_id}/').status_code, 404)
+
+
+@skipUnless(connection.vendor != 'sqlite' or not connection.is_in_memory_db(), "cần database trên file")
+class ConcurrentIdempotentCheckoutTests(TransactionTestCase):
+    def test_concurrent_duplicates_create_one_order(self):
+        seed_catalog(1, sizes=('M',), stock=10)
+        user = User.objects.create_user('khach', password='x')
+        payload = json.dumps({
+            'receiver': 'An', 'phone': '0900', 'address': 'HCM',
+            'items': [{'product_id': 1, 'size_id': 'M', 'quantity': 1}],
+        })
+
+        def post(_):
+            client = Client()
+            client.force_login(user)
+            response = client.post(
+                '/orders/process-checkout/', payload, content_type='application/json',
+                headers={'Idempotency-Key': 'same-key'},
+            )
+            return response.json()['order_id']
+
+        _, order_ids = run_concurrently(post, workers=6, calls=12)
+        self.assertEqual(len(set(order_ids)), 1, order_ids)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(ProductSize.objects.get().quantity, 9)
+
+
+class SalesAnalyticsTests(TestCase):
+    def setUp(self):
+        seed_catalog(2, n_categories=2, sizes=('M', 'L'))
+        self.user = User.objects.create_user('khach', password='x')
+        self.sizes = {
+            (ps.product_id, ps.size.name): ps for ps in ProductSize.objects.select_related('size')
+        }
+        self.p1, self.p2 = Product.objects.order_by('id')
+        self.day1 = datetime.date(2025, 3, 1)
+        self.day2 = datetime.date(2025, 3, 2)
+
+    def order(self, day, lines, status='completed'):
+        """Đơn ngày ``day`` với ``lines`` là list (sản phẩm, size, số lượng, giá)"""
+        order = Order.objects.create(
+            user=self.user, receiver='An', phone='0900', address='HCM', status=status,
+            total_amount=sum(quantity * price for _, _, quantity, price in lines),
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product_size=self.sizes[product.id, size], quantity=quantity, price=price)
+            for product, size, quantity, price in lines
+        )
+        at = timezone.make_aware(datetime.datetime.combine(day, datetime.time(10)))
+        Order.objects.filter(pk=order.pk).update(created_at=at, updated_at=at)
+        return order
+
+    def test_reports_aggregate_summary_tables(self):
+        self.order(self.day1, [(self.p1, 'M', 2, 100), (self.p2, 'L', 1, 50)])
+        self.order(self.day1, [(self.p1, 'M', 1, 100)])
+        self.order(self.day2, [(self.p2, 'M', 3, 50)])
+        self.order(self.day2, [(self.p1, 'L', 5, 100)], status='cancelled')
+
+        result = analytics.refresh()
+        self.assertTrue(result.full)
+        self.assertEqual(analytics.summary(), {
+            'orders': 3, 'items': 7, 'revenue': 500.0,
+            'average_basket_value': 500 / 3, 'average_basket_items': 7 / 3,
+        })
+        self.assertEqual(analytics.revenue_by_day(), [
+            {'day': '2025-03-01', 'orders': 2, 'items': 4, 'revenue': 350.0},
+            {'day': '2025-03-02', 'orders': 1, 'items': 3, 'revenue': 150.0},
+        ])
+        self.assertEqual(
+            [(row['id'], row['quantity'], row['revenue']) for row in analytics.revenue_by_category()],
+            [(self.p1.category_id, 3, 300.0), (self.p2.category_id, 4, 200.0)],
+        )
+        self.assertEqual([(row['name'], row['revenue']) for row in analytics.revenue_by_size()], [('M', 450.0), ('L', 50.0)])
+        self.assertEqual([row['id'] for row in analytics.top_sellers()], [self.p2.id, self.p1.id])
+        self.assertEqual([row['id'] for row in analytics.top_products(start=self.day2)], [self.p2.id])
+
+    def test_incremental_refresh_only_recomputes_changed_days(self):
+        first = self.order(self.day1, [(self.p1, 'M', 2, 100)])
+        self.order(self.day2, [(self.p2, 'M', 1, 50)])
+        analytics.refresh()
+        self.assertEqual(analytics.refresh().days, 0)
+
+        # Huỷ đơn (admin action dùng update() kèm updated_at) và đơn mới của ngày 2
+        Order.objects.filter(pk=first.pk).update(status='cancelled', updated_at=timezone.now())
+        new = self.order(self.day2, [(self.p1, 'L', 1, 100)])
+        Order.objects.filter(pk=new.pk).update(updated_at=timezone.now())
+        result = analytics.refresh()
+        self.assertEqual((result.full, result.days), (False, 2))
+        self.assertEqual(
+            [(row['day'], row['orders'], row['revenue']) for row in analytics.revenue_by_day()],
+            [('2025-03-02', 2, 150.0)],
+        )
+
+        # Xoá đơn (không còn đơn nào vừa đổi): ngày của đơn bị đánh dấu cần tính lại
+        Order.objects.update(updated_at=timezone.now() - datetime.timedelta(days=1))
+        Order.objects.get(pk=new.pk).delete()
+        self.assertEqual(analytics.refresh().days, 1)
+        self.assertEqual(analytics.summary()['revenue'], 50.0)
+
+    def test_analytics_json(self):
+        self.order(self.day1, [(self.p1, 'M', 2, 100)])
+        analytics.refresh()
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+
+        data = self.client.get('/management/analytics/summary.json').json()
+        self.assertEqual(data['results']['revenue'], 200.0)
+        self.assertIsNotNone(data['refreshed_at'])
+        data = self.client.get('/management/analytics/products.json', {'by': 'quantity', 'limit': 1}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.p1.id])
+        data = self.client.get('/management/analytics/daily.json', {'start': '2025-03-02'}).json()
+        self.assertEqual(data['results'], [])
+        self.assertEqual(self.client.get('/management/analytics/daily.json', {'start': 'hôm qua'}).status_code, 400)
+        self.assertEqual(self.client.get('/management/analytics/unknown.json').status_code, 404)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/management/analytics/summary.json').status_code, 302)
+
+
+class OrderAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(50)
+        seed_orders(10_000, lines=3)
+        cls.admin = User.objects.create_superuser('admin', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_query_count_is_constant(self):
+        counts = []
+        for params in ({}, {'p': '50'}, {'status__exact': 'completed', 'o': '-5'}):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/admin/orders/order/', params)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        # Trang đầu và trang 50 như nhau; lọc thì không cần tra số dòng ước lượng
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[2], counts[0])
+        self.assertContains(response, 'sản phẩm (')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/orders/orderitem/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), counts[0])
+
+    def test_change_form_counts_items_in_query(self):
+        order = Order.objects.order_by('id').first()
+        response = self.client.get(f'/admin/orders/order/{order.id}/change/')
+        self.assertContains(response, '3 sản phẩm (')
+
+    def test_status_filter_uses_status_created_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        since = timezone.now() - datetime.timedelta(days=30)
+        plan = Order.objects.filter(status='cancelled', created_at__gte=since)[:100].explain()
+        self.assertIn('order_status_created_idx', plan)
+
+    def test_estimated_count_for_unfiltered_large_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        if estimated_count(Order) is None:
+            self.skipTest("Database không có thống kê số dòng")
+        paginator = EstimatedCountPaginator(Order.objects.all(), 20)
+        with self.assertNumQueries(1):
+            self.assertGreaterEqual(paginator.count, EstimatedCountPaginator.threshold)
+        # Queryset có điều kiện lọc vẫn đếm chính xác
+        filtered = EstimatedCountPaginator(Order.objects.filter(status='cancelled'), 20)
+        self.assertEqual(filtered.count, Order.objects.filter(status='cancelled').count())
+
+
+class OrderStateMachineTests(TestCase):
+    def setUp(self):
+        seed_catalog(5, sizes=('M', 'L'), stock=10)
+        self.user = User.objects.create_user('khach', password='x')
+        self.admin = User.objects.create_superuser('admin', password='x')
+        self.sizes = list(ProductSize.objects.order_by('id'))
+
+    def order(self, status='pending', lines=((0, 2), (1, 1))):
+        order = Order.objects.create(
+            user=self.user, receiver='An', phone='0900', address='HCM', total_amount=1, status=status,
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product_size=self.sizes[i], quantity=quantity, price=1) for i, quantity in lines
+        )
+        return order
+
+    def test_transitions_follow_state_machine_and_record_events(self):
+        pending, shipping = self.order(), self.order('shipping')
+        result = transition_orders(Order.objects.all(), 'confirmed', actor=self.admin, note='ok')
+        self.assertEqual((result.changed, result.skipped, dict(result.by_source)), (1, 1, {'pending': 1}))
+        self.assertEqual(Order.objects.get(pk=shipping.pk).status, 'shipping')
+
+        transition_orders(Order.objects.all(), 'completed')
+        events = list(OrderStatusEvent.objects.values_list('order_id', 'from_status', 'to_status', 'actor_id', 'note'))
+        self.assertEqual(events, [
+            (pending.id, 'pending', 'confirmed', self.admin.id, 'ok'),
+            (shipping.id, 'shipping', 'completed', None, ''),
+        ])
+        self.assertFalse(can_transition('completed', 'cancelled'))
+        with self.assertRaises(InvalidTransition):
+            transition_orders(Order.objects.all(), 'refunded')
+
+    def test_cancel_restores_stock_in_batches(self):
+        orders = [self.order(), self.order('confirmed', lines=((0, 1), (2, 4))), self.order('shipping')]
+        user_cart = User.objects.create_user('khach2', password='x')
+        add_item(user_cart, self.sizes[2])
+        cart_snapshot(user_cart)
+
+        result = transition_orders(Order.objects.all(), 'cancelled', batch_size=2)
+        self.assertEqual((result.changed, result.skipped, result.released_sizes), (2, 1, 3))
+        quantities = dict(ProductSize.objects.filter(pk__in=[ps.pk for ps in self.sizes[:3]]).values_list('pk', 'quantity'))
+        self.assertEqual(
+            [quantities[ps.pk] for ps in self.sizes[:3]], [10 + 3, 10 + 1, 10 + 4]
+        )
+        self.assertEqual(Order.objects.get(pk=orders[2].pk).status, 'shipping')
+        self.assertIsNone(cache.get(cart_cache_key(user_cart.id)))
+        # Huỷ lần nữa không trả kho hai lần
+        self.assertEqual(transition_orders(Order.objects.all(), 'cancelled').changed, 0)
+        self.assertEqual(ProductSize.objects.get(pk=self.sizes[0].pk).quantity, 13)
+
+    def test_query_count_does_not_depend_on_order_count(self):
+        counts = []
+        for n in (2, 40):
+            Order.objects.all().delete()
+            for _ in range(n):
+                self.order()
+            with CaptureQueriesContext(connection) as ctx:
+                transition_orders(Order.objects.all(), 'cancelled')
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_admin_action_uses_state_machine(self):
+        order = self.order()
+        self.client.force_login(self.admin)
+        self.client.post('/admin/orders/order/', {
+            'action': 'mark_as_cancelled', '_selected_action': [order.pk],
+        })
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'cancelled')
+        self.assertEqual(ProductSize.objects.get(pk=self.sizes[0].pk).quantity, 12)
+        self.assertTrue(OrderStatusEvent.objects.filter(order=order, actor=self.admin).exists())
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        seed_catalog(3, sizes=('M',))
+        self.user = User.objects.create_user('khach', password='x')
+        self.other = User.objects.create_user('khac', password='x')
+        self.product_size = ProductSize.objects.first()
+        self.client.force_login(self.user)
+
+    def make_orders(self, user, n):
+        orders = Order.objects.bulk_create(
+            Order(user=user, receiver='An', phone='0900', address='HCM', total_amount=100) for _ in range(n)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product_size=self.product_size, quantity=1, price=100) for order in orders
+        )
+        # Ba đơn liền nhau cùng created_at: thứ tự phụ thuộc id
+        base = timezone.now() - datetime.timedelta(days=1)
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=base + datetime.timedelta(minutes=i // 3))
+        return orders
+
+    def test_cursor_walks_history_newest_first_without_gaps(self):
+        self.make_orders(self.user, 25)
+        self.make_orders(self.other, 5)
+        expected = list(
+            Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        seen, cursor = [], None
+        while True:
+            response = self.client.get('/orders/my-orders/', {'cursor': cursor} if cursor else {})
+            seen += [order.id for order in response.context['orders']]
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertContains(response, '1 sản phẩm')
+
+    def test_query_count_does_not_depend_on_history_length(self):
+        self.make_orders(self.user, 3)
+        with CaptureQueriesContext(connection) as short:
+            self.client.get('/orders/my-orders/')
+        self.make_orders(self.user, 300)
+        with CaptureQueriesContext(connection) as long:
+            response = self.client.get('/orders/my-orders/')
+        self.assertEqual(len(short.captured_queries), len(long.captured_queries))
+        self.assertEqual(len(response.context['orders']), 10)
+
+    def test_items_json_is_scoped_to_owner(self):
+        [order] = self.make_orders(self.user, 1)
+        [other_order] = self.make_orders(self.other, 1)
+        data = self.client.get(f'/orders/order/{order.id}/items.json').json()
+        self.assertEqual([(item['size_name'], item['quantity']) for item in data['items']], [('M', 1)])
+        self.assertIn('<img', data['items'][0]['image_html'])
+        self.assertEqual(self.client.get(f'/orders/order/{other_order.id}/items.json').status_code, 404)
+        self.assertEqual(self.client.get('/orders/my-orders/', {'cursor': 'rác'}).status_code, 200)
+
+    def test_out_of_range_cursor_falls_back_to_first_page(self):
+        self.make_orders(self.user, 3)
+        for cursor in ('99999999999999999999.1', '-99999999999999999999.1', f'0.{2 ** 64}'):
+            response = self.client.get('/orders/my-orders/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['orders']), 3)
@@ -5,8 +5,13 @@ app_name = 'orders'
 
 urlpatterns = [
     path('cart/', views.cart_view, name='cart'),
+    path('cart/api/', views.cart_api, name='cart_api'),
+    path('cart/api/items/<int:product_size_id>/', views.cart_item_api, name='cart_item_api'),
+    path('cart/api/merge/', views.cart_merge, name='cart_merge'),
     path('checkout/', views.checkout_view, name='checkout'),
     path('process-checkout/', views.process_checkout, name='process_checkout'),
+    path('tickets/<int:ticket_id>/', views.ticket_status, name='ticket_status'),
     path('my-orders/', views.my_orders, name='my_orders'),
     path('order/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('order/<int:order_id>/items.json', views.order_items_json, name='order_items_json'),
 ]
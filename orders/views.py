@@ -2,19 +2,80 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
+from django.conf import settings
+from django.urls import reverse
 import json
-from .models import Order, OrderItem
-from products.models import Product, ProductSize, Size
+from .models import Order, OrderTicket
+from .cart import add_item, cart_snapshot, merge_lines, remove_item, set_quantity
+from .checkout import CheckoutError, parse_checkout, place_order, resolve_lines
+from .history import order_items, orders_page
+from .idempotency import idempotent
+from .queue import enqueue_order
+from products.reference import all_sizes
 
 @login_required
 def cart_view(request):
     """Hiển thị trang giỏ hàng"""
     # Lấy danh sách sizes để hiển thị trong modal (nếu cần)
-    sizes = Size.objects.all()
+    sizes = all_sizes()
     return render(request, 'orders/cart.html', {'sizes': sizes})
 
 
+def _invalid_cart_data():
+    return JsonResponse({'status': 'error', 'message': 'Dữ liệu không hợp lệ!'}, status=400)
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def cart_api(request):
+    """Giỏ hàng trên server: GET trả giỏ hàng (giá, tồn kho, tổng tiền hiện tại),
+    POST thêm sản phẩm ``{product_id, size_id, quantity}``"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            [(product_size, _)] = resolve_lines([(int(data.get('product_id')), data.get('size_id'), 1)])
+            add_item(request.user, product_size, data.get('quantity', 1))
+        except CheckoutError as e:
+            return JsonResponse(e.as_json(), status=400)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return _invalid_cart_data()
+    return JsonResponse({'status': 'success', **cart_snapshot(request.user)})
+
+
+@login_required
+@require_http_methods(["PATCH", "DELETE"])
+def cart_item_api(request, product_size_id):
+    """PATCH ``{quantity}`` đổi số lượng một dòng (0 là xoá), DELETE xoá dòng"""
+    try:
+        if request.method == 'DELETE':
+            found = remove_item(request.user, product_size_id)
+        else:
+            found = set_quantity(request.user, product_size_id, json.loads(request.body).get('quantity'))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return _invalid_cart_data()
+    if not found:
+        return JsonResponse({'status': 'error', 'message': 'Sản phẩm không có trong giỏ hàng!'}, status=404)
+    return JsonResponse({'status': 'success', **cart_snapshot(request.user)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def cart_merge(request):
+    """Gộp giỏ hàng khách (localStorage) ``{items: [...]}`` vào giỏ trên server sau khi đăng nhập.
+
+    Dòng không còn tồn tại (sản phẩm/size đã bị xoá) được bỏ qua.
+    """
+    try:
+        items = [
+            (int(item.get('product_id')), item.get('size_id'), int(item.get('quantity', 1)))
+            for item in json.loads(request.body).get('items') or []
+        ]
+        merge_lines(request.user, resolve_lines(items, skip_missing=True))
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return _invalid_cart_data()
+    return JsonResponse({'status': 'success', **cart_snapshot(request.user)})
+
+
 @login_required
 def checkout_view(request):
     """Hiển thị trang thanh toán"""
@@ -23,97 +84,35 @@ def checkout_view(request):
 
 @login_required
 @require_http_methods(["POST"])
+@idempotent
 def process_checkout(request):
-    """Xử lý đơn hàng từ frontend"""
+    """Xử lý đơn hàng từ frontend (client retry an toàn với header Idempotency-Key)"""
     try:
         # Parse JSON data từ request
         data = json.loads(request.body)
+        shipping, items = parse_checkout(data)
         
-        # Lấy thông tin giao hàng
-        receiver = data.get('receiver', '').strip()
-        phone = data.get('phone', '').strip()
-        address = data.get('address', '').strip()
-        note = data.get('note', '').strip()
-        items = data.get('items', [])
-        total_amount = float(data.get('total_amount', 0))
-        
-        # Validate dữ liệu
-        if not receiver or not phone or not address:
+        if settings.CHECKOUT_MODE == 'queued':
+            # Chỉ ghi vào hàng đợi, worker sẽ tạo đơn; client theo dõi qua status_url
+            ticket = enqueue_order(request.user, shipping, items)
             return JsonResponse({
-                'status': 'error',
-                'message': 'Vui lòng điền đầy đủ thông tin!'
-            }, status=400)
+                'status': 'accepted',
+                'message': 'Đơn hàng đang được xử lý!',
+                'ticket_id': ticket.id,
+                'status_url': reverse('orders:ticket_status', args=[ticket.id]),
+            }, status=202)
         
-        if not items or len(items) == 0:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Giỏ hàng trống!'
-            }, status=400)
-        
-        # Tạo đơn hàng trong transaction
-        with transaction.atomic():
-            # Tạo Order
-            order = Order.objects.create(
-                user=request.user,
-                receiver=receiver,
-                phone=phone,
-                address=address,
-                note=note,
-                total_amount=total_amount,
-                status='pending'
-            )
-            
-            # Tạo OrderItems
-            for item_data in items:
-                product_id = int(item_data.get('product_id'))
-                size_id = item_data.get('size_id')  # Có thể là string hoặc int
-                quantity = int(item_data.get('quantity', 1))
-                
-                # Tìm ProductSize
-                try:
-                    # Thử tìm theo product_id và size_id
-                    if isinstance(size_id, int):
-                        product_size = ProductSize.objects.get(
-                            product_id=product_id,
-                            size_id=size_id
-                        )
-                    else:
-                        # Nếu size_id là name (string)
-                        product_size = ProductSize.objects.get(
-                            product_id=product_id,
-                            size__name=size_id
-                        )
-                except ProductSize.DoesNotExist:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': f'Sản phẩm không tồn tại hoặc không có size này!'
-                    }, status=400)
-                
-                # Kiểm tra tồn kho
-                if product_size.quantity < quantity:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': f'Sản phẩm {product_size.product.name} (Size {product_size.size.name}) không đủ số lượng! Còn {product_size.quantity} sản phẩm.'
-                    }, status=400)
-                
-                # Tạo order item
-                OrderItem.objects.create(
-                    order=order,
-                    product_size=product_size,
-                    quantity=quantity,
-                    price=float(product_size.product.price)  # Lấy giá từ product
-                )
-                
-                # Trừ số lượng tồn kho
-                product_size.quantity -= quantity
-                product_size.save()
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Đặt hàng thành công!',
-                'order_id': order.id
-            })
+        # Tạo đơn hàng trong transaction (tổng tiền tính lại trên server)
+        order = place_order(request.user, shipping, items)
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Đặt hàng thành công!',
+            'order_id': order.id,
+            'total_amount': float(order.total_amount),
+        })
             
+    except CheckoutError as e:
+        return JsonResponse(e.as_json(), status=400)
     except json.JSONDecodeError:
         return JsonResponse({
             'status': 'error',
@@ -131,11 +130,37 @@ def process_checkout(request):
         }, status=500)
 
 
+@login_required
+def ticket_status(request, ticket_id):
+    """Trạng thái của một yêu cầu đặt hàng trong hàng đợi (client poll)"""
+    try:
+        ticket = OrderTicket.objects.get(id=ticket_id, user=request.user)
+    except OrderTicket.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Không tìm thấy yêu cầu!'}, status=404)
+    return JsonResponse(ticket.as_json())
+
+
 @login_required
 def my_orders(request):
-    """Hiển thị danh sách đơn hàng của user"""
-    orders = Order.objects.filter(user=request.user).prefetch_related('items__product_size__product', 'items__product_size__size').order_by('-created_at')
-    return render(request, 'orders/my_orders.html', {'orders': orders})
+    """Hiển thị danh sách đơn hàng của user, phân trang keyset (``?cursor=``, xem orders.history).
+
+    Sản phẩm trong từng đơn được tải sau qua ``order_items_json``.
+    """
+    orders, next_cursor = orders_page(request.user, request.GET.get('cursor'))
+    return render(request, 'orders/my_orders.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
+
+
+@login_required
+def order_items_json(request, order_id):
+    """Các sản phẩm của một đơn (của chính user) dạng JSON"""
+    order = Order.objects.filter(id=order_id, user=request.user).first()
+    if order is None:
+        return JsonResponse({'status': 'error', 'message': 'Không tìm thấy đơn hàng!'}, status=404)
+    return JsonResponse({'status': 'success', 'items': order_items(order)})
 
 
 @login_required
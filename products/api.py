@@ -0,0 +1,104 @@
+"""JSON chi tiết sản phẩm (giá, tồn kho theo size) kèm ETag theo phiên bản từng sản phẩm.
+
+Mỗi sản phẩm có một phiên bản trong cache dùng chung (``product:version:<id>``), giá trị
+ngẫu nhiên và hết hạn như ``products.reference``. Sửa sản phẩm/size, nhập hàng loạt, trừ kho khi đặt
+hàng và trả kho khi huỷ đơn đều xoá phiên bản (``bump_product_versions``), lần đọc sau tạo
+phiên bản mới. ETag dựng từ phiên bản nên request có ``If-None-Match`` khớp được trả 304
+chỉ bằng một lần đọc cache, không query database.
+
+Phiên bản được đọc *trước* khi query dữ liệu: nếu sản phẩm đổi giữa hai bước, ETag cũ đi
+kèm dữ liệu mới và lần revalidate sau nhận 200, không bao giờ có 304 cho dữ liệu cũ.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Product, ProductSize
+from .reference import version_timeout
+
+MAX_BATCH_SIZE = 100
+
+
+def version_key(product_id):
+    return f'product:version:{product_id}'
+
+
+def product_versions(product_ids):
+    """Phiên bản hiện tại của từng sản phẩm ``{id: version}`` (tạo mới nếu chưa có)"""
+    keys = {version_key(product_id): product_id for product_id in product_ids}
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex[:16] for key in keys if key not in found}
+    for key, version in missing.items():
+        if not cache.add(key, version, version_timeout()):
+            version = cache.get(key, version)
+        found[key] = version
+    return {product_id: found[key] for key, product_id in keys.items()}
+
+
+def bump_product_versions(product_ids=None, product_size_ids=None):
+    """Đánh dấu sản phẩm đã đổi (giá, tên, ảnh, size hoặc tồn kho).
+
+    Xoá lần nữa sau commit như ``orders.cart``: request khác có thể đã tạo phiên bản mới
+    cho dữ liệu cũ trong lúc transaction hiện tại chưa commit.
+    """
+    product_ids = set(product_ids or ())
+    if product_size_ids:
+        product_ids.update(ProductSize.objects.filter(pk__in=product_size_ids).values_list('product_id', flat=True))
+    if not product_ids:
+        return
+    keys = [version_key(product_id) for product_id in product_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def product_etag(product_ids):
+    """ETag (chưa đặt trong ngoặc kép) cho danh sách sản phẩm ``product_ids``"""
+    versions = product_versions(product_ids)
+    if len(product_ids) == 1:
+        return f'{product_ids[0]}-{versions[product_ids[0]]}'
+    digest = hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()
+    return f'batch-{digest}'
+
+
+def products_json(product_ids):
+    """Sản phẩm đang hiển thị trong ``product_ids`` kèm tồn kho các size đang bán, một query.
+
+    ``Product`` LEFT JOIN ``ProductSize``/``Size``: mỗi size một dòng, sản phẩm chưa có size
+    vẫn có một dòng với các cột size là NULL. Trả về ``{id: dict}``.
+    """
+    rows = Product.objects.filter(id__in=product_ids, hide=False).values_list(
+        'id', 'name', 'price', 'category_id', 'image',
+        'sizes__id', 'sizes__size_id', 'sizes__size__name', 'sizes__quantity', 'sizes__active',
+    ).order_by('id', 'sizes__size_id')
+    products = {}
+    for product_id, name, price, category_id, image, sku_id, size_id, size_name, quantity, active in rows:
+        product = products.get(product_id)
+        if product is None:
+            product = products[product_id] = {
+                'id': product_id,
+                'name': name,
+                'price': float(price),
+                'category_id': category_id,
+                'image': default_storage.url(image) if image else '',
+                'sizes': [],
+            }
+        if sku_id is not None and active:
+            product['sizes'].append({
+                'product_size_id': sku_id,
+                'size_id': size_id,
+                'name': size_name,
+                'available': quantity,
+                'in_stock': quantity > 0,
+            })
+    return products
+
+
+def parse_ids(value):
+    """Danh sách id (không trùng, giữ thứ tự) từ ``"1,2,3"``; ném ``ValueError`` nếu không hợp lệ"""
+    ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    if not ids or len(ids) > MAX_BATCH_SIZE or min(ids) <= 0:
+        raise ValueError(value)
+    return ids
@@ -0,0 +1,184 @@
+"""Gợi ý khi gõ ô tìm kiếm: tên sản phẩm và danh mục theo tiền tố, đọc từ bộ nhớ.
+
+Mỗi process giữ một chỉ mục tiền tố dựng từ tên (đã bỏ dấu, xem ``products.search.fold``)
+của sản phẩm và danh mục đang hiển thị. Chỉ mục là hai mảng đã sắp xếp theo chuỗi bỏ dấu:
+``starts`` (cả tên) và ``words`` (phần tên từ mỗi từ thứ hai trở đi, mã hoá
+``entry << 8 | offset``), nên "ao thun" và "thun" đều tìm được "Áo Thun Trắng" bằng
+``bisect`` rồi đọc tuần tự tới khi đủ số gợi ý. Khớp từ đầu tên xếp trước khớp giữa tên.
+
+Chỉ mục gắn với phiên bản catalog như ``products.snapshot``: sửa sản phẩm/danh mục đổi
+phiên bản, process dựng lại ở request sau trong khi các thread khác vẫn dùng bản cũ.
+"""
+import json
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from urllib.parse import urlencode
+
+from django.core.files.storage import default_storage
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.urls import reverse
+
+from .catalog import catalog_version
+from .models import Category, Product
+from .search import fold
+
+SUGGEST_LIMIT = 8
+MAX_SUGGEST_LIMIT = 20
+MAX_QUERY_LENGTH = 100
+
+_WORD_RE = re.compile(rb'[a-z0-9]+')
+
+_lock = threading.Lock()
+_current = None
+
+
+def normalize(text):
+    """Chuỗi so khớp: bỏ dấu, viết thường, gộp khoảng trắng"""
+    return ' '.join(fold(text).split())
+
+
+class PackedStrings:
+    """Danh sách chuỗi (đã mã hoá UTF-8) gói trong một ``bytes`` kèm mảng vị trí: ít bộ nhớ
+    hơn nhiều so với một list ``str`` (không tốn phần đầu đối tượng cho từng chuỗi)"""
+
+    def __init__(self, encoded):
+        encoded = list(encoded)
+        self.data = b''.join(encoded)
+        self.offsets = array('q', accumulate((len(item) for item in encoded), initial=0))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, index, start=0):
+        """Chuỗi thứ ``index`` dạng bytes, bỏ ``start`` byte đầu"""
+        return self.data[self.offsets[index] + start:self.offsets[index + 1]]
+
+    def __getitem__(self, index):
+        return self.raw(index).decode()
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class PrefixIndex:
+    """Tìm các mục có tên (hoặc một từ trong tên) bắt đầu bằng tiền tố cho trước"""
+
+    def __init__(self, names):
+        keys = [normalize(name).encode() for name in names]
+        self.starts = array('l', sorted(range(len(keys)), key=keys.__getitem__))
+        codes, suffixes = [], []
+        for entry, key in enumerate(keys):
+            for match in _WORD_RE.finditer(key):
+                if 0 < match.start() < 256:
+                    codes.append(entry << 8 | match.start())
+                    suffixes.append(key[match.start():])
+        self.words = array('q', (codes[i] for i in sorted(range(len(codes)), key=suffixes.__getitem__)))
+        self.keys = PackedStrings(keys)
+
+    def _word(self, code):
+        return self.keys.raw(code >> 8, code & 0xff)
+
+    def search(self, prefix, limit):
+        """Tối đa ``limit`` mục (chỉ số trong ``names``) khớp ``prefix`` đã chuẩn hoá"""
+        prefix = prefix.encode()
+        found = []
+        for codes, key, entry_of in (
+            (self.starts, self.keys.raw, int),
+            (self.words, self._word, lambda code: code >> 8),
+        ):
+            position = bisect_left(codes, prefix, key=key)
+            while position < len(codes) and len(found) < limit:
+                code = codes[position]
+                if not key(code).startswith(prefix):
+                    break
+                entry = entry_of(code)
+                if entry not in found:
+                    found.append(entry)
+                position += 1
+        return found
+
+
+class AutocompleteIndex:
+    def __init__(self, version):
+        self.version = version
+        categories = list(Category.objects.filter(hide=False).order_by('id').values_list('id', 'name'))
+        self.category_ids = array('q', (row[0] for row in categories))
+        self.category_names = PackedStrings(row[1].encode() for row in categories)
+        self.categories = PrefixIndex(self.category_names)
+
+        products = list(Product.objects.filter(hide=False).annotate(
+            renditions_json=Cast('image_renditions', TextField()),
+        ).order_by('id').values_list('id', 'name', 'price', 'image', 'renditions_json'))
+        self.product_ids = array('q', (row[0] for row in products))
+        self.product_names = PackedStrings(row[1].encode() for row in products)
+        self.prices = array('d', (float(row[2]) for row in products))
+        # Chuỗi trùng nhau (ảnh, ảnh thu nhỏ) dùng chung một đối tượng; JSON chỉ giải mã khi gợi ý
+        shared = {}
+        self.images = [shared.setdefault(row[3] or '', row[3] or '') for row in products]
+        self.renditions = [shared.setdefault(row[4] or '{}', row[4] or '{}') for row in products]
+        self.products = PrefixIndex(self.product_names)
+
+    def thumbnail(self, entry):
+        """URL ảnh nhỏ nhất (ảnh thu nhỏ JPEG, không có thì ảnh gốc)"""
+        jpeg = json.loads(self.renditions[entry]).get('jpeg')
+        if jpeg:
+            return default_storage.url(jpeg[min(jpeg, key=int)])
+        return default_storage.url(self.images[entry]) if self.images[entry] else ''
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        prefix = normalize(query[:MAX_QUERY_LENGTH])
+        if not prefix:
+            return {'categories': [], 'products': []}
+        search_url = reverse('home')
+        return {
+            'categories': [
+                {
+                    'id': self.category_ids[entry],
+                    'name': self.category_names[entry],
+                    'url': reverse('product_by_category', args=[self.category_ids[entry]]),
+                }
+                for entry in self.categories.search(prefix, limit)
+            ],
+            'products': [self.product_json(entry, search_url) for entry in self.products.search(prefix, limit)],
+        }
+
+    def product_json(self, entry, search_url):
+        name = self.product_names[entry]
+        return {
+            'id': self.product_ids[entry],
+            'name': name,
+            'price': self.prices[entry],
+            'image': self.thumbnail(entry),
+            'url': f"{search_url}?{urlencode({'search': name})}",
+        }
+
+
+def get():
+    """Chỉ mục của phiên bản catalog hiện tại (một thread dựng lại, các thread khác dùng bản cũ)"""
+    global _current
+    version = catalog_version()
+    index = _current
+    if index is not None and index.version == version:
+        return index
+    if not _lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _current is None or _current.version != version:
+            _current = AutocompleteIndex(version)
+        return _current
+    finally:
+        _lock.release()
+
+
+def suggest(query, limit=SUGGEST_LIMIT):
+    """Gợi ý danh mục và sản phẩm có tên bắt đầu (hoặc có một từ bắt đầu) bằng ``query``"""
+    return get().suggest(query, limit)
+
+
+def clear():
+    global _current
+    _current = None
@@ -0,0 +1,256 @@
+"""Nhập/xuất sản phẩm hàng loạt dạng CSV hoặc JSONL.
+
+Mỗi dòng là một SKU (một size của một sản phẩm)::
+
+    code,name,category,price,size,quantity,image,hide
+    SP000001,Áo Sơ Mi Trắng Basic,Áo Sơ Mi,299000,M,10,product_images/16.webp,0
+
+Sản phẩm được nhận diện theo ``code``; các cột sản phẩm lặp lại ở mỗi dòng size, dòng
+sau ghi đè dòng trước. ``image`` để trống thì giữ ảnh hiện tại. File được đọc từng lô
+``batch_size`` dòng; mỗi lô upsert ``Category``/``Size`` (theo tên), ``Product`` (theo
+``code``) và ``ProductSize`` (theo sản phẩm + size) bằng vài câu ``bulk_create`` trong
+một transaction, nên bộ nhớ chỉ phụ thuộc kích thước lô.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from . import reference
+from .catalog import bump_catalog_version
+from .models import Category, Product, ProductSize, Size
+from .search import rebuild_index
+from .signals import products_bulk_changed
+
+FIELDS = ('code', 'name', 'category', 'price', 'size', 'quantity', 'image', 'hide')
+FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    products: int = 0
+    skus: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # (số dòng, thông báo), tối đa MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt='csv'):
+    """Đọc từng dòng (số dòng, dict) từ file nhị phân hoặc văn bản, không đọc cả file vào bộ nhớ"""
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, RowError(f"JSON không hợp lệ: {e.msg}")
+                continue
+            yield line_no, row if isinstance(row, dict) else RowError("Mỗi dòng phải là một object JSON")
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _text(row, name, required=True, max_length=255):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"Thiếu cột '{name}'")
+    if len(value) > max_length:
+        raise RowError(f"Cột '{name}' dài quá {max_length} ký tự")
+    return value
+
+
+def _validate(model, name, value, message):
+    """Validator của field (số chữ số, khoảng giá trị của cột): giá trị vượt cột là lỗi của
+    dòng thay vì DataError làm hỏng cả lô trên MySQL"""
+    try:
+        model._meta.get_field(name).run_validators(value)
+    except ValidationError as e:
+        raise RowError(f"{message}: {' '.join(e.messages)}") from None
+
+
+def parse_row(row):
+    """Kiểm tra và chuẩn hoá một dòng, ném ``RowError`` nếu không hợp lệ"""
+    try:
+        price = Decimal(str(row.get('price')).strip())
+    except (TypeError, ValueError, InvalidOperation):
+        raise RowError("Giá không hợp lệ") from None
+    if not price.is_finite() or price <= 0:
+        raise RowError("Giá phải lớn hơn 0")
+    _validate(Product, 'price', price, "Giá không hợp lệ")
+    try:
+        quantity = int(row.get('quantity') or 0)
+    except (TypeError, ValueError):
+        raise RowError("Số lượng không hợp lệ") from None
+    if quantity < 0:
+        raise RowError("Số lượng không được âm")
+    _validate(ProductSize, 'quantity', quantity, "Số lượng không hợp lệ")
+    hide = row.get('hide')
+    return {
+        'code': _text(row, 'code', max_length=64),
+        'name': _text(row, 'name'),
+        'category': _text(row, 'category'),
+        'price': price,
+        'size': _text(row, 'size', max_length=10),
+        'quantity': quantity,
+        'image': _text(row, 'image', required=False, max_length=100),
+        'hide': hide in (True, 1) or str(hide).strip().lower() in ('1', 'true', 'yes'),
+    }
+
+
+def _ids_by_name(model, names):
+    """{tên: id} cho ``names``, tạo các bản ghi còn thiếu.
+
+    ``name`` là unique (Category, Size): hai import cùng tạo một tên mới thì một INSERT bị bỏ
+    qua và cả hai đọc lại cùng một id.
+    """
+    ids = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in ids]
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        ids.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def _upsert(model, objs, unique_fields, update_fields):
+    """``bulk_create`` upsert; MySQL tự dùng khoá unique bị trùng (ON DUPLICATE KEY UPDATE)
+    và không nhận ``unique_fields``"""
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields,
+    )
+
+
+def _upsert_batch(rows):
+    """Ghi một lô dòng đã kiểm tra, trả về (số sản phẩm, số SKU, id các sản phẩm)"""
+    category_ids = _ids_by_name(Category, {row['category'] for row in rows})
+    size_ids = _ids_by_name(Size, {row['size'] for row in rows})
+
+    products = {}
+    for row in rows:
+        products[row['code']] = row
+    with_image, without_image = [], []
+    for row in products.values():
+        product = Product(
+            code=row['code'], name=row['name'], category_id=category_ids[row['category']],
+            price=row['price'], hide=row['hide'], image=row['image'] or None,
+        )
+        (with_image if row['image'] else without_image).append(product)
+    common_fields = ['name', 'category', 'price', 'hide']
+    if with_image:
+        _upsert(Product, with_image, ['code'], common_fields + ['image'])
+    if without_image:
+        _upsert(Product, without_image, ['code'], common_fields)
+    # MySQL không trả về id sau upsert: đọc lại theo mã
+    product_ids = dict(Product.objects.filter(code__in=products).values_list('code', 'id'))
+
+    skus = {}
+    for row in rows:
+        skus[product_ids[row['code']], size_ids[row['size']]] = row['quantity']
+    _upsert(
+        ProductSize,
+        [ProductSize(product_id=pid, size_id=sid, quantity=qty) for (pid, sid), qty in skus.items()],
+        ['product', 'size'], ['quantity', 'active'],  # nhập lại size đã ngừng bán thì mở bán lại
+    )
+    return len(products), len(skus), list(product_ids.values())
+
+
+def import_products(rows, batch_size=BATCH_SIZE):
+    """Nhập các dòng ``(số dòng, dict)`` (xem ``read_rows``) theo lô, trả về ``ImportReport``.
+
+    Dòng lỗi được bỏ qua và ghi vào báo cáo; các dòng hợp lệ vẫn được nhập.
+    """
+    report = ImportReport()
+
+    def flush(batch):
+        with transaction.atomic():
+            n_products, n_skus, product_ids = _upsert_batch(batch)
+            # bulk_create không phát signal: tự cập nhật chỉ mục tìm kiếm và báo cho các app khác
+            rebuild_index(Product.objects.filter(id__in=product_ids))
+            products_bulk_changed.send(sender=Product, product_ids=product_ids)
+        report.products += n_products
+        report.skus += n_skus
+
+    batch = []
+    for line_no, row in rows:
+        report.rows += 1
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append(parse_row(row))
+        except RowError as e:
+            report.add_error(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    reference.bump_version()
+    bump_catalog_version()
+    return report
+
+
+def export_rows(chunk_size=2000):
+    """Mọi SKU dạng dict theo ``FIELDS``, đọc bằng ``iterator()`` nên không giữ cả bảng trong bộ nhớ"""
+    product_sizes = ProductSize.objects.filter(active=True).select_related(
+        'product__category', 'size'
+    ).order_by('product_id', 'size_id')
+    for ps in product_sizes.iterator(chunk_size=chunk_size):
+        product = ps.product
+        yield {
+            'code': product.code or '',
+            'name': product.name,
+            'category': product.category.name,
+            'price': float(product.price),
+            'size': ps.size.name,
+            'quantity': ps.quantity,
+            'image': product.image.name if product.image else '',
+            'hide': int(product.hide),
+        }
+
+
+class _Echo:
+    """File giả cho ``csv.writer``: trả về dòng vừa ghi thay vì lưu lại"""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(fmt='csv', rows=None):
+    """Các dòng văn bản của file xuất (có header với CSV), dùng cho file hoặc StreamingHttpResponse"""
+    rows = export_rows() if rows is None else rows
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[name] for name in FIELDS])
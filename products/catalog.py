@@ -0,0 +1,138 @@
+"""Truy vấn danh sách sản phẩm cho storefront (home, tìm kiếm, danh mục)."""
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.dispatch import Signal
+from django.template.loader import render_to_string
+
+from . import reference
+from .models import Product
+
+PAGE_SIZE = 12
+GRID_TEMPLATE = 'partials/product_grid.html'
+GRID_CACHE_TIMEOUT = 24 * 60 * 60  # Chỉ để dọn phiên bản cũ: lưới được làm mới theo phiên bản catalog
+CATALOG_VERSION_KEY = 'catalog:version'
+MAX_ID = 2 ** 63 - 1  # Giới hạn cột id (BIGINT); lớn hơn thì database từ chối tham số
+
+# Gửi sau commit mỗi khi catalog đổi (xem ``bump_catalog_version``): điểm nối để xoá các
+# trang storefront đã cache ở CDN theo surrogate key ``catalog`` (xem core.http_cache)
+catalog_changed = Signal()
+
+
+def visible_products(category_id=None):
+    """Sản phẩm đang hiển thị, sắp theo id và join sẵn category (tránh N+1 trong template)"""
+    products = Product.objects.filter(hide=False).select_related('category').order_by('id')
+    if category_id is not None:
+        products = products.filter(category_id=category_id)
+    return products
+
+
+def parse_id(value):
+    """Id từ tham số GET; ném ``ValueError`` nếu không phải số hoặc vượt khoảng của cột id"""
+    value = int(value)
+    if not 0 <= value <= MAX_ID:
+        raise ValueError(value)
+    return value
+
+
+def paginate_products(request, products, per_page=PAGE_SIZE, keyset=True):
+    """Phân trang danh sách sản phẩm, chỉ lấy đúng các dòng của trang hiện tại.
+
+    Mặc định dùng ``?page=N`` (Paginator, LIMIT/OFFSET). Với ``?after=<id>`` chuyển sang
+    chế độ keyset ("xem thêm sau id X"): ``WHERE id > X LIMIT per_page`` không cần OFFSET
+    và không đếm tổng nên trang sâu vẫn nhanh. ``products`` phải được sắp theo id tăng dần;
+    danh sách sắp theo thứ tự khác (vd. độ liên quan khi tìm kiếm) truyền ``keyset=False``.
+    Ngoài queryset, ``products`` có thể là danh sách từ bản chụp catalog (products.snapshot,
+    có ``after(id)`` thay cho ``filter(id__gt=...)``).
+
+    Trả về dict để merge vào context của ``home.html``.
+    """
+    after = request.GET.get('after')
+    if keyset and after is not None:
+        try:
+            after_id = parse_id(after)
+        except ValueError:
+            after_id = 0
+        if hasattr(products, 'after'):
+            products = products.after(after_id)
+        else:
+            products = products.filter(id__gt=after_id)
+        rows = list(products[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        return {
+            'products': rows,
+            'page_obj': None,
+            'next_after': rows[-1].id if has_more else None,
+        }
+
+    paginator = Paginator(products, per_page)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    rows = list(page_obj.object_list)
+    return {
+        'products': rows,
+        'page_obj': page_obj,
+        'next_after': rows[-1].id if keyset and rows and page_obj.has_next() else None,
+    }
+
+
+def catalog_version():
+    return reference.current_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Catalog (sản phẩm, size, danh mục) đã đổi: mọi lưới sản phẩm đã cache hết hiệu lực"""
+    reference.bump_version(CATALOG_VERSION_KEY)
+    transaction.on_commit(lambda: catalog_changed.send(sender=None))
+
+
+def _grid_position(request, keyset, num_pages):
+    """``(after, page)`` đã chuẩn hoá như ``paginate_products``/``Paginator.get_page``: các URL
+    cho cùng một trang (``?page=01``, ``?page=abc``, ``after`` rác...) dùng chung một khoá"""
+    after = request.GET.get('after')
+    if keyset and after is not None:
+        try:
+            return parse_id(after), None
+        except ValueError:
+            return 0, None
+    try:
+        page = int(request.GET.get('page') or 1)
+    except ValueError:
+        return None, 1
+    if page < 1 or (num_pages is not None and page > num_pages):
+        return None, num_pages or 'last'  # get_page trả trang cuối
+    return None, page
+
+
+def grid_cache_key(request, category_id=None, search_query=None, keyset=True):
+    """Khoá cache của lưới sản phẩm: (danh mục, từ khoá, vị trí trang, phiên bản catalog).
+
+    Trả về ``(khoá lưới, khoá số trang)``; số trang (lưu khi render) giúp gộp mọi số trang
+    vượt quá vào trang cuối, nên số khoá mỗi phiên bản không phụ thuộc URL khách gửi lên.
+    """
+    version = catalog_version()
+    listing = hashlib.md5(repr((category_id, search_query or '')).encode()).hexdigest()
+    pages_key = f'grid:{version}:pages:{listing}'
+    position = (listing, keyset, *_grid_position(request, keyset, cache.get(pages_key)))
+    digest = hashlib.md5(repr(position).encode()).hexdigest()
+    return f'grid:{version}:{digest}', pages_key
+
+
+def product_grid(request, products, category_id=None, search_query=None, keyset=True):
+    """HTML lưới sản phẩm và phân trang của trang hiện tại, đọc qua cache.
+
+    ``products`` là hàm trả về danh sách sản phẩm (xem ``paginate_products``), chỉ được
+    gọi khi cache trống nên trang đã cache không tốn query nào. Lưới không phụ thuộc user
+    và không hiển thị tồn kho, nên trừ kho khi đặt hàng không làm cache hết hiệu lực.
+    """
+    key, pages_key = grid_cache_key(request, category_id, search_query, keyset)
+    html = cache.get(key)
+    if html is None:
+        page = paginate_products(request, products(), keyset=keyset)
+        html = render_to_string(GRID_TEMPLATE, {'search_query': search_query, **page})
+        cache.set(key, html, GRID_CACHE_TIMEOUT)
+        if page['page_obj'] is not None:
+            cache.set(pages_key, page['page_obj'].paginator.num_pages, GRID_CACHE_TIMEOUT)
+    return html
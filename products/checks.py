@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Cache phiên bản (products.reference) chỉ đồng bộ giữa các worker khi cache dùng chung"""
+    if settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    timeout = settings.CACHE_VERSION_TIMEOUT
+    return [Warning(
+        "CACHES['default'] là locmem: mỗi worker có cache riêng, sửa catalog ở một worker không "
+        "tới các worker khác "
+        + (f"(dữ liệu và ETag cũ tồn tại tới {timeout} giây)." if timeout else "(dữ liệu và ETag cũ không bao giờ hết hạn)."),
+        hint="Chạy nhiều worker thì đặt CACHE_BACKEND=file (hoặc một cache dùng chung khác).",
+        id='products.W001',
+    )]
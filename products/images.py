@@ -0,0 +1,111 @@
+"""Ảnh thu nhỏ (rendition) cho ảnh sản phẩm.
+
+Mỗi ảnh gốc được thu về các chiều rộng cố định ở hai định dạng WebP và JPEG, lưu cạnh
+ảnh gốc với tên chứa hash nội dung (``ao.200w.3f2a9c1b.webp``) nên có thể cache lâu ở
+trình duyệt/CDN. Danh sách rendition lưu trong ``Product.image_renditions``::
+
+    {'source': 'product_images/ao.jpg',
+     'webp': {'200': 'product_images/ao.200w.3f2a9c1b.webp', '400': ...},
+     'jpeg': {'200': ..., '400': ...}}
+
+để template dựng ``srcset`` (tag ``product_image``) mà không phải đọc file.
+"""
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .catalog import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (200, 400)
+FORMATS = {
+    # định dạng: (tên PIL, đuôi file, tuỳ chọn khi lưu)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_name(source_name, width, ext, data):
+    """Tên file rendition cạnh ảnh gốc, kèm hash nội dung"""
+    stem = posixpath.splitext(source_name)[0]
+    digest = hashlib.sha256(data).hexdigest()[:8]
+    return f"{stem}.{width}w.{digest}.{ext}"
+
+
+def _encode(image, pil_format, options):
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG không có kênh alpha: đặt ảnh lên nền trắng
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_renditions(source_name, storage=default_storage):
+    """Tạo và lưu các rendition của ảnh ``source_name``.
+
+    Trả về ``(manifest, sizes)`` với ``manifest`` theo định dạng của
+    ``Product.image_renditions`` và ``sizes`` là dict ``{tên file: số byte}`` (gồm ảnh gốc).
+    Rendition đã có (cùng nội dung) không bị ghi lại.
+    """
+    with storage.open(source_name, 'rb') as f:
+        original = f.read()
+    image = ImageOps.exif_transpose(Image.open(BytesIO(original)))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    manifest = {'source': source_name}
+    sizes = {source_name: len(original)}
+    for key, (pil_format, ext, options) in FORMATS.items():
+        manifest[key] = {}
+        for width in WIDTHS:
+            # Không phóng to ảnh nhỏ hơn chiều rộng cần
+            scaled = image if image.width <= width else image.resize(
+                (width, round(image.height * width / image.width)), Image.LANCZOS
+            )
+            data = _encode(scaled, pil_format, options)
+            name = rendition_name(source_name, width, ext, data)
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(data))
+            manifest[key][str(width)] = name
+            sizes[name] = len(data)
+    return manifest, sizes
+
+
+def needs_renditions(product):
+    """Ảnh sản phẩm đã đổi (hoặc chưa có rendition)"""
+    return bool(product.image) and product.image_renditions.get('source') != product.image.name
+
+
+def update_renditions(product, force=False):
+    """Tạo rendition cho ảnh hiện tại của ``product`` nếu cần, trả về True nếu đã cập nhật.
+
+    Lỗi đọc/giải mã ảnh chỉ được ghi log: sản phẩm vẫn hiển thị bằng ảnh gốc.
+    """
+    if not product.image:
+        manifest = {}
+    elif force or needs_renditions(product):
+        try:
+            manifest, _ = render_renditions(product.image.name)
+        except (OSError, ValueError) as e:
+            logger.warning("Không tạo được ảnh thu nhỏ cho sản phẩm #%s: %s", product.pk, e)
+            return False
+    else:
+        return False
+    if manifest == product.image_renditions:
+        return False
+
+    product.image_renditions = manifest
+    # update() không phát post_save: tự đổi phiên bản để lưới sản phẩm dùng ảnh mới
+    Product.objects.filter(pk=product.pk).update(image_renditions=manifest)
+    bump_catalog_version()
+    return True
@@ -0,0 +1,126 @@
+"""Giữ tồn kho ``ProductSize`` bằng câu UPDATE có điều kiện thay cho đọc-sửa-ghi trong Python.
+
+Mọi dòng của một đơn được trừ trong một câu duy nhất::
+
+    UPDATE product_sizes
+       SET quantity = quantity - CASE id WHEN ... END
+     WHERE id IN (...) AND quantity >= CASE id WHEN ... END
+
+nên không có lost update giữa các checkout đồng thời. Câu UPDATE duyệt các dòng theo
+khoá chính (id tăng dần), tức mọi giao dịch khoá dòng theo cùng một thứ tự và không
+thể deadlock lẫn nhau.
+"""
+from collections import Counter, namedtuple
+
+from django.db import connection, transaction
+
+from .models import ProductSize
+
+MAX_ATTEMPTS = 3
+RELEASE_BATCH_SIZE = 500
+
+StockShortage = namedtuple('StockShortage', 'product_size_id requested available')
+
+
+class InsufficientStock(Exception):
+    """Một hoặc nhiều dòng không đủ tồn kho; ``failures`` là list ``StockShortage``"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(
+            ", ".join(f"#{f.product_size_id}: cần {f.requested}, còn {f.available}" for f in failures)
+        )
+
+
+def _merge_lines(lines):
+    """Gộp các dòng trùng ProductSize: {product_size_id: tổng số lượng}"""
+    if hasattr(lines, 'items'):
+        lines = lines.items()
+    wanted = Counter()
+    for product_size_id, quantity in lines:
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ValueError(f"Số lượng phải lớn hơn 0 (ProductSize #{product_size_id})")
+        wanted[int(product_size_id)] += quantity
+    return wanted
+
+
+def _stock_sql(ids, wanted):
+    """Tên bảng/cột đã quote và biểu thức ``CASE id WHEN ... END`` (kèm tham số) cho ``ids``.
+
+    Viết SQL trực tiếp: dựng ``Case``/``When`` bằng ORM tốn vài ms CPU mỗi đơn, lâu hơn
+    cả câu lệnh, và dưới tải nhiều thread phần CPU đó bị GIL xếp hàng.
+    """
+    qn = connection.ops.quote_name
+    table = qn(ProductSize._meta.db_table)
+    pk, quantity = qn(ProductSize._meta.pk.column), qn('quantity')
+    case = f"CASE {pk} {' '.join(['WHEN %s THEN %s'] * len(ids))} END"
+    case_params = [value for pk_value in ids for value in (pk_value, wanted[pk_value])]
+    return table, pk, quantity, case, case_params
+
+
+def _reserve_sql(ids, wanted):
+    """Câu UPDATE có điều kiện cho ``reserve_stock``"""
+    table, pk, quantity, case, case_params = _stock_sql(ids, wanted)
+    sql = (
+        f"UPDATE {table} SET {quantity} = {quantity} - {case} "
+        f"WHERE {pk} IN ({', '.join(['%s'] * len(ids))}) AND {quantity} >= {case}"
+    )
+    return sql, case_params + ids + case_params
+
+
+def reserve_stock(lines):
+    """Trừ tồn kho cho mọi dòng trong một câu UPDATE có điều kiện.
+
+    ``lines`` là dict ``{product_size_id: quantity}`` hoặc iterable các cặp như vậy.
+    Tất cả hoặc không: nếu có dòng thiếu hàng (hoặc ProductSize không tồn tại) thì không
+    dòng nào bị trừ và ``InsufficientStock`` liệt kê đúng các dòng đó. Nên gọi bên trong
+    ``transaction.atomic()`` của checkout để việc trừ kho commit cùng đơn hàng.
+    """
+    wanted = _merge_lines(lines)
+    if not wanted:
+        return
+    ids = sorted(wanted)
+    sql, params = _reserve_sql(ids, wanted)
+
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    updated = cursor.rowcount
+                if updated != len(ids):
+                    # Huỷ savepoint: các dòng đã trừ được trả lại nguyên trạng
+                    raise InsufficientStock([])
+            return
+        except InsufficientStock:
+            available = dict(ProductSize.objects.filter(pk__in=ids).values_list('pk', 'quantity'))
+            failures = [
+                StockShortage(pk, wanted[pk], available.get(pk, 0))
+                for pk in ids
+                if available.get(pk, 0) < wanted[pk]
+            ]
+            if failures:
+                raise InsufficientStock(failures) from None
+            # Tồn kho vừa được bổ sung giữa hai câu lệnh: thử trừ lại
+    raise InsufficientStock([])
+
+
+def release_stock(lines, batch_size=RELEASE_BATCH_SIZE):
+    """Cộng trả tồn kho (ví dụ khi huỷ đơn), mỗi lô ``batch_size`` ProductSize một câu UPDATE.
+
+    ``lines`` như ``reserve_stock``; các dòng trùng ProductSize được gộp trước. Trả về list
+    id các ProductSize đã cộng. Duyệt id tăng dần như ``reserve_stock`` nên cùng thứ tự khoá.
+    """
+    wanted = _merge_lines(lines)
+    ids = sorted(wanted)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            table, pk, quantity, case, case_params = _stock_sql(batch, wanted)
+            cursor.execute(
+                f"UPDATE {table} SET {quantity} = {quantity} + {case} "
+                f"WHERE {pk} IN ({', '.join(['%s'] * len(batch))})",
+                case_params + batch,
+            )
+    return ids
@@ -0,0 +1,67 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog
+from products import autocomplete
+from products.catalog import visible_products
+from products.search import rebuild_index, search_products
+
+# Từng phím gõ của vài câu tìm kiếm
+TYPED = ('áo thun', 'xanh navy', 'quan jean', 'slim', '4242')
+
+
+class Command(BaseCommand):
+    help = "Độ trễ gợi ý tìm kiếm từ chỉ mục tiền tố trong bộ nhớ so với tìm qua chỉ mục SearchToken"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000, help="Số sản phẩm giả lập")
+        parser.add_argument('--repeat', type=int, default=200, help="Số lần đo mỗi tiền tố")
+        parser.add_argument('--db-repeat', type=int, default=5, help="Số lần đo mỗi tiền tố khi tìm qua database")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            autocomplete.clear()
+            started = time.perf_counter()
+            index = autocomplete.get()
+            elapsed = (time.perf_counter() - started) * 1000
+            # Đo bộ nhớ ở lần dựng riêng: tracemalloc làm chậm lúc dựng
+            tracemalloc.start()
+            size = tracemalloc.get_traced_memory()[0]
+            copy = autocomplete.AutocompleteIndex(index.version)
+            size = tracemalloc.get_traced_memory()[0] - size
+            del copy
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{len(index.product_names)} tên sản phẩm: dựng chỉ mục {elapsed:.0f} ms, "
+                f"{size / 1024 / 1024:.1f} MB\n"
+            )
+
+            prefixes = [text[:n] for text in TYPED for n in range(1, len(text) + 1)]
+            timings = {'chỉ mục': [], 'view': []}
+            client = Client()
+            for prefix in prefixes:
+                timings['chỉ mục'] += measure(lambda: autocomplete.suggest(prefix), repeat=options['repeat'])[0]
+                timings['view'] += measure(
+                    lambda: client.get('/products/suggest.json', {'q': prefix}), repeat=options['repeat'] // 10,
+                )[0]
+
+            rebuild_index()
+            timings['SearchToken'] = []
+            for prefix in prefixes:
+                timings['SearchToken'] += measure(
+                    lambda: search_products(prefix, visible_products())[:autocomplete.SUGGEST_LIMIT],
+                    repeat=options['db_repeat'], warmup=1,
+                )[0]
+
+            self.stdout.write(f"{len(prefixes)} tiền tố (gõ từng phím của {', '.join(TYPED)})")
+            self.stdout.write(f"{'đường':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for label, values in timings.items():
+                values.sort()
+                self.stdout.write(
+                    f"{label:<14} {percentile(values, 50):>8.3f} {percentile(values, 95):>8.3f} "
+                    f"{percentile(values, 99):>8.3f} {values[-1]:>8.3f}"
+                )
@@ -0,0 +1,37 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.bench import benchmark_database, measure, seed_catalog
+
+
+class Command(BaseCommand):
+    help = "Benchmark trang danh sách sản phẩm: số query và thời gian render khi catalog lớn dần"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+            help="Các kích thước catalog cần đo (số sản phẩm)",
+        )
+        parser.add_argument('--repeat', type=int, default=20, help="Số lần đo mỗi trường hợp")
+
+    def handle(self, *args, **options):
+        client = Client()
+        self.stdout.write(f"{'products':>9} {'case':<16} {'queries':>7} {'median ms':>10} {'max ms':>8}")
+        with benchmark_database():
+            for n_products in sorted(options['sizes']):
+                seed_catalog(n_products)
+                last_page = (n_products + 11) // 12
+                cases = [
+                    ('home', '/'),
+                    ('page 2', '/products/?page=2'),
+                    ('last page', f'/products/?page={last_page}'),
+                    ('keyset deep', f'/products/?after={max(n_products - 12, 0)}'),
+                ]
+                for label, url in cases:
+                    timings, queries = measure(lambda: client.get(url), repeat=options['repeat'])
+                    self.stdout.write(
+                        f"{n_products:>9} {label:<16} {queries:>7} "
+                        f"{statistics.median(timings):>10.2f} {max(timings):>8.2f}"
+                    )
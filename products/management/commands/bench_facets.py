@@ -0,0 +1,69 @@
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Mod
+from django.http import QueryDict
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog
+from products import reference
+from products.catalog import bump_catalog_version
+from products.facets import PRICE_BANDS, faceted_page, filter_products, parse_filters
+from products.models import Category, ProductSize
+
+
+class Command(BaseCommand):
+    help = "Thời gian trả trang lọc có facet (cache trống/đã có) so với đếm từng giá trị facet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=25_000, help="Số sản phẩm (mỗi sản phẩm 4 size)")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            # Khoảng 30% SKU hết hàng
+            ProductSize.objects.annotate(bucket=Mod('id', 10)).filter(bucket__lt=3).update(quantity=0)
+            self.stdout.write(f"{ProductSize.objects.count()} SKU, {options['products']} sản phẩm\n")
+
+            category_id = Category.objects.order_by('id').values_list('id', flat=True)[2]
+            combos = [
+                ('không lọc', ''),
+                ('size M', 'size=M'),
+                ('size S+L, còn hàng', 'size=S&size=L&in_stock=1'),
+                ('danh mục + giá', f'category={category_id}&min_price=200000&max_price=300000'),
+                ('tất cả', f'category={category_id}&size=M&size=XL&min_price=150000&in_stock=1'),
+            ]
+
+            self.stdout.write(
+                f"{'bộ lọc':<22} {'cách đo':<18} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8}"
+            )
+            for label, query in combos:
+                filters = parse_filters(QueryDict(query))
+
+                def cold():
+                    bump_catalog_version()
+                    faceted_page(filters)
+
+                for mode, func in (
+                    ('cache trống', cold),
+                    ('cache đã có', lambda: faceted_page(filters)),
+                    ('đếm từng giá trị', lambda: self.count_each_value(filters)),
+                ):
+                    timings, queries = measure(func, repeat=options['repeat'])
+                    self.stdout.write(
+                        f"{label:<22} {mode:<18} {percentile(timings, 50):>8.2f} "
+                        f"{percentile(timings, 99):>8.2f} {queries:>8}"
+                    )
+
+    @staticmethod
+    def count_each_value(filters):
+        """Cách làm thẳng: một COUNT cho mỗi size, mỗi danh mục và mỗi khoảng giá"""
+        counts = {}
+        for size in reference.all_sizes():
+            counts['size', size.id] = filter_products(replace(filters, sizes=(size.id,))).count()
+        for category in reference.active_categories():
+            counts['category', category.id] = filter_products(replace(filters, category=category.id)).count()
+        for slug, _, low, high in PRICE_BANDS:
+            counts['price', slug] = filter_products(replace(filters, min_price=low, max_price=high)).count()
+        list(filter_products(filters)[:12])
+        return counts
@@ -0,0 +1,43 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.bench import benchmark_database, measure, seed_catalog
+from products.catalog import bump_catalog_version
+from products.models import Category
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Số request/giây của storefront cho khách khi cache lưới sản phẩm trống và khi đã có"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help="Số sản phẩm giả lập")
+        parser.add_argument('--repeat', type=int, default=100, help="Số request đo mỗi trang")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            rebuild_index()
+            client = Client()
+            category_id = Category.objects.order_by('id').values_list('id', flat=True)[0]
+            pages = [
+                ('home', '/'),
+                ('page 5', '/products/?page=5'),
+                ('category', f'/products/category/{category_id}/'),
+                ('search', '/products/?search=ao+thun'),
+            ]
+
+            self.stdout.write(f"{'page':<10} {'cache':<6} {'queries':>7} {'median ms':>10} {'req/s':>8}")
+            for label, url in pages:
+                def cold():
+                    bump_catalog_version()  # Bỏ lưới đã cache, giữ cache danh mục/size
+                    client.get(url)
+
+                for mode, func in (('cold', cold), ('warm', lambda: client.get(url))):
+                    timings, queries = measure(func, repeat=options['repeat'])
+                    self.stdout.write(
+                        f"{label:<10} {mode:<6} {queries:>7} {statistics.median(timings):>10.2f} "
+                        f"{1000 / statistics.mean(timings):>8.0f}"
+                    )
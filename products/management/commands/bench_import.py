@@ -0,0 +1,52 @@
+import csv
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bench import SEED_SIZES, benchmark_database, seed_product_name
+from products.bulk import FIELDS, import_products, read_rows
+from products.models import ProductSize
+
+
+def write_csv(path, n_skus, price_offset=0):
+    """File CSV giả lập ``n_skus`` dòng (mỗi sản phẩm đủ các size trong SEED_SIZES)"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i in range(n_skus):
+            n = i // len(SEED_SIZES)
+            writer.writerow([
+                f"SP{n:07d}", seed_product_name(n), f"Danh mục {n % 10}", 100000 + (n % 50) * 10000 + price_offset,
+                SEED_SIZES[i % len(SEED_SIZES)], 50, 'product_images/16.webp', 0,
+            ])
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian và bộ nhớ khi nhập hàng loạt SKU từ CSV (lần đầu: thêm mới, lần hai: cập nhật)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skus', type=int, default=100000, help="Số dòng SKU trong file")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Số dòng ghi mỗi lô")
+
+    def handle(self, *args, **options):
+        with benchmark_database(), tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'products.csv')
+            self.stdout.write(f"{'run':<8} {'rows':>8} {'seconds':>8} {'rows/s':>8} {'max RSS MB':>11}")
+            for run, price_offset in (('insert', 0), ('update', 1000)):
+                write_csv(path, options['skus'], price_offset)
+                started = time.perf_counter()
+                with open(path, 'rb') as f:
+                    report = import_products(read_rows(f), batch_size=options['batch_size'])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{run:<8} {report.rows:>8} {elapsed:>8.1f} {report.rows / elapsed:>8.0f} {max_rss_mb():>11.0f}"
+                )
+                assert report.error_count == 0, report.errors
+            self.stdout.write(f"SKU trong database: {ProductSize.objects.count()}")
@@ -0,0 +1,71 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from core.bench import benchmark_database, run_concurrently, seed_catalog
+from products.inventory import InsufficientStock, reserve_stock
+from products.models import ProductSize
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def legacy_reserve(lines):
+    """Vòng lặp cũ của process_checkout: get, kiểm tra trong Python, rồi save() từng dòng"""
+    for product_size_id, quantity in lines:
+        product_size = ProductSize.objects.get(pk=product_size_id)
+        if product_size.quantity < quantity:
+            raise OutOfStock(product_size_id)
+        product_size.quantity -= quantity
+        product_size.save()
+
+
+class Command(BaseCommand):
+    help = "Stress test trừ tồn kho đồng thời: vòng lặp cũ so với reserve_stock (UPDATE có điều kiện)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--orders', type=int, default=2000, help="Số đơn mỗi chiến lược")
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--stock', type=int, default=40, help="Tồn kho ban đầu mỗi size")
+        parser.add_argument('--lines', type=int, default=5, help="Số dòng mỗi đơn")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'], stock=options['stock'])
+            ids = list(ProductSize.objects.order_by('id').values_list('id', flat=True))
+            orders = []
+            for i in range(options['orders']):
+                rng = random.Random(i)
+                orders.append([(pk, rng.randint(1, 3)) for pk in rng.sample(ids, options['lines'])])
+
+            self.stdout.write(
+                f"{'strategy':<12} {'orders/s':>9} {'placed':>7} {'rejected':>9} {'errors':>7} {'oversold':>9}"
+            )
+            for label, reserve, rejected_exc in (
+                ('legacy loop', legacy_reserve, OutOfStock),
+                ('conditional', reserve_stock, InsufficientStock),
+            ):
+                ProductSize.objects.update(quantity=options['stock'])
+
+                def place(i):
+                    with transaction.atomic():
+                        reserve(orders[i])
+                    return True
+
+                elapsed, results = run_concurrently(place, options['threads'], len(orders))
+                placed = [orders[i] for i, result in enumerate(results) if result is True]
+                rejected = sum(isinstance(result, rejected_exc) for result in results)
+                errors = len(results) - len(placed) - rejected
+
+                sold = sum(quantity for lines in placed for _, quantity in lines)
+                remaining = ProductSize.objects.aggregate(total=Sum('quantity'))['total']
+                negative = ProductSize.objects.filter(quantity__lt=0).count()
+                oversold = (len(ids) * options['stock'] - remaining) != sold or negative
+                self.stdout.write(
+                    f"{label:<12} {len(results) / elapsed:>9.1f} {len(placed):>7} {rejected:>9} "
+                    f"{errors:>7} {'YES' if oversold else 'no':>9}"
+                )
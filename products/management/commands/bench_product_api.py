@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog
+
+
+class Command(BaseCommand):
+    help = "JSON sản phẩm: 200 so với 304 (If-None-Match), một request batch so với từng sản phẩm"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--lines', type=int, default=20, help="Số sản phẩm trong giỏ hàng cần làm mới")
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            client = Client()
+            ids = [1 + i * (options['products'] // options['lines']) for i in range(options['lines'])]
+            batch_url = f"/products/batch?ids={','.join(map(str, ids))}"
+            detail_etag = client.get('/products/1.json')['ETag']
+            batch_etag = client.get(batch_url)['ETag']
+
+            def each():
+                return [client.get(f'/products/{product_id}.json') for product_id in ids]
+
+            cases = [
+                ('chi tiết 200', lambda: [client.get('/products/1.json')]),
+                ('chi tiết 304', lambda: [client.get('/products/1.json', HTTP_IF_NONE_MATCH=detail_etag)]),
+                (f"{options['lines']} x chi tiết", each),
+                (f"batch {options['lines']} 200", lambda: [client.get(batch_url)]),
+                (f"batch {options['lines']} 304", lambda: [client.get(batch_url, HTTP_IF_NONE_MATCH=batch_etag)]),
+            ]
+            self.stdout.write(
+                f"{'request':<18} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8} {'request':>8} {'bytes':>8}"
+            )
+            for label, func in cases:
+                responses = func()
+                timings, queries = measure(func, repeat=options['repeat'])
+                size = sum(len(response.content) for response in responses)
+                self.stdout.write(
+                    f"{label:<18} {percentile(timings, 50):>8.2f} {percentile(timings, 99):>8.2f} "
+                    f"{queries:>8} {len(responses):>8} {size:>8}"
+                )
@@ -0,0 +1,44 @@
+import statistics
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.bench import benchmark_database, measure, seed_catalog
+from products import reference
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = "Số query và thời gian mỗi request storefront khi danh mục/size đọc từ database và từ cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help="Số sản phẩm giả lập")
+        parser.add_argument('--repeat', type=int, default=50, help="Số lần đo mỗi trang")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            client = Client()
+            client.force_login(User.objects.create_user('bench', password='x'))
+            category_id = Category.objects.order_by('id').values_list('id', flat=True)[0]
+            pages = [
+                ('home', '/'),
+                ('product list', '/products/'),
+                ('category', f'/products/category/{category_id}/'),
+                ('cart', '/orders/cart/'),
+            ]
+
+            self.stdout.write(f"{'page':<14} {'cache':<6} {'queries':>7} {'median ms':>10}")
+            for label, url in pages:
+                def cold():
+                    cache.clear()  # Mỗi request phải query lại danh mục/size như trước đây
+                    client.get(url)
+
+                for mode, func in (('cold', cold), ('warm', lambda: client.get(url))):
+                    timings, queries = measure(func, repeat=options['repeat'])
+                    self.stdout.write(f"{label:<14} {mode:<6} {queries:>7} {statistics.median(timings):>10.2f}")
+
+            stats = reference.stats()
+            self.stdout.write(f"reference cache: {stats['hits']} hits, {stats['misses']} misses")
@@ -0,0 +1,48 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog
+from products.catalog import PAGE_SIZE, visible_products
+from products.search import rebuild_index, search_products
+
+QUERIES = ('ao so mi', 'Áo Sơ Mi', 'xanh navy', 'quan jean den', 'slim', '4242')
+
+
+def icontains_products(query):
+    """Đường tìm kiếm cũ: LIKE '%query%' trên tên sản phẩm và tên danh mục"""
+    return visible_products().filter(
+        Q(name__icontains=query) | Q(category__name__icontains=query)
+    ).distinct()
+
+
+class Command(BaseCommand):
+    help = "So sánh độ trễ tìm kiếm qua chỉ mục SearchToken với đường icontains cũ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help="Số sản phẩm giả lập")
+        parser.add_argument('--repeat', type=int, default=10, help="Số lần đo mỗi câu tìm kiếm")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            rebuild_index()
+            self.stdout.write(
+                f"{'query':<16} {'path':<10} {'hits':>7} {'median ms':>10} {'p95 ms':>8}"
+            )
+            for query in QUERIES:
+                for label, build in (
+                    ('icontains', lambda: icontains_products(query)),
+                    ('index', lambda: search_products(query, visible_products())),
+                ):
+                    def first_page():
+                        products = build()
+                        return products.count(), list(products[:PAGE_SIZE])
+
+                    hits = first_page()[0]
+                    timings, _ = measure(first_page, repeat=options['repeat'])
+                    self.stdout.write(
+                        f"{query:<16} {label:<10} {hits:>7} "
+                        f"{statistics.median(timings):>10.2f} {percentile(timings, 95):>8.2f}"
+                    )
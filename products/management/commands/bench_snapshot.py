@@ -0,0 +1,82 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Mod
+from django.http import QueryDict
+from django.test import RequestFactory, override_settings
+
+from core.bench import benchmark_database, measure, percentile, seed_catalog
+from products import snapshot
+from products.catalog import bump_catalog_version, paginate_products, visible_products
+from products.facets import faceted_page, parse_filters
+from products.models import Category, ProductSize
+
+
+class Command(BaseCommand):
+    help = "Bản chụp catalog trong bộ nhớ: thời gian dựng, bộ nhớ, độ trễ trang danh sách/facet so với ORM"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=25_000, help="Số sản phẩm (mỗi sản phẩm 4 size)")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'])
+            ProductSize.objects.annotate(bucket=Mod('id', 10)).filter(bucket__lt=3).update(quantity=0)
+            category_id = Category.objects.order_by('id').values_list('id', flat=True)[2]
+
+            snapshot.clear()
+            started = time.perf_counter()
+            catalog = snapshot.get()
+            elapsed = (time.perf_counter() - started) * 1000
+            # Đo bộ nhớ ở lần dựng riêng: tracemalloc làm chậm lúc dựng
+            tracemalloc.start()
+            size = tracemalloc.get_traced_memory()[0]
+            copy = snapshot.CatalogSnapshot(catalog.version)
+            size = tracemalloc.get_traced_memory()[0] - size
+            del copy
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{len(catalog)} sản phẩm: dựng bản chụp {elapsed:.0f} ms, {size / 1024 / 1024:.1f} MB\n"
+            )
+
+            factory = RequestFactory()
+            middle = catalog.ids[len(catalog) // 2]
+            listings = [
+                ('trang 1', '/', None),
+                ('trang 1000', '/?page=1000', None),
+                ('after=<giữa>', f'/?after={middle}', None),
+                ('danh mục trang 50', '/?page=50', category_id),
+            ]
+            self.stdout.write(f"{'thao tác':<24} {'nguồn':<10} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8}")
+            for label, url, category in listings:
+                request = factory.get(url)
+                for source, products in (
+                    ('ORM', lambda: visible_products(category)),
+                    ('bản chụp', lambda: snapshot.get().listing(category)),
+                ):
+                    self.report(label, source, lambda: paginate_products(request, products()), options)
+
+            for label, query in (
+                ('facet: size M', 'size=M'),
+                ('facet: S+L còn hàng', 'size=S&size=L&in_stock=1'),
+                ('facet: tất cả', f'category={category_id}&size=M&size=XL&min_price=150000&in_stock=1'),
+            ):
+                filters = parse_filters(QueryDict(query))
+
+                def orm():
+                    bump_catalog_version()  # cache facet trống, như lần đầu sau khi catalog đổi
+                    faceted_page(filters)
+
+                self.report(label, 'ORM', orm, options)
+                with override_settings(CATALOG_SNAPSHOT=True):
+                    snapshot.get()
+                    self.report(label, 'bản chụp', lambda: faceted_page(filters), options)
+
+    def report(self, label, source, func, options):
+        timings, queries = measure(func, repeat=options['repeat'])
+        self.stdout.write(
+            f"{label:<24} {source:<10} {percentile(timings, 50):>8.3f} "
+            f"{percentile(timings, 99):>8.3f} {queries:>8}"
+        )
@@ -0,0 +1,76 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.catalog import bump_catalog_version
+from products.images import FORMATS, WIDTHS, render_renditions
+from products.models import Product
+
+
+def _render(source_name):
+    """Chạy trong process con: trả về (ảnh gốc, manifest, sizes) hoặc (ảnh gốc, None, lỗi)"""
+    try:
+        manifest, sizes = render_renditions(source_name)
+    except (OSError, ValueError) as e:
+        return source_name, None, str(e)
+    return source_name, manifest, sizes
+
+
+def _kb(n_bytes):
+    return f"{n_bytes / 1024:,.0f} KB"
+
+
+class Command(BaseCommand):
+    help = "Tạo ảnh thu nhỏ WebP/JPEG cho ảnh sản phẩm đã có (chạy song song nhiều process)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Số process xử lý ảnh")
+        parser.add_argument('--force', action='store_true', help="Tạo lại cả ảnh đã có rendition")
+
+    def handle(self, *args, **options):
+        # Nhiều sản phẩm có thể dùng chung một ảnh: mỗi ảnh gốc chỉ xử lý một lần
+        by_source = defaultdict(list)
+        for product in Product.objects.exclude(image='').exclude(image__isnull=True).only('image', 'image_renditions'):
+            if options['force'] or product.image_renditions.get('source') != product.image.name:
+                by_source[product.image.name].append(product)
+        if not by_source:
+            self.stdout.write("Không có ảnh nào cần xử lý.")
+            return
+
+        connections.close_all()  # Không để process con dùng chung kết nối database
+        totals = defaultdict(int)
+        failed = 0
+        changed = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for source_name, manifest, sizes in pool.map(_render, by_source, chunksize=4):
+                if manifest is None:
+                    failed += 1
+                    self.stderr.write(f"{source_name}: {sizes}")
+                    continue
+                totals['original'] += sizes[source_name]
+                for key in FORMATS:
+                    for width, name in manifest[key].items():
+                        totals[key, int(width)] += sizes[name]
+                for product in by_source[source_name]:
+                    product.image_renditions = manifest
+                    changed.append(product)
+
+        Product.objects.bulk_update(changed, ['image_renditions'], batch_size=500)
+        bump_catalog_version()
+
+        done = len(by_source) - failed
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã xử lý {done} ảnh ({len(changed)} sản phẩm), lỗi {failed}."
+        ))
+        if not done:
+            return
+        self.stdout.write(f"{'rendition':<12} {'tổng':>12} {'tiết kiệm':>12}")
+        self.stdout.write(f"{'gốc':<12} {_kb(totals['original']):>12} {'':>12}")
+        for key in FORMATS:
+            for width in WIDTHS:
+                size = totals[key, width]
+                saved = 1 - size / totals['original'] if totals['original'] else 0
+                self.stdout.write(f"{f'{key} {width}w':<12} {_kb(size):>12} {saved:>11.0%}")
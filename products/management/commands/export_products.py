@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.bulk import FORMATS, detect_format, export_lines
+
+
+class Command(BaseCommand):
+    help = "Xuất toàn bộ SKU ra CSV/JSONL (cùng định dạng với import_products)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="File đích (mặc định ghi ra stdout)")
+        parser.add_argument('--format', choices=FORMATS, help="Định dạng file (mặc định đoán theo đuôi file)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (detect_format(path) if path else 'csv')
+        if path:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(export_lines(fmt))
+        else:
+            for line in export_lines(fmt):
+                self.stdout.write(line, ending='')
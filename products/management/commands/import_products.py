@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk import BATCH_SIZE, FORMATS, detect_format, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Nhập sản phẩm hàng loạt từ file CSV/JSONL (mỗi dòng một SKU, upsert theo mã sản phẩm)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Đường dẫn file CSV hoặc JSONL")
+        parser.add_argument('--format', choices=FORMATS, help="Định dạng file (mặc định đoán theo đuôi file)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Số dòng ghi mỗi lô")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                report = import_products(read_rows(f, fmt), batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for line, message in report.errors:
+            self.stderr.write(f"Dòng {line}: {message}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... và {report.error_count - len(report.errors)} lỗi khác")
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã nhập {report.rows - report.error_count}/{report.rows} dòng: "
+            f"{report.products} sản phẩm, {report.skus} SKU trong {elapsed:.1f}s."
+        ))
+        self.stdout.write("Chạy build_image_renditions để tạo ảnh thu nhỏ cho ảnh mới.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Xây lại chỉ mục tìm kiếm sản phẩm (bảng product_search_tokens)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Số token ghi mỗi lô")
+
+    def handle(self, *args, **options):
+        written = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã ghi {written} token vào chỉ mục tìm kiếm."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_alter_category_options_alter_product_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Từ khoá tìm kiếm',
+                'verbose_name_plural': 'Từ khoá tìm kiếm',
+                'db_table': 'product_search_tokens',
+                'indexes': [models.Index(fields=['token', 'product', 'weight'], name='search_token_idx'), models.Index(fields=['product', 'token', 'weight'], name='search_product_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+def assign_codes(apps, schema_editor):
+    """Sản phẩm đã có nhận mã SP<id> để xuất/nhập lại được"""
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.filter(code__isnull=True).only('id'))
+    for product in products:
+        product.code = f"SP{product.id:06d}"
+    Product.objects.bulk_update(products, ['code'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='code',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Mã sản phẩm'),
+        ),
+        migrations.RunPython(assign_codes, migrations.RunPython.noop),
+    ]
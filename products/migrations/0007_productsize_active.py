@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsize',
+            name='active',
+            field=models.BooleanField(default=True, verbose_name='Đang bán'),
+        ),
+    ]
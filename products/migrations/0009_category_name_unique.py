@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    """Danh mục trùng tên (đã có trước ràng buộc) được đổi thành "<tên> (<id>)", giữ nguyên
+    danh mục có id nhỏ nhất; admin tự gộp sản phẩm nếu cần"""
+    Category = apps.get_model('products', 'Category')
+    names = Category.objects.values('name').annotate(n=Count('id')).filter(n__gt=1).values_list('name', flat=True)
+    for name in names:
+        for category in Category.objects.filter(name=name).order_by('id')[1:]:
+            suffix = f" ({category.id})"
+            category.name = name[:255 - len(suffix)] + suffix
+            category.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_decimal_price_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
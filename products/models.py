@@ -1,7 +1,8 @@
 from django.db import models
 
 class Category(models.Model):
-    name = models.CharField(max_length=255)
+    # Duy nhất: nhập hàng loạt (products.bulk) tìm/tạo danh mục theo tên
+    name = models.CharField(max_length=255, unique=True)
     hide = models.BooleanField(default=False)
 
     class Meta:
@@ -27,13 +28,24 @@ class Size(models.Model):
 
 class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products")
+    # Mã sản phẩm: khoá để nhập/xuất hàng loạt (products.bulk) cập nhật đúng sản phẩm
+    code = models.CharField(max_length=64, unique=True, null=True, blank=True, verbose_name='Mã sản phẩm')
     name = models.CharField(max_length=255)
-    price = models.FloatField()  # Hoặc DecimalField nếu muốn chính xác hơn
+    price = models.DecimalField(max_digits=12, decimal_places=2)
     image = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    # Ảnh thu nhỏ WebP/JPEG của ``image`` (xem products.images)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     hide = models.BooleanField(default=False)
 
     class Meta:
         db_table = 'products'
+        indexes = [
+            # Storefront luôn lọc hide=False: index bao phủ cho COUNT(*) của Paginator (cả catalog
+            # và từng danh mục) và cho trang danh mục sắp theo id
+            models.Index(fields=['hide', 'category', 'id'], name='product_visible_idx'),
+            # Sắp theo tên ở trang quản lý và admin
+            models.Index(fields=['name'], name='product_name_idx'),
+        ]
         verbose_name = 'Sản phẩm'
         verbose_name_plural = 'Sản phẩm'
 
@@ -49,6 +61,8 @@ class ProductSize(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sizes')
     size = models.ForeignKey(Size, on_delete=models.PROTECT)
     quantity = models.IntegerField(default=0, verbose_name='Số lượng tồn kho')  # THÊM FIELD NÀY
+    # Size đã có trong đơn hàng không xoá được (PROTECT): bỏ size thì chỉ ngừng bán
+    active = models.BooleanField(default=True, verbose_name='Đang bán')
 
     class Meta:
         unique_together = ('product', 'size')
@@ -58,3 +72,25 @@ class ProductSize(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - {self.size.name} (SL: {self.quantity})"
+
+
+class SearchToken(models.Model):
+    """Chỉ mục đảo cho tìm kiếm sản phẩm: mỗi dòng là một từ (đã bỏ dấu) của tên sản phẩm/danh mục"""
+    # Hai index bao phủ (covering): tra theo từ khoá và gom nhóm theo sản phẩm không cần đọc bảng
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='search_tokens', db_index=False
+    )
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'product_search_tokens'
+        indexes = [
+            models.Index(fields=['token', 'product', 'weight'], name='search_token_idx'),
+            models.Index(fields=['product', 'token', 'weight'], name='search_product_idx'),
+        ]
+        verbose_name = 'Từ khoá tìm kiếm'
+        verbose_name_plural = 'Từ khoá tìm kiếm'
+
+    def __str__(self):
+        return f"{self.token} -> {self.product_id}"
@@ -0,0 +1,104 @@
+"""Dữ liệu tham chiếu của storefront (danh mục đang hiển thị, danh sách size) đọc qua cache.
+
+Hai bảng này gần như không đổi nhưng mọi trang storefront đều cần. Mỗi process giữ một
+bản trong bộ nhớ kèm số phiên bản; phiên bản hiện tại nằm trong ``CACHES['default']`` nên
+mỗi request chỉ tốn một lần đọc cache để kiểm tra, không query database. Lưu/xoá
+``Category`` hoặc ``Size`` (xem ``products.signals``) đổi phiên bản và process đọc lại.
+
+Chỉ khi cache dùng chung giữa các process (``CACHE_BACKEND=file``) thì các worker khác mới
+thấy phiên bản mới ngay. Với locmem (mặc định) mỗi process có cache riêng: phiên bản hết
+hạn sau ``CACHE_VERSION_TIMEOUT`` giây để dữ liệu cũ ở worker khác chỉ tồn tại tối đa chừng
+đó (``manage.py check --deploy`` cảnh báo cấu hình này). Cùng áp dụng cho mọi thứ dựng trên
+phiên bản: lưới sản phẩm, facet, bản chụp catalog, gợi ý tìm kiếm và ETag storefront.
+
+Phiên bản là một giá trị ngẫu nhiên chứ không phải bộ đếm, để cache bị xoá/hết hạn rồi
+tạo lại không bao giờ trùng với phiên bản cũ mà một process còn giữ.
+"""
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category, Size
+
+VERSION_KEY = 'refdata:version'
+DATA_TIMEOUT = 24 * 60 * 60  # Chỉ để dọn các phiên bản cũ; dữ liệu được làm mới theo phiên bản
+
+_local = {}
+_stats = Counter()
+
+LOADERS = {
+    'categories': lambda: list(Category.objects.filter(hide=False)),
+    'sizes': lambda: list(Size.objects.all()),
+}
+
+
+def version_timeout():
+    """Thời gian sống của khoá phiên bản: ``None`` (không hết hạn) khi cache dùng chung"""
+    return settings.CACHE_VERSION_TIMEOUT or None
+
+
+def current_version(key=VERSION_KEY):
+    """Phiên bản hiện tại lưu ở ``key`` trong cache (tạo mới nếu chưa có hoặc đã hết hạn)"""
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, version_timeout()):
+            version = cache.get(key, version)
+    return version
+
+
+def _set_new_version(key):
+    cache.set(key, uuid.uuid4().hex, version_timeout())
+    if key == VERSION_KEY:
+        _local.clear()
+
+
+def bump_version(key=VERSION_KEY):
+    """Đánh dấu dữ liệu đã đổi; mọi process đọc lại ở lần truy cập sau.
+
+    Đổi phiên bản lần nữa sau commit: process khác có thể đã đọc lại dữ liệu cũ (chưa
+    commit) vào phiên bản vừa tạo.
+    """
+    _set_new_version(key)
+    transaction.on_commit(lambda: _set_new_version(key))
+
+
+def get(name):
+    """Dữ liệu tham chiếu ``name`` (một khoá trong ``LOADERS``), đọc qua cache"""
+    version = current_version()
+    local = _local.get(name)
+    if local is not None and local[0] == version:
+        _stats['hits'] += 1
+        return local[1]
+
+    key = f'refdata:{name}:{version}'
+    value = cache.get(key)
+    if value is None:
+        _stats['misses'] += 1
+        value = LOADERS[name]()
+        cache.set(key, value, DATA_TIMEOUT)
+    else:
+        _stats['hits'] += 1
+    _local[name] = (version, value)
+    return value
+
+
+def active_categories():
+    """Danh mục đang hiển thị (``hide=False``)"""
+    return get('categories')
+
+
+def all_sizes():
+    return get('sizes')
+
+
+def stats():
+    """Số lần đọc trúng cache (``hits``) và phải query database (``misses``) của process này"""
+    return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_stats():
+    _stats.clear()
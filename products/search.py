@@ -0,0 +1,216 @@
+"""Tìm kiếm sản phẩm qua chỉ mục đảo ``SearchToken`` thay cho ``icontains``.
+
+Tên sản phẩm và danh mục được tách thành từ, bỏ dấu tiếng Việt và viết thường
+("Áo Sơ Mi" -> ``ao``, ``so``, ``mi``). Mỗi từ trong câu tìm kiếm khớp theo tiền tố
+(range scan trên index ``token``), sản phẩm phải khớp đủ mọi từ và được xếp theo điểm:
+từ trong tên nặng hơn từ trong danh mục, khớp trọn từ nặng hơn khớp tiền tố.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+from .models import Product, SearchToken
+
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 1
+EXACT_BONUS = 2
+MAX_TERMS = 8
+INDEX_BATCH_SIZE = 2000
+
+_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_max_token_length = SearchToken._meta.get_field('token').max_length
+
+
+def _fold_char(char):
+    char = char.replace('đ', 'd').replace('Đ', 'D')
+    return ''.join(ch for ch in unicodedata.normalize('NFD', char) if not unicodedata.combining(ch))
+
+
+class _FoldTable(dict):
+    """Bảng ``str.translate``: mã ký tự -> ký tự đã bỏ dấu, tính lần đầu gặp rồi nhớ lại.
+
+    Bỏ hết dấu thì tách từng ký tự cho cùng kết quả với ``normalize`` cả chuỗi. Chỉ nhớ các
+    ký tự Latin (đủ cho tiếng Việt) để bảng không lớn dần theo dữ liệu nhập vào.
+    """
+
+    def __missing__(self, code):
+        folded = _fold_char(chr(code))
+        if code < _FOLD_CACHE_LIMIT:
+            self[code] = folded
+        return folded
+
+
+_FOLD_CACHE_LIMIT = 0x2000
+_fold_table = _FoldTable()
+
+
+def fold(text):
+    """Bỏ dấu và viết thường: "Áo Sơ Mi Đỏ" -> "ao so mi do" """
+    return (text or '').translate(_fold_table).lower()
+
+
+def tokenize(text):
+    """Danh sách từ (không trùng, giữ thứ tự) của ``text`` sau khi bỏ dấu"""
+    tokens = []
+    for token in _TOKEN_RE.findall(fold(text)):
+        token = token[:_max_token_length]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def _prefix_upper_bound(term):
+    """Chuỗi nhỏ nhất lớn hơn mọi từ bắt đầu bằng ``term`` (trong bảng chữ [0-9a-z]).
+
+    Dùng ``token >= term AND token < upper`` thay cho ``LIKE 'term%'`` để cả SQLite lẫn
+    MySQL (collation *_ci) đều quét theo index.
+    """
+    chars = list(term)
+    while chars:
+        pos = _ALPHABET.find(chars[-1])
+        if 0 <= pos < len(_ALPHABET) - 1:
+            chars[-1] = _ALPHABET[pos + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def _prefix_q(term, field='token'):
+    upper = _prefix_upper_bound(term)
+    q = Q(**{f'{field}__gte': term})
+    if upper is not None:
+        q &= Q(**{f'{field}__lt': upper})
+    return q
+
+
+class SearchResults:
+    """Kết quả tìm kiếm đã xếp hạng, dùng được trực tiếp với ``Paginator``.
+
+    Chỉ giữ danh sách id theo thứ tự điểm; ``Product`` chỉ được nạp cho lát cắt
+    được lấy ra (một trang), nên chi phí render không phụ thuộc số kết quả.
+    """
+
+    def __init__(self, ranked, products):
+        self._ranked = ranked
+        self._products = products
+
+    def __len__(self):
+        return len(self._ranked)
+
+    def count(self):
+        return len(self._ranked)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ranked = self._ranked[index]
+        by_id = self._products.in_bulk([product_id for product_id, _ in ranked])
+        page = []
+        for product_id, score in ranked:
+            product = by_id.get(product_id)
+            if product is not None:
+                product.score = score
+                page.append(product)
+        return page
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def ids(self):
+        return [product_id for product_id, _ in self._ranked]
+
+
+def search_products(query, products=None):
+    """Sản phẩm khớp ``query``, xếp theo độ liên quan (điểm giảm dần, rồi id).
+
+    ``products`` là queryset gốc (mặc định mọi sản phẩm), ví dụ ``visible_products()``;
+    nó vừa giới hạn tập kết quả vừa quyết định cách nạp ``Product`` cho từng trang.
+    Một query trên bảng token (group theo sản phẩm) cho ra toàn bộ danh sách xếp hạng.
+    """
+    if products is None:
+        products = Product.objects.all()
+    terms = tokenize(query)[:MAX_TERMS]
+    if not terms:
+        return SearchResults([], products)
+
+    # Lấy tập ứng viên từ từ hiếm nhất (đếm trên index token, rất rẻ), sau đó chỉ gom
+    # nhóm token của các ứng viên này (theo index product_id) để lọc đủ từ và chấm điểm.
+    if len(terms) > 1:
+        driver = min(terms, key=lambda term: SearchToken.objects.filter(_prefix_q(term)).count())
+    else:
+        driver = terms[0]
+    candidates = products.order_by().filter(_prefix_q(driver, 'search_tokens__token')).values('pk')
+
+    any_term = Q()
+    exact = []
+    matched = {}
+    for i, term in enumerate(terms):
+        term_q = _prefix_q(term)
+        any_term |= term_q
+        exact.append(When(token=term, then='weight'))
+        matched[f'_term_{i}'] = Max(Case(When(term_q, then=1), default=0, output_field=IntegerField()))
+
+    exact_score = Case(*exact, default=0, output_field=IntegerField())
+    ranked = (
+        SearchToken.objects.filter(any_term, product_id__in=candidates)
+        .values('product_id')
+        .annotate(score=Sum('weight') + Sum(exact_score) * EXACT_BONUS, **matched)
+        .filter(**{name: 1 for name in matched})
+        .order_by('-score', 'product_id')
+        .values_list('product_id', 'score')
+    )
+    return SearchResults(list(ranked), products)
+
+
+def product_tokens(product, category_name):
+    """Các cặp (token, weight) cần lưu cho một sản phẩm"""
+    weights = {}
+    for token in tokenize(category_name):
+        weights[token] = CATEGORY_WEIGHT
+    for token in tokenize(product.name):
+        weights[token] = weights.get(token, 0) + NAME_WEIGHT
+    return weights.items()
+
+
+def index_product(product):
+    """Cập nhật lại các token của một sản phẩm"""
+    with transaction.atomic():
+        SearchToken.objects.filter(product_id=product.pk).delete()
+        SearchToken.objects.bulk_create([
+            SearchToken(product_id=product.pk, token=token, weight=weight)
+            for token, weight in product_tokens(product, product.category.name)
+        ])
+
+
+def index_category(category):
+    """Đánh chỉ mục lại toàn bộ sản phẩm thuộc danh mục (khi đổi tên danh mục)"""
+    rebuild_index(Product.objects.filter(category=category))
+
+
+def rebuild_index(products=None, batch_size=INDEX_BATCH_SIZE):
+    """Xây lại chỉ mục cho ``products`` (mặc định toàn bộ), trả về số token đã ghi"""
+    if products is None:
+        products = Product.objects.all()
+    products = products.select_related('category').only('id', 'name', 'category__name').order_by('id')
+    written = 0
+    with transaction.atomic():
+        if products.query.where:
+            SearchToken.objects.filter(product__in=products.values('id')).delete()
+        else:
+            SearchToken.objects.all().delete()
+        batch = []
+        for product in products.iterator(chunk_size=batch_size):
+            batch.extend(
+                SearchToken(product_id=product.pk, token=token, weight=weight)
+                for token, weight in product_tokens(product, product.category.name)
+            )
+            if len(batch) >= batch_size:
+                SearchToken.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        SearchToken.objects.bulk_create(batch)
+        written += len(batch)
+    return written
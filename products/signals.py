@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import reference
+from .api import bump_product_versions
+from .catalog import bump_catalog_version
+from .images import needs_renditions, update_renditions
+from .models import Category, Product, ProductSize, Size
+from .search import index_category, index_product
+
+# Gửi sau khi ghi hàng loạt sản phẩm/tồn kho bằng bulk_create (không phát post_save),
+# tham số ``product_ids``: danh sách id sản phẩm đã thay đổi
+products_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, raw=False, **kwargs):
+    """Giữ chỉ mục tìm kiếm khớp với tên/danh mục sản phẩm.
+
+    Xoá sản phẩm thì ``SearchToken`` bị xoá theo (CASCADE), không cần xử lý thêm.
+    """
+    if raw:
+        return
+    index_product(instance)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created=False, raw=False, **kwargs):
+    """Đổi tên danh mục thì đánh chỉ mục lại các sản phẩm thuộc danh mục đó"""
+    if raw or created:
+        return
+    index_category(instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def refresh_reference_data(sender, raw=False, **kwargs):
+    """Danh mục/size thay đổi: đổi phiên bản cache dữ liệu tham chiếu"""
+    if raw:
+        return
+    reference.bump_version()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def refresh_product_grid(sender, raw=False, **kwargs):
+    """Sản phẩm/size/danh mục thay đổi: đổi phiên bản catalog để bỏ các lưới sản phẩm đã cache
+    (và ETag các trang storefront, vốn có cả danh sách size trong bộ lọc)"""
+    if raw:
+        return
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def build_image_renditions(sender, instance, raw=False, **kwargs):
+    """Ảnh sản phẩm mới/đổi (dashboard, admin): tạo ảnh thu nhỏ ngay khi lưu"""
+    if raw:
+        return
+    if needs_renditions(instance) or (not instance.image and instance.image_renditions):
+        update_renditions(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_version(sender, instance, raw=False, **kwargs):
+    """Sản phẩm đổi: ETag JSON chi tiết sản phẩm (products.api) hết hiệu lực"""
+    if raw:
+        return
+    bump_product_versions([instance.pk])
+
+
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+def refresh_product_version_for_size(sender, instance, raw=False, **kwargs):
+    """Size/tồn kho đổi: ETag JSON của sản phẩm chứa size hết hiệu lực"""
+    if raw:
+        return
+    bump_product_versions([instance.product_id])
+
+
+@receiver(products_bulk_changed)
+def refresh_product_versions_for_bulk_change(sender, product_ids, **kwargs):
+    bump_product_versions(product_ids)
@@ -0,0 +1,90 @@
+"""Cập nhật danh sách size (``ProductSize``) của một sản phẩm theo kiểu so sánh khác biệt.
+
+Thay vì xoá hết rồi tạo lại, các dòng hiện có được so với danh sách mới: size mới được
+tạo, size đổi số lượng được cập nhật, size bị bỏ thì bị xoá — trừ khi đã có trong đơn
+hàng (``OrderItem.product_size`` là PROTECT), khi đó size chỉ bị ngừng bán
+(``active=False``, tồn kho về 0) để lịch sử đơn hàng vẫn trỏ đúng dòng. Chọn lại một size
+đã ngừng bán sẽ mở bán lại đúng dòng cũ.
+
+Số query không phụ thuộc số size: một lần đọc, một lần kiểm tra lịch sử đơn hàng, một
+``bulk_update``, một ``bulk_create`` và một lần xoá.
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Product, ProductSize
+from .signals import products_bulk_changed
+
+
+@dataclass
+class SizeChanges:
+    created: int = 0
+    updated: int = 0
+    retired: int = 0
+    deleted: int = 0
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.retired or self.deleted)
+
+
+def sync_product_sizes(product, quantities):
+    """Đưa các size của ``product`` về đúng ``quantities`` (``{size_id: số lượng}``).
+
+    Trả về ``SizeChanges``. Các thao tác hàng loạt không phát signal nên cuối cùng tự
+    đổi phiên bản lưới sản phẩm và báo ``products_bulk_changed`` (giỏ hàng tính lại).
+    """
+    changes = SizeChanges()
+    with transaction.atomic():
+        existing = {
+            product_size.size_id: product_size
+            for product_size in ProductSize.objects.select_for_update().filter(product=product)
+        }
+        to_create = [
+            ProductSize(product=product, size_id=size_id, quantity=quantity)
+            for size_id, quantity in quantities.items()
+            if size_id not in existing
+        ]
+
+        to_update = []
+        for size_id, quantity in quantities.items():
+            product_size = existing.get(size_id)
+            if product_size and (product_size.quantity != quantity or not product_size.active):
+                product_size.quantity = quantity
+                product_size.active = True
+                to_update.append(product_size)
+        changes.updated = len(to_update)
+
+        removed = [
+            product_size.pk for size_id, product_size in existing.items()
+            if size_id not in quantities and product_size.active
+        ]
+        sold = set()
+        if removed:
+            sold = set(
+                ProductSize.objects.filter(pk__in=removed, orderitem__isnull=False)
+                .values_list('pk', flat=True).distinct()
+            )
+        for product_size in existing.values():
+            if product_size.pk in sold:
+                product_size.quantity = 0
+                product_size.active = False
+                to_update.append(product_size)
+        changes.retired = len(sold)
+
+        if to_update:
+            ProductSize.objects.bulk_update(to_update, ['quantity', 'active'])
+        if to_create:
+            ProductSize.objects.bulk_create(to_create)
+            changes.created = len(to_create)
+        unsold = [pk for pk in removed if pk not in sold]
+        if unsold:
+            # CartItem chứa các size này bị xoá theo (CASCADE); orders.signals xoá cache giỏ
+            ProductSize.objects.filter(pk__in=unsold).delete()
+            changes.deleted = len(unsold)
+
+        if changes:
+            bump_catalog_version()
+            products_bulk_changed.send(sender=Product, product_ids=[product.pk])
+    return changes
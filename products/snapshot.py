@@ -0,0 +1,265 @@
+"""Bản chụp catalog trong bộ nhớ cho các trang danh sách (bật bằng ``CATALOG_SNAPSHOT``).
+
+Storefront đọc catalog nhiều hơn ghi hàng nghìn lần, nên mỗi process giữ sẵn các sản phẩm
+đang hiển thị dưới dạng cột gọn theo thứ tự id: ``array`` cho id/giá/danh mục, và bitmap
+(số nguyên Python, bit thứ ``i`` là sản phẩm ở vị trí ``i``) cho từng danh mục và tồn kho
+theo size. Lọc là phép AND/OR trên bitmap, đếm facet là ``int.bit_count()``, phân trang
+keyset là ``bisect`` trên cột id: cả ba chạy trong C trên toàn catalog, không query database.
+Chỉ khi dựng trang mới tạo ``Product`` (chưa lưu) cho đúng các dòng của trang đó.
+
+Bản chụp gắn với phiên bản catalog (``catalog_version``): sửa sản phẩm/size/danh mục đổi
+phiên bản, process dựng lại ở request sau (hai query) trong khi các thread khác vẫn dùng bản
+cũ. Bảng sản phẩm không có cột thời gian sửa nên không biết dòng nào đổi để vá riêng; riêng
+tồn kho (giảm khi đặt hàng, không đổi phiên bản) được đọc lại sau ``STOCK_REFRESH`` giây
+bằng một query trên ``product_sizes``, cùng độ trễ với số đếm facet đã cache.
+"""
+import json
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+from .catalog import catalog_version, visible_products
+from .models import Category, Product, ProductSize
+
+STOCK_REFRESH = 60
+
+_lock = threading.Lock()
+_current = None
+
+
+def _bitmap(positions, size):
+    """Bitmap ``size`` bit với các bit ở ``positions`` bật (dựng qua bytearray, O(n))"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _positions(mask, start=0, limit=None):
+    """Vị trí các bit bật của ``mask`` từ ``start`` trở đi, tăng dần"""
+    mask >>= start
+    found = []
+    while mask and (limit is None or len(found) < limit):
+        low = mask & -mask
+        found.append(start + low.bit_length() - 1)
+        mask ^= low
+    return found
+
+
+class CatalogSnapshot:
+    """Sản phẩm đang hiển thị (``hide=False``) xếp theo id, kèm bitmap danh mục và tồn kho"""
+
+    def __init__(self, version):
+        self.version = version
+        # Ảnh thu nhỏ đọc dạng chuỗi JSON, chỉ giải mã cho các dòng của trang được hiển thị
+        rows = list(visible_products().annotate(
+            renditions_json=Cast('image_renditions', TextField()),
+        ).values_list('id', 'price', 'category_id', 'name', 'image', 'renditions_json').order_by('id'))
+        self.ids = array('q', (row[0] for row in rows))
+        # Giá lưu theo đồng (x100) để so sánh số nguyên thay vì Decimal
+        self.prices = array('q', (int(row[1] * 100) for row in rows))
+        self.category_ids = array('q', (row[2] for row in rows))
+        self.names = [row[3] for row in rows]
+        # Chuỗi trùng nhau (ảnh, ảnh thu nhỏ) dùng chung một đối tượng
+        shared = {}
+        self.images = [shared.setdefault(row[4] or '', row[4] or '') for row in rows]
+        self.renditions = [shared.setdefault(row[5] or '{}', row[5] or '{}') for row in rows]
+        self.all = (1 << len(rows)) - 1
+
+        # Vị trí theo danh mục (tăng dần) và bitmap tương ứng
+        by_category = {}
+        for position, category_id in enumerate(self.category_ids):
+            by_category.setdefault(category_id, array('l')).append(position)
+        self.category_positions = by_category
+        self.category_masks = {
+            category_id: _bitmap(positions, len(rows)) for category_id, positions in by_category.items()
+        }
+        self.categories = Category.objects.in_bulk(list(by_category))
+
+        # Vị trí xếp theo giá để lấy khoảng giá bằng bisect
+        self.by_price = array('l', sorted(range(len(rows)), key=self.prices.__getitem__))
+        self.sorted_prices = array('q', (self.prices[position] for position in self.by_price))
+        self._price_masks = {}
+
+        self.load_stock()
+
+    def load_stock(self):
+        """(Đọc lại) bitmap SKU đang bán và còn hàng theo từng size"""
+        position_of = {product_id: position for position, product_id in enumerate(self.ids)}
+        active, in_stock = {}, {}
+        skus = ProductSize.objects.filter(active=True, product__hide=False).values_list(
+            'product_id', 'size_id', 'quantity',
+        )
+        for product_id, size_id, quantity in skus.iterator(chunk_size=5000):
+            position = position_of.get(product_id)
+            if position is None:  # Sản phẩm mới hơn bản chụp
+                continue
+            active.setdefault(size_id, []).append(position)
+            if quantity > 0:
+                in_stock.setdefault(size_id, []).append(position)
+        size = len(self.ids)
+        active = {size_id: _bitmap(positions, size) for size_id, positions in active.items()}
+        in_stock = {size_id: _bitmap(positions, size) for size_id, positions in in_stock.items()}
+        any_in_stock = 0
+        for mask in in_stock.values():
+            any_in_stock |= mask
+        # Gán một lần: thread khác đang đọc thấy trọn bản cũ hoặc trọn bản mới
+        self.stock = (active, in_stock, any_in_stock)
+        self.stock_loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Bitmap theo từng chiều lọc (xem products.facets.Filters)
+
+    def price_mask(self, min_price, max_price):
+        """Bitmap giá trong [min_price, max_price); ``None`` là không giới hạn"""
+        key = (min_price, max_price)
+        mask = self._price_masks.get(key)
+        if mask is None:
+            low = 0 if min_price is None else bisect_left(self.sorted_prices, math.ceil(min_price * 100))
+            high = len(self.ids) if max_price is None else bisect_left(self.sorted_prices, math.ceil(max_price * 100))
+            mask = _bitmap(self.by_price[low:high], len(self.ids))
+            if len(self._price_masks) < 256:
+                self._price_masks[key] = mask
+        return mask
+
+    def sku_mask(self, filters, sizes=True):
+        """Sản phẩm có ít nhất một SKU đang bán khớp size đã chọn (và còn hàng nếu lọc)"""
+        active, in_stock, any_in_stock = self.stock
+        per_size = in_stock if filters.in_stock else active
+        if sizes and filters.sizes:
+            mask = 0
+            for size_id in filters.sizes:
+                mask |= per_size.get(size_id, 0)
+            return mask
+        return any_in_stock if filters.in_stock else self.all
+
+    def product_mask(self, filters, skip=None):
+        """Bitmap theo mọi bộ lọc trên sản phẩm trừ chiều ``skip`` (``'category'``/``'price'``)"""
+        mask = self.all
+        if filters.category is not None and skip != 'category':
+            mask &= self.category_masks.get(filters.category, 0)
+        if skip != 'price' and (filters.min_price is not None or filters.max_price is not None):
+            mask &= self.price_mask(filters.min_price, filters.max_price)
+        return mask
+
+    def select(self, filters):
+        return self.product_mask(filters) & self.sku_mask(filters)
+
+    def facet_counts(self, filters, price_bands):
+        """Cùng kết quả với ``products.facets.compute_facets``, tính trên bitmap"""
+        active, in_stock, _ = self.stock
+        per_size = in_stock if filters.in_stock else active
+        products = self.product_mask(filters)
+        skus = self.sku_mask(filters)
+        by_price = self.product_mask(filters, skip='price') & skus
+        by_category = self.product_mask(filters, skip='category') & skus
+        return {
+            'sizes': {
+                size_id: count for size_id, mask in per_size.items() if (count := (mask & products).bit_count())
+            },
+            'categories': {
+                category_id: count for category_id, mask in self.category_masks.items()
+                if (count := (mask & by_category).bit_count())
+            },
+            'price': {
+                slug: (self.price_mask(low, high) & by_price).bit_count() for slug, _, low, high in price_bands
+            },
+        }
+
+    # Đọc sản phẩm
+
+    def product(self, position):
+        """``Product`` (chưa lưu, không query) của vị trí ``position``"""
+        product = Product(
+            id=self.ids[position],
+            name=self.names[position],
+            price=Decimal(self.prices[position]).scaleb(-2),
+            category_id=self.category_ids[position],
+            image=self.images[position],
+            image_renditions=json.loads(self.renditions[position]),
+        )
+        product.category = self.categories[product.category_id]
+        return product
+
+    def page(self, mask, after=0, limit=None):
+        """Sản phẩm khớp ``mask`` có id > ``after``, theo id"""
+        start = bisect_right(self.ids, after)
+        return [self.product(position) for position in _positions(mask, start, limit)]
+
+    def listing(self, category_id=None):
+        positions = range(len(self.ids)) if category_id is None else self.category_positions.get(category_id, ())
+        return SnapshotProducts(self, positions)
+
+
+class SnapshotProducts:
+    """Danh sách sản phẩm của bản chụp cho ``paginate_products``: đếm, cắt trang (Paginator)
+    và ``after(id)`` cho keyset, không query database"""
+
+    def __init__(self, snapshot, positions):
+        self.snapshot = snapshot
+        self.positions = positions
+
+    def count(self):
+        return len(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.snapshot.product(position) for position in self.positions[index]]
+        return self.snapshot.product(self.positions[index])
+
+    def after(self, product_id):
+        start = bisect_right(self.positions, product_id, key=self.snapshot.ids.__getitem__)
+        return SnapshotProducts(self.snapshot, self.positions[start:])
+
+
+def get():
+    """Bản chụp của phiên bản catalog hiện tại.
+
+    Chỉ một thread dựng lại; trong lúc đó các thread khác dùng bản cũ (nếu có) thay vì chờ.
+    """
+    global _current
+    version = catalog_version()
+    snapshot = _current
+    if snapshot is not None and snapshot.version == version:
+        if time.monotonic() - snapshot.stock_loaded_at > STOCK_REFRESH and _lock.acquire(blocking=False):
+            try:
+                snapshot.load_stock()
+            finally:
+                _lock.release()
+        return snapshot
+    if not _lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _current is None or _current.version != version:
+            _current = CatalogSnapshot(version)
+        return _current
+    finally:
+        _lock.release()
+
+
+def enabled():
+    return getattr(settings, 'CATALOG_SNAPSHOT', False)
+
+
+def listing_products(category_id=None):
+    """Sản phẩm đang hiển thị cho trang danh sách: từ bản chụp nếu bật, không thì queryset"""
+    if enabled():
+        return get().listing(category_id)
+    return visible_products(category_id)
+
+
+def clear():
+    global _current
+    _current = None
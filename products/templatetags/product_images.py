@@ -0,0 +1,41 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(renditions):
+    return ', '.join(
+        f"{default_storage.url(name)} {width}w"
+        for width, name in sorted(renditions.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def product_image(product, width=200, css_class='', alt=None):
+    """``<picture>`` với ``srcset`` WebP/JPEG từ ảnh thu nhỏ của sản phẩm.
+
+    Hiển thị ở ``width`` px (trình duyệt tự chọn bản 2x cho màn hình mật độ cao). Sản phẩm
+    chưa có ảnh thu nhỏ dùng ảnh gốc. ``data-full`` giữ URL ảnh gốc cho modal xem ảnh lớn.
+    """
+    if not product.image:
+        return ''
+    alt = product.name if alt is None else alt
+    renditions = product.image_renditions
+    if not renditions.get('jpeg'):
+        return format_html(
+            '<img src="{}" alt="{}" width="{}" class="{}" data-full="{}">',
+            product.image.url, alt, width, css_class, product.image.url,
+        )
+
+    jpeg = renditions['jpeg']
+    fallback = jpeg.get(str(width)) or jpeg[min(jpeg, key=int)]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}px">'
+        '<img src="{}" srcset="{}" sizes="{}px" alt="{}" width="{}" class="{}" data-full="{}" loading="lazy">'
+        '</picture>',
+        _srcset(renditions.get('webp', {})), width,
+        default_storage.url(fallback), _srcset(jpeg), width, alt, width, css_class, product.image.url,
+    )
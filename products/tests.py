@@ -1,3 +1,691 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from core.bench import run_concurrently, seed_catalog
+from products import api, autocomplete, bulk, reference, snapshot
+from products.catalog import PAGE_SIZE
+from products.checks import check_shared_cache
+from products.inventory import InsufficientStock, StockShortage, reserve_stock
+from products.models import Category, Product, ProductSize, SearchToken, Size
+from products.search import fold, rebuild_index, search_products, tokenize
+
+
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_home_renders_only_current_page(self):
+        seed_catalog(30)
+        response = self.client.get('/')
+        self.assertEqual(len(response.context['products']), PAGE_SIZE)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+
+    def test_query_count_does_not_grow_with_catalog(self):
+        seed_catalog(20)
+        self.client.get('/')  # nạp cache danh mục/size
+        with self.assertNumQueries(2):  # count + trang hiện tại
+            self.client.get('/?page=2')
+        seed_catalog(200)
+        with self.assertNumQueries(2):
+            self.client.get('/?page=2')
+
+    def test_keyset_mode_returns_rows_after_id(self):
+        seed_catalog(30)
+        first = self.client.get('/products/').context
+        after = first['next_after']
+        self.assertEqual(after, first['products'][-1].id)
+
+        response = self.client.get(f'/products/?after={after}')
+        ids = [p.id for p in response.context['products']]
+        self.assertEqual(len(ids), PAGE_SIZE)
+        self.assertTrue(all(pid > after for pid in ids))
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_out_of_range_after_falls_back_to_first_page(self):
+        seed_catalog(30)
+        first = [p.id for p in self.client.get('/products/').context['products']]
+        for after in (2 ** 64, -(2 ** 64)):
+            cache.clear()  # lưới đã cache thì response không có context
+            response = self.client.get(f'/products/?after={after}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([p.id for p in response.context['products']], first)
+
+
+class ProductFacetTests(TestCase):
+    url = '/products/filter.json'
+
+    def setUp(self):
+        cache.clear()
+        seed_catalog(60, n_categories=4, sizes=('S', 'M', 'L'))
+        skus = list(ProductSize.objects.order_by('id'))
+        for n, sku in enumerate(skus):
+            sku.quantity = 0 if n % 3 == 0 else 5
+            sku.active = n % 7 != 0
+        ProductSize.objects.bulk_update(skus, ['quantity', 'active'])
+        Product.objects.filter(id__in=Product.objects.order_by('id').values('id')[:5]).update(hide=True)
+        self.category = Category.objects.order_by('id').values_list('id', flat=True)[1]
+
+    def expected(self, category=None, size=(), min_price=None, max_price=None, in_stock=False):
+        """Tập id sản phẩm khớp bộ lọc, tính thẳng bằng Python"""
+        skus = {}
+        for product_id, size_name, quantity in ProductSize.objects.filter(active=True).values_list(
+            'product_id', 'size__name', 'quantity'
+        ):
+            skus.setdefault(product_id, []).append((size_name, quantity))
+        ids = set()
+        for product in Product.objects.filter(hide=False):
+            if category is not None and product.category_id != category:
+                continue
+            if min_price is not None and product.price < min_price:
+                continue
+            if max_price is not None and product.price >= max_price:
+                continue
+            if (size or in_stock) and not any(
+                (not size or name in size) and (not in_stock or quantity > 0)
+                for name, quantity in skus.get(product.id, ())
+            ):
+                continue
+            ids.add(product.id)
+        return ids
+
+    def test_facets_and_results_match_brute_force(self):
+        cases = [
+            {},
+            {'size': ['M']},
+            {'size': ['S', 'L'], 'in_stock': True},
+            {'category': self.category, 'min_price': 200000, 'max_price': 300000},
+            {'category': self.category, 'size': ['L'], 'min_price': 150000, 'in_stock': True},
+        ]
+        for case in cases:
+            params = {**case, 'in_stock': '1' if case.get('in_stock') else ''}
+            data = self.client.get(self.url, params).json()
+            matched = self.expected(**case)
+            self.assertEqual(data['total'], len(matched), case)
+            self.assertEqual([row['id'] for row in data['results']], sorted(matched)[:PAGE_SIZE], case)
+
+            for facet in data['facets']['sizes']:
+                self.assertEqual(facet['count'], len(self.expected(**{**case, 'size': (facet['name'],)})), (case, facet))
+            for facet in data['facets']['categories']:
+                self.assertEqual(facet['count'], len(self.expected(**{**case, 'category': facet['id']})), (case, facet))
+            for facet in data['facets']['price']:
+                band = self.expected(**{**case, 'min_price': facet['min_price'], 'max_price': facet['max_price']})
+                self.assertEqual(facet['count'], len(band), (case, facet))
+
+    def test_keyset_walks_all_matches(self):
+        seen, after = [], ''
+        while after is not None:
+            data = self.client.get(self.url, {'size': 'M', 'in_stock': '1', 'after': after}).json()
+            seen += [row['id'] for row in data['results']]
+            after = data['next_after']
+        self.assertEqual(seen, sorted(self.expected(size=('M',), in_stock=True)))
+
+    def test_query_count_is_bounded_and_facets_are_cached(self):
+        params = {'size': ['S', 'M'], 'in_stock': '1', 'min_price': '150000'}
+        self.client.get(self.url)  # nạp cache size/danh mục
+        with self.assertNumQueries(4):  # ba query facet + một trang sản phẩm
+            self.client.get(self.url, params)
+        with self.assertNumQueries(1):
+            self.client.get(self.url, params)
+
+        product = Product.objects.filter(hide=False).order_by('id').first()
+        product.price = 999999
+        product.save()  # đổi phiên bản catalog
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data['facets']['price'][-1]['count'], len(self.expected(
+            size=('S', 'M'), in_stock=True, min_price=500000,
+        )))
+
+    def test_invalid_parameters(self):
+        for params in ({'size': 'XXXL'}, {'min_price': 'abc'}, {'category': 'x'}, {'after': 'x'}, {'max_price': '-1'},
+                       {'after': str(2 ** 64)}, {'category': str(2 ** 64)}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+@override_settings(CATALOG_SNAPSHOT=True)
+class SnapshotFacetTests(ProductFacetTests):
+    """Cùng các kiểm tra của ProductFacetTests, đọc từ bản chụp catalog trong bộ nhớ"""
+
+    def setUp(self):
+        snapshot.clear()
+        super().setUp()
+
+    def test_query_count_is_bounded_and_facets_are_cached(self):
+        params = {'size': ['S', 'M'], 'in_stock': '1', 'min_price': '150000'}
+        self.client.get(self.url)  # dựng bản chụp
+        with self.assertNumQueries(0):
+            self.client.get(self.url, params)
+
+        product = Product.objects.filter(hide=False).order_by('id').first()
+        product.price = 999999
+        product.save()  # đổi phiên bản catalog: dựng lại
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data['facets']['price'][-1]['count'], len(self.expected(
+            size=('S', 'M'), in_stock=True, min_price=500000,
+        )))
+
+    def test_stock_is_reloaded_after_refresh_interval(self):
+        params = {'size': 'M', 'in_stock': '1'}
+        before = self.client.get(self.url, params).json()['total']
+        ProductSize.objects.filter(size__name='M').update(quantity=0)  # như trừ kho khi đặt hàng
+        self.assertEqual(self.client.get(self.url, params).json()['total'], before)
+        with mock.patch.object(snapshot, 'STOCK_REFRESH', 0):
+            self.assertEqual(self.client.get(self.url, params).json()['total'], 0)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        snapshot.clear()
+        seed_catalog(40, n_categories=3)
+        Product.objects.filter(id__in=[3, 17]).update(hide=True)
+        self.category = Category.objects.order_by('id').values_list('id', flat=True)[1]
+
+    def test_listing_matches_database(self):
+        urls = [
+            '/', '/?page=3', '/products/?after=14',
+            f'/products/category/{self.category}/', f'/products/category/{self.category}/?page=2',
+        ]
+        for url in urls:
+            cache.clear()
+            expected = self.client.get(url)
+            cache.clear()
+            with self.settings(CATALOG_SNAPSHOT=True):
+                response = self.client.get(url)
+            self.assertEqual(
+                [p.id for p in response.context['products']], [p.id for p in expected.context['products']], url
+            )
+            self.assertEqual(response.content, expected.content, url)
+
+    @override_settings(CATALOG_SNAPSHOT=True)
+    def test_pages_run_no_queries_and_follow_catalog_changes(self):
+        self.client.get('/')  # dựng bản chụp, nạp cache danh mục/size
+        with self.assertNumQueries(0):
+            self.client.get('/?page=2')
+            self.client.get(f'/products/category/{self.category}/')
+            self.client.get('/products/?after=20')
+
+        product = Product.objects.get(pk=1)
+        product.name = 'Áo Mới Về'
+        product.save()
+        self.assertContains(self.client.get('/'), 'Áo Mới Về')
+
+
+class ReferenceDataCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reference.reset_stats()
+        seed_catalog(5, n_categories=3)
+
+    def test_storefront_reads_categories_and_sizes_once(self):
+        seed_catalog(PAGE_SIZE + 1, n_categories=3)  # cần trang 2
+        with self.assertNumQueries(4):
+            self.client.get('/')
+        with self.assertNumQueries(2):  # chỉ còn count + trang của lưới sản phẩm
+            response = self.client.get('/?page=2')
+        self.assertEqual(len(response.context['categories']), 3)
+        self.assertEqual(reference.stats(), {'hits': 2, 'misses': 2})
+
+    def test_save_and_delete_invalidate(self):
+        self.assertEqual(len(reference.active_categories()), 3)
+        category = Category.objects.create(name='Phụ kiện')
+        self.assertIn(category, reference.active_categories())
+        category.hide = True
+        category.save()
+        self.assertNotIn(category, reference.active_categories())
+
+        size = Size.objects.create(name='XXL')
+        self.assertIn(size, reference.all_sizes())
+        size.delete()
+        self.assertEqual([s.name for s in reference.all_sizes()], ['S', 'M', 'L', 'XL'])
+
+    def test_file_cache_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with self.settings(CACHES={'default': backend}):
+                reference.active_categories()
+                reference._local.clear()  # process khác: chỉ có cache file dùng chung
+                with self.assertNumQueries(0):
+                    self.assertEqual(len(reference.active_categories()), 3)
+                Size.objects.create(name='XXL')
+                self.assertIn('XXL', [s.name for s in reference.all_sizes()])
+
+    @override_settings(CACHE_VERSION_TIMEOUT=60)
+    def test_version_expires_on_per_process_cache(self):
+        self.assertEqual(len(reference.active_categories()), 3)
+        # Worker khác sửa danh mục: bump_version chỉ tới cache locmem của worker đó
+        Category.objects.update(hide=True)
+        self.assertEqual(len(reference.active_categories()), 3)
+        later = time.time() + 61
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(reference.active_categories(), [])
+
+    def test_deploy_check_warns_about_locmem(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['products.W001'])
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with self.settings(CACHES={'default': backend}):
+                self.assertEqual(check_shared_cache(None), [])
+
+
+class ProductGridCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_catalog(30, n_categories=2)
+
+    def test_warm_page_runs_no_queries(self):
+        first = self.client.get('/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/')
+        self.assertEqual(second.content, first.content)
+        self.assertNotEqual(self.client.get('/?page=2').content, first.content)
+
+    def test_equivalent_urls_share_one_cache_entry(self):
+        self.client.get('/')
+        self.client.get('/?page=3')  # 30 sản phẩm: trang cuối
+        with self.assertNumQueries(0):
+            for url in ('/?page=1', '/?page=01', '/?page=abc', '/?page=1&x=2', '/?page=0', '/?page=999'):
+                self.client.get(url)
+        self.client.get('/products/?after=12')
+        with self.assertNumQueries(0):
+            self.client.get('/products/?after=012')
+        self.client.get('/products/?after=0')
+        with self.assertNumQueries(0):
+            self.client.get('/products/?after=abc&page=2')
+            self.client.get(f'/products/?after={2 ** 64}')
+
+    def test_product_change_invalidates_grid(self):
+        self.client.get('/')
+        product = Product.objects.get(pk=1)
+        product.name = 'Áo Mới Về'
+        product.save()
+        self.assertContains(self.client.get('/'), 'Áo Mới Về')
+
+    def test_grid_is_keyed_by_category_and_search(self):
+        category = Category.objects.order_by('id').first()
+        by_category = self.client.get(f'/products/category/{category.id}/')
+        self.assertEqual({p.category_id for p in by_category.context['products']}, {category.id})
+        self.assertNotEqual(by_category.content, self.client.get('/').content)
+
+        rebuild_index()
+        self.assertContains(self.client.get('/products/?search=thun'), 'Áo Thun Trắng Basic 2')
+        self.assertNotContains(self.client.get('/products/?search=jean'), 'Áo Thun')
+
+
+class ProductImageRenditionTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.category = Category.objects.create(name='Áo')
+
+    def upload(self, name='ao.png', size=(800, 600), mode='RGBA'):
+        buffer = BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else 'navy').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_builds_hashed_renditions(self):
+        product = Product.objects.create(category=self.category, name='Áo', price=1, image=self.upload())
+        renditions = Product.objects.get(pk=product.pk).image_renditions
+        self.assertEqual(renditions['source'], product.image.name)
+        for key, ext in (('webp', 'webp'), ('jpeg', 'jpg')):
+            self.assertEqual(sorted(renditions[key], key=int), ['200', '400'])
+            for width, name in renditions[key].items():
+                self.assertRegex(name, rf'^product_images/ao\.{width}w\.[0-9a-f]{{8}}\.{ext}$')
+                with default_storage.open(name) as f:
+                    self.assertEqual(Image.open(f).width, int(width))
+
+    def test_grid_uses_srcset_and_changed_image_is_rebuilt(self):
+        cache.clear()
+        product = Product.objects.create(category=self.category, name='Áo', price=1, image=self.upload())
+        first = product.image_renditions['webp']['200']
+        self.assertContains(self.client.get('/'), f'{settings.MEDIA_URL}{first} 200w')
+
+        product.image = self.upload('ao-moi.png', mode='RGB')
+        product.save()
+        second = Product.objects.get(pk=product.pk).image_renditions['webp']['200']
+        self.assertNotEqual(second, first)
+        self.assertContains(self.client.get('/'), f'{settings.MEDIA_URL}{second} 200w')
+
+    def test_unreadable_image_falls_back_to_original(self):
+        broken = SimpleUploadedFile('hong.jpg', b'not an image', content_type='image/jpeg')
+        with self.assertLogs('products.images', 'WARNING'):
+            product = Product.objects.create(category=self.category, name='Áo', price=1, image=broken)
+        self.assertEqual(Product.objects.get(pk=product.pk).image_renditions, {})
+        html = Template('{% load product_images %}{% product_image p %}').render(Context({'p': product}))
+        self.assertIn(f'src="{product.image.url}"', html)
+
+
+class ProductBulkImportTests(TestCase):
+    CSV = (
+        "code,name,category,price,size,quantity,image,hide\n"
+        "A1,Áo Thun Trắng,Áo Thun,199000,M,10,product_images/16.webp,0\n"
+        "A1,Áo Thun Trắng,Áo Thun,199000,L,5,product_images/16.webp,0\n"
+        "B2,Quần Jean Xanh,Quần Jean,abc,M,1,,0\n"
+        "C3,Quần Kaki Be,Quần Jean,399000,XXL,-1,,0\n"
+        ",Không Mã,Quần Jean,1000,M,1,,0\n"
+        "D4,Váy Đầm Đỏ,Váy,459000,S,3,,1\n"
+    )
+
+    def import_csv(self, text, **kwargs):
+        return bulk.import_products(bulk.read_rows(BytesIO(text.encode()), 'csv'), **kwargs)
+
+    def test_import_reports_row_errors_and_keeps_valid_rows(self):
+        report = self.import_csv(self.CSV, batch_size=2)
+        self.assertEqual((report.rows, report.products, report.skus), (6, 2, 3))
+        self.assertEqual([line for line, _ in report.errors], [4, 5, 6])
+        self.assertEqual(Product.objects.get(code='A1').sizes.count(), 2)
+        self.assertTrue(Product.objects.get(code='D4').hide)
+        self.assertEqual(set(Category.objects.values_list('name', flat=True)), {'Áo Thun', 'Váy'})
+        self.assertEqual([p.pk for p in search_products('ao thun')], [Product.objects.get(code='A1').pk])
+
+    def test_reimport_updates_in_place(self):
+        self.import_csv(self.CSV)
+        product = Product.objects.get(code='A1')
+        self.import_csv(
+            "code,name,category,price,size,quantity,image,hide\n"
+            "A1,Áo Thun Trắng Mới,Áo Thun,249000,M,7,,0\n"
+        )
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price), ('Áo Thun Trắng Mới', 249000))
+        self.assertEqual(product.image.name, 'product_images/16.webp')  # image trống: giữ ảnh cũ
+        self.assertEqual(dict(product.sizes.values_list('size__name', 'quantity')), {'M': 7, 'L': 5})
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_price_is_parsed_as_exact_decimal(self):
+        report = self.import_csv(
+            "code,name,category,price,size,quantity,image,hide\n"
+            "E5,Áo Sơ Mi Trắng,Áo Sơ Mi,199999.99,M,1,,0\n"
+            "E6,Áo Sơ Mi Đen,Áo Sơ Mi,NaN,M,1,,0\n"
+        )
+        self.assertEqual([line for line, _ in report.errors], [3])
+        self.assertEqual(Product.objects.get(code='E5').price, Decimal('199999.99'))
+
+    def test_values_outside_column_range_are_row_errors(self):
+        report = self.import_csv(
+            "code,name,category,price,size,quantity,image,hide\n"
+            "F1,Áo Polo Đen,Áo Polo,1e20,M,1,,0\n"
+            "F2,Áo Polo Be,Áo Polo,1.999,M,1,,0\n"
+            "F3,Áo Polo Xám,Áo Polo,1000,M,99999999999999999999,,0\n"
+            "F4,Áo Polo Trắng,Áo Polo,9999999999.99,M,1,,0\n"
+        )
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+        self.assertEqual(list(Product.objects.values_list('code', flat=True)), ['F4'])
+
+    def test_new_category_is_created_once(self):
+        csv_text = "code,name,category,price,size,quantity,image,hide\n{code},Áo Len,Áo Len,300000,M,1,,0\n"
+        self.import_csv(csv_text.format(code='G1'))
+        self.import_csv(csv_text.format(code='G2'))
+        category = Category.objects.get(name='Áo Len')
+        self.assertEqual(set(category.products.values_list('code', flat=True)), {'G1', 'G2'})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Category.objects.create(name='Áo Len')
+
+    def test_category_created_by_concurrent_import_is_reused(self):
+        # Import khác vừa tạo danh mục sau khi import này tìm theo tên mà chưa thấy
+        other = Category.objects.create(name='Áo Len')
+        lookup = Category.objects.filter
+        calls = []
+
+        def miss_first(*args, **kwargs):
+            calls.append(kwargs)
+            queryset = lookup(*args, **kwargs)
+            return queryset.none() if len(calls) == 1 else queryset
+
+        with mock.patch.object(Category.objects, 'filter', side_effect=miss_first):
+            report = self.import_csv(
+                "code,name,category,price,size,quantity,image,hide\nG3,Áo Len,Áo Len,300000,M,1,,0\n"
+            )
+        self.assertEqual(report.errors, [])
+        self.assertEqual(list(Category.objects.filter(name='Áo Len')), [other])
+        self.assertEqual(Product.objects.get(code='G3').category_id, other.id)
+
+    def test_jsonl_import_and_export_round_trip(self):
+        lines = [
+            '{"code": "J1", "name": "Áo Polo", "category": "Áo Polo", "price": 299000, "size": "M", "quantity": 2}',
+            'không phải json',
+        ]
+        report = bulk.import_products(bulk.read_rows(StringIO('\n'.join(lines)), 'jsonl'))
+        self.assertEqual((report.skus, report.error_count), (1, 1))
+        self.import_csv(self.CSV)
+
+        exported = ''.join(bulk.export_lines('csv'))
+        self.assertEqual(exported.splitlines()[0], ','.join(bulk.FIELDS))
+        Product.objects.all().delete()
+        report = self.import_csv(exported)
+        self.assertEqual((report.skus, report.error_count), (4, 0))
+
+    def test_dashboard_upload_and_streaming_export(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        upload = SimpleUploadedFile('products.csv', self.CSV.encode(), content_type='text/csv')
+        self.client.post('/management/import_products/', {'file': upload})
+        self.assertEqual(ProductSize.objects.count(), 3)
+
+        response = self.client.get('/management/export_products/?format=jsonl')
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual({row['code'] for row in rows}, {'A1', 'D4'})
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.shirts = Category.objects.create(name="Áo Sơ Mi")
+        self.jeans = Category.objects.create(name="Quần Jean")
+        self.white = Product.objects.create(category=self.shirts, name="Áo Sơ Mi Trắng Basic", price=299000)
+        self.navy = Product.objects.create(category=self.jeans, name="Quần Jean Xanh Navy", price=499000)
+
+    def test_fold_strips_vietnamese_accents(self):
+        self.assertEqual(fold("Áo Sơ Mi Đỏ"), "ao so mi do")
+        self.assertEqual(tokenize("Quần  Jean-Xanh"), ["quan", "jean", "xanh"])
+
+    def test_accent_insensitive_and_prefix_match(self):
+        self.assertEqual(search_products("ao so mi").ids(), [self.white.id])
+        self.assertEqual(search_products("quan je").ids(), [self.navy.id])
+        self.assertEqual(search_products("so mi xanh").ids(), [])
+
+    def test_name_matches_rank_above_category_matches(self):
+        other = Product.objects.create(category=self.shirts, name="Áo Khoác Jean", price=599000)
+        self.assertEqual(search_products("jean").ids(), [self.navy.id, other.id])
+
+    def test_index_follows_product_and_category_changes(self):
+        self.white.name = "Áo Polo Trắng"
+        self.white.save()
+        self.assertEqual(search_products("polo").ids(), [self.white.id])
+
+        self.jeans.name = "Quần Bò"
+        self.jeans.save()
+        self.assertEqual(search_products("quan bo").ids(), [self.navy.id])
+
+        self.navy.delete()
+        self.assertFalse(SearchToken.objects.filter(product_id=self.navy.id).exists())
+
+    def test_hidden_products_are_excluded_from_storefront_search(self):
+        self.white.hide = True
+        self.white.save()
+        response = self.client.get('/products/', {'search': 'ao so mi'})
+        self.assertEqual(response.context['products'], [])
+
+    def test_rebuild_command_restores_index(self):
+        SearchToken.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search_products("trang").ids(), [self.white.id])
+
+
+class ProductAutocompleteTests(TestCase):
+    url = '/products/suggest.json'
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.clear()
+        self.shirts = Category.objects.create(name="Áo Sơ Mi")
+        self.jeans = Category.objects.create(name="Quần Jean")
+        Category.objects.create(name="Áo Ẩn", hide=True)
+        self.white = Product.objects.create(category=self.shirts, name="Áo Sơ Mi Trắng Basic", price=299000)
+        self.polo = Product.objects.create(category=self.shirts, name="Áo Polo Đen", price=199000)
+        self.navy = Product.objects.create(category=self.jeans, name="Quần Jean Xanh Navy", price=499000)
+        self.hidden = Product.objects.create(category=self.jeans, name="Áo Đen Ẩn", price=99000, hide=True)
+
+    def suggest(self, q, **params):
+        data = self.client.get(self.url, {'q': q, **params}).json()
+        return [c['name'] for c in data['categories']], [p['name'] for p in data['products']]
+
+    def test_accent_folded_prefix_of_name_or_word(self):
+        self.assertEqual(self.suggest('ao'), (["Áo Sơ Mi"], ["Áo Polo Đen", "Áo Sơ Mi Trắng Basic"]))
+        self.assertEqual(self.suggest('Áo  SƠ m'), (["Áo Sơ Mi"], ["Áo Sơ Mi Trắng Basic"]))
+        self.assertEqual(self.suggest('den'), ([], ["Áo Polo Đen"]))
+        self.assertEqual(self.suggest('jean x'), ([], ["Quần Jean Xanh Navy"]))
+        self.assertEqual(self.suggest('o'), ([], []))  # không khớp giữa từ
+        self.assertEqual(self.suggest(''), ([], []))
+
+    def test_name_start_ranks_before_word_match_and_limit(self):
+        Product.objects.create(category=self.jeans, name="Jean Rách Gối", price=399000)
+        self.assertEqual(self.suggest('jean')[1], ["Jean Rách Gối", "Quần Jean Xanh Navy"])
+        self.assertEqual(self.suggest('jean', limit=1)[1], ["Jean Rách Gối"])
+        self.assertEqual(self.client.get(self.url, {'q': 'a', 'limit': 'x'}).status_code, 400)
+
+    def test_product_suggestion_links_to_search(self):
+        data = self.client.get(self.url, {'q': 'polo'}).json()
+        self.assertEqual(data['products'][0]['price'], 199000)
+        self.assertEqual(self.client.get(data['products'][0]['url']).context['products'], [self.polo])
+
+    def test_served_from_memory_and_follows_catalog_changes(self):
+        self.suggest('ao')  # dựng chỉ mục
+        with self.assertNumQueries(0):
+            self.suggest('quan')
+        self.polo.name = "Áo Thun Đen"
+        self.polo.save()
+        self.assertEqual(self.suggest('thun'), ([], ["Áo Thun Đen"]))
+        self.assertEqual(self.suggest('polo'), ([], []))
+
+
+class ProductDetailApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_catalog(5, n_categories=1, sizes=('S', 'M', 'L'), stock=3)
+        ProductSize.objects.filter(product_id=1, size__name='L').update(active=False)
+        ProductSize.objects.filter(product_id=1, size__name='M').update(quantity=0)
+        Product.objects.filter(pk=5).update(hide=True)
+        self.user = User.objects.create_user('buyer', password='x')
+
+    def etag(self, url):
+        return self.client.get(url)['ETag']
+
+    def test_detail_returns_stock_per_active_size_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/products/1.json')
+        product = response.json()['product']
+        self.assertEqual(product['price'], 100000)
+        self.assertEqual(
+            [(s['name'], s['available'], s['in_stock']) for s in product['sizes']], [('S', 3, True), ('M', 0, False)]
+        )
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get('/products/5.json').status_code, 404)
+        self.assertEqual(self.client.get('/products/999.json').status_code, 404)
+
+    def test_matching_if_none_match_is_answered_without_queries(self):
+        etag = self.etag('/products/2.json')
+        self.assertTrue(etag.startswith('"2-'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/products/2.json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_product_and_stock(self):
+        from orders.checkout import place_order
+        from orders.models import Order
+        from orders.states import transition_orders
+
+        url = '/products/2.json'
+        seen = {self.etag(url)}
+        product = Product.objects.get(pk=2)
+        product.price = 123000
+        product.save()
+        seen.add(self.etag(url))
+
+        sku = ProductSize.objects.get(product_id=2, size__name='S')
+        sku.quantity = 10
+        sku.save()
+        seen.add(self.etag(url))
+
+        place_order(self.user, {'receiver': 'A', 'phone': '1', 'address': 'HN', 'note': ''}, [(2, 'M', 2)])
+        seen.add(self.etag(url))
+        self.assertEqual(self.client.get(url).json()['product']['sizes'][1]['available'], 1)
+
+        transition_orders(Order.objects.all(), 'cancelled')
+        seen.add(self.etag(url))
+        self.assertEqual(self.client.get(url).json()['product']['sizes'][1]['available'], 3)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(self.etag('/products/3.json'), self.etag('/products/3.json'))
+
+    def test_batch_keeps_order_reports_missing_and_revalidates(self):
+        url = '/products/batch?ids=3,1,5,999,3'
+        with self.assertNumQueries(1):
+            data = self.client.get(url).json()
+        self.assertEqual([p['id'] for p in data['products']], [3, 1])
+        self.assertEqual(data['missing'], [5, 999])
+
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ProductSize.objects.get(product_id=1, size__name='S').save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        too_many = ','.join(str(i) for i in range(1, api.MAX_BATCH_SIZE + 2))
+        for ids in ('', 'a,b', '0', too_many):
+            self.assertEqual(self.client.get('/products/batch', {'ids': ids}).status_code, 400, ids)
+
+
+class ReserveStockTests(TestCase):
+    def setUp(self):
+        seed_catalog(2, sizes=('M', 'L'), stock=5)
+        self.m, self.l, self.other_m, self.other_l = ProductSize.objects.order_by('id')
+
+    def test_decrements_all_lines_in_one_statement(self):
+        with self.assertNumQueries(3):  # savepoint, UPDATE, release savepoint
+            reserve_stock({self.m.id: 2, self.other_l.id: 5})
+        self.m.refresh_from_db()
+        self.other_l.refresh_from_db()
+        self.assertEqual((self.m.quantity, self.other_l.quantity), (3, 0))
+
+    def test_reports_exactly_the_short_lines_and_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as ctx:
+            reserve_stock([(self.m.id, 1), (self.l.id, 6), (self.other_m.id, 3), (self.other_m.id, 3)])
+        self.assertEqual(ctx.exception.failures, [
+            StockShortage(self.l.id, 6, 5),
+            StockShortage(self.other_m.id, 6, 5),
+        ])
+        self.assertEqual(set(ProductSize.objects.values_list('quantity', flat=True)), {5})
+
+
+@skipUnless(connection.vendor != 'sqlite' or not connection.is_in_memory_db(), "cần database trên file")
+class ConcurrentReserveStockTests(TransactionTestCase):
+    def test_concurrent_checkouts_never_oversell(self):
+        seed_catalog(1, sizes=('M', 'L'), stock=30)
+        ids = list(ProductSize.objects.order_by('id').values_list('id', flat=True))
+
+        def place(i):
+            # Thứ tự dòng đảo ngược giữa các đơn: không được deadlock
+            lines = [(pk, 1 + i % 2) for pk in (ids if i % 2 else ids[::-1])]
+            with transaction.atomic():
+                reserve_stock(lines)
+            return lines
+
+        _, results = run_concurrently(place, workers=8, calls=60)
+        placed = [lines for lines in results if isinstance(lines, list)]
+        self.assertTrue(all(isinstance(r, (list, InsufficientStock)) for r in results), results)
+        for pk in ids:
+            sold = sum(quantity for lines in placed for line_pk, quantity in lines if line_pk == pk)
+            self.assertEqual(ProductSize.objects.get(pk=pk).quantity, 30 - sold)
+            self.assertGreaterEqual(30 - sold, 0)
@@ -3,6 +3,10 @@ from . import views
 
 urlpatterns = [
     path('', views.product_list, name='home'),          
-    path('category/<int:category_id>/', views.product_by_category, name='product_by_category')
+    path('category/<int:category_id>/', views.product_by_category, name='product_by_category'),
+    path('filter.json', views.product_filter_json, name='product_filter_json'),
+    path('suggest.json', views.product_suggest_json, name='product_suggest_json'),
+    path('<int:product_id>.json', views.product_detail_json, name='product_detail_json'),
+    path('batch', views.product_batch_json, name='product_batch_json'),
 ]
 
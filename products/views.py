@@ -1,36 +1,112 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
-from .models import Product, Category, Size
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+from core.http_cache import storefront_cache
+from . import api, autocomplete
+from .models import Category
+from .catalog import parse_id, visible_products, product_grid
+from .facets import faceted_page, parse_filters
+from .reference import active_categories, all_sizes
+from .search import search_products
+from .snapshot import listing_products
+@storefront_cache('catalog')
 def product_list(request):
-    categories = Category.objects.filter(hide=False)
+    categories = active_categories()
     query = request.GET.get('search')
     if query:
-        products = Product.objects.filter(
-            Q(name__icontains=query) | Q(category__name__icontains=query),
-            hide=False
-        ).distinct()
+        # Tìm qua chỉ mục SearchToken, kết quả xếp theo độ liên quan nên không dùng keyset
+        grid = product_grid(
+            request, lambda: search_products(query, visible_products()), search_query=query, keyset=False
+        )
     else:
-        products = Product.objects.filter(hide=False)
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    sizes = Size.objects.all()
+        grid = product_grid(request, listing_products)
+    sizes = all_sizes()
     return render(request, 'home.html', {
         'categories': categories,
-        'products': products,
         'search_query': query,
-        "page_obj": page_obj,
         "sizes": sizes,
+        'product_grid': grid,
     })
 
 
+@storefront_cache('catalog', 'category-{category_id}')
 def product_by_category(request, category_id):
-    categories = Category.objects.filter(hide=False)
-    category = get_object_or_404(Category, id=category_id)
-    products = Product.objects.filter(category=category, hide=False)
+    categories = active_categories()
+    # Danh mục đang hiển thị có sẵn trong cache; chỉ danh mục ẩn mới cần query
+    category = next((c for c in categories if c.id == category_id), None)
+    if category is None:
+        category = get_object_or_404(Category, id=category_id)
+    sizes = all_sizes()
     return render(request, 'home.html', {
         'categories': categories,
-        'products': products,
         'active_category': category.id,
+        "sizes": sizes,
+        'product_grid': product_grid(
+            request, lambda: listing_products(category_id=category.id), category_id=category.id
+        ),
     })
+
+
+def product_filter_json(request):
+    """Sản phẩm lọc theo ``category``, ``size``, ``min_price``/``max_price``, ``in_stock`` kèm số
+    đếm facet (xem products.facets); trang sau qua ``?after=<next_after>``"""
+    try:
+        filters = parse_filters(request.GET)
+        after = parse_id(request.GET.get('after') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Tham số không hợp lệ!'}, status=400)
+    return JsonResponse({'status': 'success', **faceted_page(filters, after)})
+
+
+def product_suggest_json(request):
+    """Gợi ý tên sản phẩm/danh mục cho ô tìm kiếm: ``?q=<tiền tố>&limit=<số gợi ý>``"""
+    try:
+        limit = min(int(request.GET.get('limit') or autocomplete.SUGGEST_LIMIT), autocomplete.MAX_SUGGEST_LIMIT)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Tham số không hợp lệ!'}, status=400)
+    return JsonResponse({'status': 'success', **autocomplete.suggest(request.GET.get('q', ''), max(limit, 1))})
+
+
+def _revalidate(response):
+    """Trình duyệt/CDN được lưu nhưng phải hỏi lại (If-None-Match) trước mỗi lần dùng"""
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _detail_etag(request, product_id):
+    return api.product_etag([product_id])
+
+
+@require_GET
+@condition(etag_func=_detail_etag)
+def product_detail_json(request, product_id):
+    """Giá và tồn kho theo size của một sản phẩm; ETag theo phiên bản sản phẩm (products.api)"""
+    product = api.products_json([product_id]).get(product_id)
+    if product is None:
+        return JsonResponse({'status': 'error', 'message': 'Không tìm thấy sản phẩm!'}, status=404)
+    return _revalidate(JsonResponse({'status': 'success', 'product': product}))
+
+
+def _batch_etag(request):
+    try:
+        return api.product_etag(api.parse_ids(request.GET.get('ids', '')))
+    except ValueError:
+        return None
+
+
+@require_GET
+@condition(etag_func=_batch_etag)
+def product_batch_json(request):
+    """Nhiều sản phẩm một lần (``?ids=1,2,3``, tối đa ``api.MAX_BATCH_SIZE``), ví dụ để làm mới
+    giỏ hàng; sản phẩm không còn hiển thị nằm trong ``missing``"""
+    try:
+        ids = api.parse_ids(request.GET.get('ids', ''))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Tham số không hợp lệ!'}, status=400)
+    products = api.products_json(ids)
+    return _revalidate(JsonResponse({
+        'status': 'success',
+        'products': [products[product_id] for product_id in ids if product_id in products],
+        'missing': [product_id for product_id in ids if product_id not in products],
+    }))
@@ -1,10 +1,21 @@
 class CartManager {
     constructor() {
         this.storageKey = 'fashionshop_cart';
+        // Đã đăng nhập: giỏ hàng lưu trên server, base.html gắn URL API vào <body>
+        this.apiUrl = document.body.dataset.cartApi || null;
+        this.snapshot = null;
+        this.loading = null;
     }
     
-    // Lấy giỏ hàng từ localStorage
+    // Lấy giỏ hàng từ localStorage (khách) hoặc snapshot server đã tải (đã đăng nhập)
     getCart() {
+        if (this.apiUrl && this.snapshot) {
+            return this.snapshot.items;
+        }
+        return this.getLocalCart();
+    }
+    
+    getLocalCart() {
         try {
             const cart = localStorage.getItem(this.storageKey);
             return cart ? JSON.parse(cart) : [];
@@ -26,9 +37,95 @@ class CartManager {
         }
     }
     
+    // Gọi API giỏ hàng, lưu snapshot server trả về
+    request(url, method, body) {
+        return fetch(url, {
+            method: method,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: body === undefined ? undefined : JSON.stringify(body)
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                throw new Error(data.message || 'Cart error');
+            }
+            this.snapshot = data;
+            this.updateCartCount();
+            return data.items;
+        });
+    }
+    
+    // Tải giỏ hàng; lần đầu sau khi đăng nhập gộp giỏ hàng khách từ localStorage lên server
+    load() {
+        if (!this.apiUrl) {
+            return this.refreshLocalCart();
+        }
+        if (!this.loading) {
+            const guestCart = this.getLocalCart();
+            this.loading = guestCart.length === 0
+                ? this.request(this.apiUrl, 'GET')
+                : this.request(this.apiUrl + 'merge/', 'POST', {items: this.prepareCheckoutData(guestCart)})
+                    .then(items => {
+                        localStorage.removeItem(this.storageKey);
+                        return items;
+                    });
+            this.loading.catch(() => { this.loading = null; });
+        }
+        // Nhiều phần trên trang cùng gọi load(): chỉ tải một lần, trả về giỏ hiện tại
+        return this.loading.then(() => this.getCart());
+    }
+    
+    // Giỏ hàng khách: cập nhật giá, tên, ảnh và tồn kho mọi dòng bằng một request
+    // (products/batch, trình duyệt revalidate bằng ETag)
+    refreshLocalCart() {
+        const cart = this.getLocalCart();
+        const batchUrl = document.body.dataset.productBatch;
+        if (cart.length === 0 || !batchUrl) {
+            return Promise.resolve(cart);
+        }
+        const ids = [...new Set(cart.map(item => parseInt(item.product_id)))];
+        return fetch(`${batchUrl}?ids=${ids.join(',')}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status !== 'success') return cart;
+                const products = Object.fromEntries(data.products.map(p => [p.id, p]));
+                cart.forEach(item => {
+                    const product = products[parseInt(item.product_id)];
+                    // size_id của giỏ khách có thể là id hoặc tên size
+                    const size = product && product.sizes.find(s =>
+                        String(s.size_id) === String(item.size_id) || s.name === String(item.size_id)
+                    );
+                    if (product) {
+                        item.product_name = product.name;
+                        item.price = product.price;
+                        item.image = product.image || item.image;
+                    }
+                    item.available = size ? size.available : 0;
+                    item.in_stock = Boolean(size) && size.available >= parseInt(item.quantity);
+                });
+                this.saveCart(cart);
+                return cart;
+            })
+            .catch(() => cart);
+    }
+    
     // Thêm sản phẩm vào giỏ hàng
     addItem(item) {
-        const cart = this.getCart();
+        if (this.apiUrl) {
+            return this.request(this.apiUrl, 'POST', {
+                product_id: parseInt(item.product_id),
+                size_id: item.size_id,
+                quantity: parseInt(item.quantity)
+            }).then(() => true, e => {
+                console.error('Error adding to cart:', e);
+                return false;
+            });
+        }
+        
+        const cart = this.getLocalCart();
         
         // Kiểm tra sản phẩm đã tồn tại với cùng size
         const existingItemIndex = cart.findIndex(i => 
@@ -52,42 +149,69 @@ class CartManager {
             });
         }
         
-        this.saveCart(cart);
-        return true;
+        return Promise.resolve(this.saveCart(cart));
+    }
+    
+    // Dòng tương ứng trên server (snapshot dùng id size)
+    findServerItem(productId, sizeId) {
+        return this.getCart().find(i => 
+            parseInt(i.product_id) === parseInt(productId) && 
+            String(i.size_id) === String(sizeId)
+        );
     }
     
     // Xóa sản phẩm khỏi giỏ hàng
     removeItem(productId, sizeId) {
-        let cart = this.getCart();
+        if (this.apiUrl) {
+            const item = this.findServerItem(productId, sizeId);
+            return item
+                ? this.request(this.apiUrl + 'items/' + item.product_size_id + '/', 'DELETE')
+                : Promise.resolve(this.getCart());
+        }
+        let cart = this.getLocalCart();
         cart = cart.filter(item => 
             !(parseInt(item.product_id) === parseInt(productId) && 
               String(item.size_id) === String(sizeId))
         );
         this.saveCart(cart);
+        return Promise.resolve(cart);
     }
     
     // Cập nhật số lượng sản phẩm
     updateQuantity(productId, sizeId, quantity) {
-        const cart = this.getCart();
+        quantity = Math.max(1, parseInt(quantity));
+        if (this.apiUrl) {
+            const item = this.findServerItem(productId, sizeId);
+            return item
+                ? this.request(this.apiUrl + 'items/' + item.product_size_id + '/', 'PATCH', {quantity: quantity})
+                : Promise.resolve(this.getCart());
+        }
+        const cart = this.getLocalCart();
         const item = cart.find(i => 
             parseInt(i.product_id) === parseInt(productId) && 
             String(i.size_id) === String(sizeId)
         );
         
         if (item) {
-            item.quantity = Math.max(1, parseInt(quantity));
+            item.quantity = quantity;
             this.saveCart(cart);
         }
+        return Promise.resolve(cart);
     }
     
-    // Xóa toàn bộ giỏ hàng
+    // Xóa toàn bộ giỏ hàng (server tự bỏ các dòng đã đặt khi tạo đơn)
     clearCart() {
         localStorage.removeItem(this.storageKey);
+        this.snapshot = null;
+        this.loading = null;
         this.updateCartCount();
     }
     
-    // Tính tổng tiền
+    // Tính tổng tiền (giỏ trên server: tổng do server tính theo giá hiện tại)
     getTotalPrice() {
+        if (this.apiUrl && this.snapshot) {
+            return this.snapshot.total;
+        }
         const cart = this.getCart();
         return cart.reduce((total, item) => 
             total + (parseFloat(item.price) * parseInt(item.quantity)), 0
@@ -117,8 +241,8 @@ class CartManager {
     }
     
     // Chuẩn bị data để gửi lên server
-    prepareCheckoutData() {
-        const cart = this.getCart();
+    prepareCheckoutData(cart) {
+        cart = cart || this.getCart();
         return cart.map(item => ({
             product_id: parseInt(item.product_id),
             size_id: item.size_id, // Gửi size_id (có thể là ID hoặc name)
@@ -154,6 +278,10 @@ function getCookie(name) {
 // Cập nhật cart count khi trang load
 document.addEventListener('DOMContentLoaded', function() {
     cartManager.updateCartCount();
+    // Đã đăng nhập: tải giỏ hàng server (và gộp giỏ hàng khách nếu có) rồi cập nhật lại
+    if (cartManager.apiUrl) {
+        cartManager.load().catch(e => console.error('Error loading cart:', e));
+    }
 });
 
 
@@ -162,7 +290,12 @@ document.addEventListener('DOMContentLoaded', function() {
 // ===========================
 
 function renderCartPage() {
-    const cartItems = cartManager.getCart();
+    cartManager.load()
+        .then(renderCartItems)
+        .catch(e => console.error('Error loading cart:', e));
+}
+
+function renderCartItems(cartItems) {
     const container = document.getElementById('cartItems');
     
     if (!container) return;
@@ -191,6 +324,7 @@ function renderCartPage() {
                     <h3>${item.product_name}</h3>
                     <p>Size: ${item.size_name}</p>
                     <p>Giá: ${formatPrice(item.price)}</p>
+                    ${item.in_stock === false ? `<p class="cart-item-warning">Chỉ còn ${item.available} sản phẩm</p>` : ''}
                 </div>
                 <div class="cart-item-actions">
                     <div class="cart-item-quantity">
@@ -222,8 +356,7 @@ function changeCartQuantity(productId, sizeId, change) {
     if (item) {
         const newQuantity = parseInt(item.quantity) + change;
         if (newQuantity >= 1) {
-            cartManager.updateQuantity(productId, sizeId, newQuantity);
-            renderCartPage();
+            cartManager.updateQuantity(productId, sizeId, newQuantity).then(renderCartItems);
         }
     }
 }
@@ -231,22 +364,18 @@ function changeCartQuantity(productId, sizeId, change) {
 function updateCartQuantity(productId, sizeId, quantity) {
     const qty = parseInt(quantity);
     if (qty >= 1) {
-        cartManager.updateQuantity(productId, sizeId, qty);
-        renderCartPage();
+        cartManager.updateQuantity(productId, sizeId, qty).then(renderCartItems);
     }
 }
 
 function removeFromCart(productId, sizeId) {
     if (confirm('Bạn có chắc muốn xóa sản phẩm này?')) {
-        cartManager.removeItem(productId, sizeId);
-        renderCartPage();
+        cartManager.removeItem(productId, sizeId).then(renderCartItems);
     }
 }
 
 function updateCartSummary(cartItems) {
-    const subtotal = cartItems.reduce((sum, item) => 
-        sum + (parseFloat(item.price) * parseInt(item.quantity)), 0
-    );
+    const subtotal = cartManager.getTotalPrice();
     
     const subtotalElement = document.getElementById('subtotal');
     const totalElement = document.getElementById('totalPrice');
@@ -15,7 +15,8 @@ document.addEventListener("DOMContentLoaded", function() {
         item.addEventListener("click", function() {
             const name = this.querySelector(".product__name").innerText;
             const priceText = this.querySelector(".product__price").innerText;
-            const imgSrc = this.querySelector(".product__img").getAttribute("src");
+            const img = this.querySelector(".product__img");
+            const imgSrc = img.dataset.full || img.getAttribute("src");
             const id = this.getAttribute("id");
 
             currentProductId = id;
@@ -29,9 +30,31 @@ document.addEventListener("DOMContentLoaded", function() {
             modal.classList.remove("unactive");
             modal.classList.add("active");
             modal.setAttribute("data-id", id);
+            loadProductDetail(id);
         });
     });
 
+    // Giá và tồn kho theo size mới nhất (products/<id>.json): size hết hàng không chọn được
+    function loadProductDetail(id) {
+        const sizeSelect = document.getElementById("size");
+        if (!modal.dataset.detailUrl || !sizeSelect) return;
+        fetch(modal.dataset.detailUrl.replace(/0\.json$/, `${id}.json`))
+            .then(response => response.json())
+            .then(data => {
+                if (data.status !== "success" || modal.getAttribute("data-id") !== id) return;
+                productPrice.innerText = "Giá: " + formatPrice(data.product.price);
+                const sizes = Object.fromEntries(data.product.sizes.map(s => [s.name, s]));
+                Array.from(sizeSelect.options).forEach(option => {
+                    const size = sizes[option.value];
+                    option.disabled = !size || !size.in_stock;
+                    option.text = option.disabled ? `${option.value} (hết hàng)` : option.value;
+                });
+                const first = Array.from(sizeSelect.options).find(option => !option.disabled);
+                if (sizeSelect.selectedOptions[0]?.disabled && first) first.selected = true;
+            })
+            .catch(() => {});
+    }
+
     // Close modal
     closeModal.addEventListener("click", function() {
         modal.classList.add("unactive");
@@ -72,6 +95,62 @@ document.addEventListener("DOMContentLoaded", function() {
             }
         });
     }
+
+    // Gợi ý khi gõ tìm kiếm (products/suggest.json)
+    const searchInput = document.getElementById("search__product");
+    const suggestList = document.querySelector(".suggest-product-list");
+    if (searchInput && suggestList && searchInput.dataset.suggestUrl) {
+        let timer = null;
+        let controller = null;
+
+        function suggestItem(url, name, detail, image) {
+            const li = document.createElement("li");
+            li.className = "suggest-product";
+            if (image) {
+                const img = document.createElement("img");
+                img.src = image;
+                img.alt = name;
+                li.appendChild(img);
+            }
+            const title = document.createElement("h3");
+            title.textContent = name;
+            const info = document.createElement("h4");
+            info.textContent = detail;
+            li.append(title, info);
+            li.addEventListener("click", () => { window.location.href = url; });
+            return li;
+        }
+
+        function showSuggestions(data) {
+            suggestList.replaceChildren(
+                ...data.categories.map(c => suggestItem(c.url, c.name, "Danh mục", "")),
+                ...data.products.map(p => suggestItem(
+                    p.url, p.name, p.price.toLocaleString("vi-VN") + "đ", p.image
+                ))
+            );
+        }
+
+        searchInput.addEventListener("input", function() {
+            clearTimeout(timer);
+            const query = this.value.trim();
+            if (!query) {
+                suggestList.replaceChildren();
+                return;
+            }
+            timer = setTimeout(() => {
+                if (controller) controller.abort();
+                controller = new AbortController();
+                fetch(`${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(query)}`, { signal: controller.signal })
+                    .then(response => response.json())
+                    .then(showSuggestions)
+                    .catch(() => {});
+            }, 150);
+        });
+
+        document.addEventListener("click", e => {
+            if (!e.target.closest(".form__search-suggest")) suggestList.replaceChildren();
+        });
+    }
 });
 
 // Add to cart function
@@ -121,18 +200,20 @@ function addToCart() {
     console.log('Adding to cart:', item);
 
     // Thêm vào giỏ hàng
-    if (cartManager.addItem(item)) {
-        alert('Đã thêm vào giỏ hàng!');
-        
-        // Đóng modal
-        modal.classList.add("unactive");
-        modal.classList.remove("active");
-        
-        // Reset quantity
-        quantityInput.value = 1;
-    } else {
-        alert('Có lỗi khi thêm vào giỏ hàng!');
-    }
+    cartManager.addItem(item).then(added => {
+        if (added) {
+            alert('Đã thêm vào giỏ hàng!');
+            
+            // Đóng modal
+            modal.classList.add("unactive");
+            modal.classList.remove("active");
+            
+            // Reset quantity
+            quantityInput.value = 1;
+        } else {
+            alert('Có lỗi khi thêm vào giỏ hàng!');
+        }
+    });
 }
 
 // Check quantity function